@@ -0,0 +1,80 @@
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import metrics
+
+MAX_IN_FLIGHT: int = getattr(settings, 'ADMISSION_MAX_IN_FLIGHT', 0)
+LIMITS: Dict[str, int] = getattr(settings, 'ADMISSION_LIMITS', {})
+RETRY_AFTER: int = getattr(settings, 'ADMISSION_RETRY_AFTER', 1)
+TOTAL: str = 'total'
+MESSAGE_OVERLOADED: str = 'Сервер перегружен. Повторите запрос позже.'
+MESSAGE_TOO_MANY: str = ('Слишком много одновременных запросов. '
+                         'Повторите позже.')
+
+
+class AdmissionControlMiddleware:
+    """
+    Ограничение числа запросов процесса в обработке: сверх
+    max_in_flight - ответ 503, сверх limits[префикс] для адресов
+    с префиксом - 429. Всплеск регистраций не занимает все потоки
+    воркера, каталог продолжает отвечать. Отказ отдается сразу,
+    без обращения к базе, с заголовком Retry-After. Лимит 0 -
+    без ограничения; имеет смысл при потоках (gunicorn --threads).
+    """
+
+    def __init__(self, get_response, max_in_flight: Optional[int] = None,
+                 limits: Optional[Dict[str, int]] = None) -> None:
+        self.get_response = get_response
+        self.max_in_flight = (MAX_IN_FLIGHT if max_in_flight is None
+                              else max_in_flight)
+        self.limits = LIMITS if limits is None else limits
+        self.lock = threading.Lock()
+        self.in_flight: Counter = Counter()
+        metrics.register_gauge('admission.in_flight',
+                               lambda: self.in_flight[TOTAL])
+
+    def group(self, path: str) -> Optional[str]:
+        for prefix in self.limits:
+            if path.startswith(prefix):
+                return prefix
+        return None
+
+    def admit(self, group: Optional[str]) -> Optional[JsonResponse]:
+        """Занять место в обработке.
+        Returns:
+            JsonResponse: Отказ или None, если запрос принят.
+        """
+        with self.lock:
+            if group is not None and self.limits[group] and (
+                    self.in_flight[group] >= self.limits[group]):
+                return self.reject(429, MESSAGE_TOO_MANY, group)
+            if self.max_in_flight and (
+                    self.in_flight[TOTAL] >= self.max_in_flight):
+                return self.reject(503, MESSAGE_OVERLOADED, TOTAL)
+            self.in_flight[TOTAL] += 1
+            if group is not None:
+                self.in_flight[group] += 1
+        return None
+
+    def reject(self, status: int, message: str, group: str) -> JsonResponse:
+        metrics.incr(f'admission.rejected.{group}')
+        response = JsonResponse({'detail': message}, status=status)
+        response['Retry-After'] = str(RETRY_AFTER)
+        return response
+
+    def __call__(self, request):
+        group = self.group(request.path)
+        rejected = self.admit(group)
+        if rejected is not None:
+            return rejected
+        try:
+            return self.get_response(request)
+        finally:
+            with self.lock:
+                self.in_flight[TOTAL] -= 1
+                if group is not None:
+                    self.in_flight[group] -= 1
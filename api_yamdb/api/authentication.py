@@ -0,0 +1,57 @@
+import copy
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics
+from .cache import get_versions, is_shared_cache
+from .lru import LRUCache
+
+USER_CACHE_SIZE: int = getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024)
+USER_CACHE_TTL: int = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+# Если кэш версий в памяти процесса, смену роли в другом воркере
+# этот процесс не увидит: пользователь живет не дольше этого срока.
+USER_CACHE_LOCAL_TTL: float = getattr(settings, 'AUTH_USER_LOCAL_CACHE_TTL',
+                                      1)
+
+user_cache = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def user_version_name(user_id) -> str:
+    return f'user:{user_id}'
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса пользователя к базе на каждый запрос.
+    Пользователь берется из кэша процесса по id, jti токена и версии
+    пользователя. Версия сдвигается сигналами при любом сохранении
+    или удалении пользователя, поэтому смена роли или блокировка
+    действуют со следующего запроса во всех процессах, если кэш версий
+    общий. С кэшем версий в памяти процесса пользователь хранится
+    не дольше USER_CACHE_LOCAL_TTL.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        version_name = user_version_name(user_id)
+        version = get_versions([version_name])[version_name]
+        key = (user_id, validated_token.get(api_settings.JTI_CLAIM), version)
+        user = user_cache.get(key)
+        if user is None:
+            metrics.incr('auth_cache.miss')
+            user = super().get_user(validated_token)
+            user_cache.set(key, user, self.get_ttl())
+        else:
+            metrics.incr('auth_cache.hit')
+        # Копия, чтобы изменения в запросе не попадали в кэш.
+        return copy.copy(user)
+
+    @staticmethod
+    def get_ttl() -> float:
+        if is_shared_cache():
+            return USER_CACHE_TTL
+        return min(USER_CACHE_TTL, USER_CACHE_LOCAL_TTL)
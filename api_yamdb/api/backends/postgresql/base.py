@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from ...dbpool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений процесса."""
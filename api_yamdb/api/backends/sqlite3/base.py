@@ -0,0 +1,9 @@
+from django.db.backends.sqlite3 import base
+
+from ...dbpool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite с пулом соединений процесса: для локального запуска
+    и тестов пула без PostgreSQL.
+    """
@@ -0,0 +1,382 @@
+import json
+import math
+import platform
+import random
+import threading
+import time
+from io import StringIO
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from .cache import bump_version
+from .fastpath import CommentRowRenderer, ReviewRowRenderer, TitleRowRenderer
+from .profiling import QueryTimer
+from .utils import get_token_for_user
+
+PAGE_SIZE: int = api_settings.PAGE_SIZE
+PERCENTILES: Tuple[int, ...] = (50, 95, 99)
+WRITERS: int = 50
+READERS: int = 20
+SERIALIZE_ITEMS: int = 500
+SERIALIZE_REPEAT: int = 5
+
+
+class Dataset(NamedTuple):
+    """id и слаги засеянных данных, из которых строятся адреса."""
+    titles: List[int]
+    reviews: List[Tuple[int, int]]
+    categories: List[str]
+    genres: List[str]
+    years: List[int]
+    writers: List[str]
+    readers: List[Tuple[str, str]]
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    data: Optional[dict] = None
+    token: Optional[str] = None
+
+
+class Scenario(NamedTuple):
+    """Сценарий: по номеру запроса i строит i-й запрос."""
+    name: str
+    build: Callable[[Dataset, int], Request]
+
+
+def bulk_ids(model, objects) -> List[int]:
+    """Вставить объекты пакетами и вернуть их id по порядку."""
+    start = model.objects.order_by('-pk').values_list('pk', flat=True)
+    last = start.first() or 0
+    model.objects.bulk_create(objects)
+    return list(model.objects.filter(pk__gt=last).order_by('pk')
+                .values_list('pk', flat=True))
+
+
+def make_users(prefix: str, count: int) -> List[User]:
+    bulk_ids(User, (User(username=f'{prefix}{i}',
+                         email=f'{prefix}{i}@bench.fake')
+                    for i in range(count)))
+    return list(User.objects.filter(username__startswith=prefix)
+                .order_by('pk'))
+
+
+def seed_dataset(rows: int, reviews_per_title: int = 5,
+                 comments_per_review: int = 1, seed: int = 0) -> Dataset:
+    """Засеять базу через ORM: rows произведений, по каталогу
+    категорий и жанров на каждые 50 произведений, отзывы
+    и комментарии. Случайные значения зависят только от seed.
+    """
+    rng = random.Random(seed)
+    groups = max(rows // 50, 1)
+    categories = bulk_ids(Category, (
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(groups)))
+    genres = bulk_ids(Genre, (Genre(name=f'Жанр {i}', slug=f'genre-{i}')
+                              for i in range(groups)))
+    years = [rng.randint(1900, 2020) for _ in range(rows)]
+    titles = bulk_ids(Title, (
+        Title(name=f'Произведение {i}', year=years[i],
+              description=f'Описание произведения {i}',
+              category_id=rng.choice(categories))
+        for i in range(rows)))
+    Title.genre.through.objects.bulk_create(
+        (Title.genre.through(title_id=title_id, genre_id=genre_id)
+         for title_id in titles
+         for genre_id in set(rng.sample(genres, min(2, len(genres)))))
+    )
+    authors = make_users('bench-author-', reviews_per_title)
+    review_ids = bulk_ids(Review, (
+        Review(title_id=title_id, author=author, text='Отзыв',
+               score=rng.randint(1, 10))
+        for title_id in titles for author in authors))
+    reviews = list(Review.objects.filter(pk__in=review_ids).order_by('pk')
+                   .values_list('title_id', 'pk'))
+    Comment.objects.bulk_create(
+        (Comment(review_id=review_id, author=authors[number % len(authors)],
+                 text='Комментарий')
+         for _, review_id in reviews
+         for number in range(comments_per_review))
+    )
+    for command in ('rebuildrating', 'rebuildsearch', 'rebuildstats'):
+        call_command(command, verbosity=0, stdout=StringIO())
+    bump_version('category', 'genre', 'title')
+    writers = [get_token_for_user(user)['token']
+               for user in make_users('bench-writer-', WRITERS)]
+    readers = [(user.username, default_token_generator.make_token(user))
+               for user in make_users('bench-reader-', READERS)]
+    return Dataset(titles, reviews, [f'category-{i}' for i in range(groups)],
+                   [f'genre-{i}' for i in range(groups)], sorted(set(years)),
+                   writers, readers)
+
+
+def page(data: Dataset, i: int, pages: int) -> int:
+    """Номер страницы из первых pages существующих."""
+    return i % min(pages, math.ceil(len(data.titles) / PAGE_SIZE)) + 1
+
+
+def review_create(data: Dataset, i: int) -> Request:
+    """Каждый писатель идет по произведениям по порядку: пара
+    (произведение, автор) не повторяется.
+    """
+    writer = i % len(data.writers)
+    title_id = data.titles[i // len(data.writers) % len(data.titles)]
+    return Request('post', f'/api/v1/titles/{title_id}/reviews/',
+                   {'text': 'Отзыв из бенчмарка', 'score': i % 10 + 1},
+                   data.writers[writer])
+
+
+SCENARIOS: Tuple[Scenario, ...] = (
+    Scenario('titles_list', lambda data, i: Request(
+        'get', f'/api/v1/titles/?page={page(data, i, 20)}')),
+    Scenario('titles_filtered', lambda data, i: Request(
+        'get', f'/api/v1/titles/?genre={data.genres[i % len(data.genres)]}'
+               f'&year={data.years[i % len(data.years)]}')),
+    Scenario('titles_ordered', lambda data, i: Request(
+        'get', f'/api/v1/titles/?ordering=-rating&page={page(data, i, 5)}'
+    )),
+    Scenario('title_detail', lambda data, i: Request(
+        'get', f'/api/v1/titles/{data.titles[i % len(data.titles)]}/')),
+    Scenario('reviews_list', lambda data, i: Request(
+        'get',
+        f'/api/v1/titles/{data.titles[i % len(data.titles)]}/reviews/')),
+    Scenario('comments_list', lambda data, i: Request(
+        'get', '/api/v1/titles/{}/reviews/{}/comments/'.format(
+            *data.reviews[i % len(data.reviews)]))),
+    Scenario('review_create', review_create),
+    Scenario('signup', lambda data, i: Request(
+        'post', '/api/v1/auth/signup/',
+        {'username': f'bench-signup-{i}',
+         'email': f'bench-signup-{i}@bench.fake'})),
+    Scenario('token', lambda data, i: Request(
+        'post', '/api/v1/auth/token/',
+        dict(zip(('username', 'confirmation_code'),
+                 data.readers[i % len(data.readers)])))),
+)
+
+
+def percentile(values: List[float], rank: int) -> float:
+    """Перцентиль методом ближайшего ранга по отсортированным values."""
+    if not values:
+        return 0.0
+    index = max(math.ceil(len(values) * rank / 100) - 1, 0)
+    return values[index]
+
+
+class Worker:
+    """Поток со своим клиентом и соединением с базой."""
+
+    def __init__(self, data: Dataset, scenario: Scenario, numbers,
+                 lock: threading.Lock) -> None:
+        self.data = data
+        self.scenario = scenario
+        self.numbers = numbers
+        self.lock = lock
+        self.client = Client()
+        self.samples: List[Tuple[float, int, int]] = []
+
+    def next_number(self) -> Optional[int]:
+        with self.lock:
+            return next(self.numbers, None)
+
+    def run(self) -> None:
+        number = self.next_number()
+        while number is not None:
+            self.samples.append(self.send(
+                self.scenario.build(self.data, number)))
+            number = self.next_number()
+
+    def send(self, request: Request) -> Tuple[float, int, int]:
+        """Время в мс, код ответа и число SQL-запросов."""
+        extra = {}
+        if request.token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {request.token}'
+        if request.data is not None:
+            extra['data'] = json.dumps(request.data)
+            extra['content_type'] = 'application/json'
+        send = getattr(self.client, request.method)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = send(request.path, **extra)
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, response.status_code, timer.count
+
+
+def run_scenario(data: Dataset, scenario: Scenario, requests: int,
+                 concurrency: int = 1, warmup: int = 0) -> dict:
+    """Прогнать requests запросов сценария в concurrency потоков
+    после warmup неучитываемых. Номера запросов не повторяются,
+    поэтому создающие сценарии не упираются в уже созданное.
+    """
+    lock = threading.Lock()
+    if warmup:
+        Worker(data, scenario, iter(range(warmup)), lock).run()
+    numbers = iter(range(warmup, warmup + requests))
+    workers = [Worker(data, scenario, numbers, lock)
+               for _ in range(concurrency)]
+    started = time.perf_counter()
+    if concurrency == 1:
+        workers[0].run()
+    else:
+        threads = [threading.Thread(target=run_worker, args=(worker,))
+                   for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    duration = time.perf_counter() - started
+    samples = [sample for worker in workers for sample in worker.samples]
+    return summarize(samples, duration, concurrency)
+
+
+def run_worker(worker: Worker) -> None:
+    try:
+        worker.run()
+    finally:
+        connections.close_all()
+
+
+def summarize(samples, duration: float, concurrency: int) -> dict:
+    latencies = sorted(sample[0] for sample in samples)
+    count = len(samples)
+    result = {
+        'requests': count,
+        'errors': sum(not 200 <= status < 300 for _, status, _ in samples),
+        'concurrency': concurrency,
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(count / duration, 2) if duration else 0.0,
+        'latency_ms': {
+            f'p{rank}': round(percentile(latencies, rank), 3)
+            for rank in PERCENTILES
+        },
+        'queries_per_request': round(
+            sum(queries for _, _, queries in samples) / count, 2
+        ) if count else 0.0,
+    }
+    result['latency_ms']['mean'] = round(
+        sum(latencies) / count, 3) if count else 0.0
+    result['latency_ms']['max'] = round(latencies[-1], 3) if count else 0.0
+    return result
+
+
+def cpu_time(func: Callable[[], object], repeat: int) -> float:
+    """Наименьшее процессорное время вызова func из repeat прогонов."""
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        func()
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best or 0.0
+
+
+def serialization_cost(items: int = SERIALIZE_ITEMS,
+                       repeat: int = SERIALIZE_REPEAT) -> Dict[str, dict]:
+    """Процессорное время на объект списка: сериализатор DRF против
+    RowRenderer на одних и тех же строках. Строки и связи загружаются
+    до замера, SQL в него не входит.
+    """
+    results = {}
+    for name, renderer_class, queryset in (
+        ('titles', TitleRowRenderer,
+         Title.objects.select_related('category').prefetch_related('genre')),
+        ('reviews', ReviewRowRenderer,
+         Review.objects.select_related('author')),
+        ('comments', CommentRowRenderer,
+         Comment.objects.select_related('author')),
+    ):
+        renderer = renderer_class()
+        objects = list(queryset[:items])
+        rows = list(renderer.values(queryset)[:items])
+        renderer.prepare(rows)
+        serializer = renderer.serializer_class(objects, many=True)
+        drf = cpu_time(lambda: serializer.to_representation(objects),
+                       repeat)
+        fast = cpu_time(lambda: renderer.build(rows), repeat)
+        count = max(len(objects), 1)
+        results[name] = {
+            'items': len(objects),
+            'drf_us_per_item': round(drf / count * 1e6, 2),
+            'fast_us_per_item': round(fast / count * 1e6, 2),
+            'saved_us_per_item': round((drf - fast) / count * 1e6, 2),
+        }
+    return results
+
+
+def run_benchmark(rows: int, requests: int, concurrency: int = 1,
+                  warmup: int = 10, seed: int = 0,
+                  names: Optional[List[str]] = None) -> dict:
+    """Засеять данные и прогнать сценарии names (по умолчанию все).
+    Ограничения частоты отключены: сценарии регистрации и токена
+    меряют обработку, а не отказы 429.
+    Returns:
+        dict: Параметры прогона и результаты по сценариям.
+    """
+    data = seed_dataset(rows, seed=seed)
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not names or scenario.name in names]
+    results = {}
+    with override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+    }):
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(data, scenario, requests,
+                                                  concurrency, warmup)
+    return {
+        'meta': {
+            'rows': rows,
+            'requests': requests,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'started_at': timezone.now().isoformat(),
+        },
+        'scenarios': results,
+        'serialization': serialization_cost(),
+    }
+
+
+def compare(base: dict, current: dict) -> Dict[str, Dict[str, float]]:
+    """Изменение в процентах пропускной способности, p95 и числа
+    запросов по сценариям, которые есть в обоих прогонах.
+    """
+    changes = {}
+    for name, result in current['scenarios'].items():
+        old = base['scenarios'].get(name)
+        if old is None:
+            continue
+        changes[name] = {
+            'throughput_rps': change(old['throughput_rps'],
+                                     result['throughput_rps']),
+            'p95_ms': change(old['latency_ms']['p95'],
+                             result['latency_ms']['p95']),
+            'queries_per_request': change(old['queries_per_request'],
+                                          result['queries_per_request']),
+        }
+    return changes
+
+
+def change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return round((new - old) / old * 100, 1)
+
+
+def dump(report: dict) -> str:
+    """JSON с постоянным порядком ключей: два отчета сравниваются diff."""
+    return json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
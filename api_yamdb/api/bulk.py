@@ -0,0 +1,209 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from reviews.models import Category, Genre, Review, Title
+from reviews.search import index_titles
+from reviews.signals import update_title_rating
+from reviews.stats import refresh_stats
+from users.models import User
+
+from .cache import bump_version
+from .serializers import (MESSAGE_DUPLICATE_REVIEW, ReviewBulkSerializer,
+                          TitleBulkSerializer)
+
+BATCH_SIZE: int = 1000
+MAX_ITEMS: int = getattr(settings, 'BULK_MAX_ITEMS', 5000)
+MESSAGE_NOT_LIST: str = 'Ожидается массив объектов.'
+MESSAGE_TOO_MANY: str = 'Не больше {} объектов за запрос.'
+MESSAGE_NOT_OBJECT: str = 'Ожидается объект.'
+
+
+def check_items(items) -> str:
+    """Проверить тело запроса целиком.
+    Returns:
+        str: Текст ошибки или пустая строка.
+    """
+    if not isinstance(items, list):
+        return MESSAGE_NOT_LIST
+    if len(items) > MAX_ITEMS:
+        return MESSAGE_TOO_MANY.format(MAX_ITEMS)
+    return ''
+
+
+def collect_values(items, *fields) -> List[str]:
+    """Значения полей fields (списки раскрываются) из всех объектов."""
+    values = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for field in fields:
+            value = item.get(field)
+            for one in value if isinstance(value, list) else [value]:
+                if isinstance(one, (str, int)):
+                    values.add(str(one))
+    return list(values)
+
+
+def prefetch(model, field, values) -> Dict[str, object]:
+    """Одним запросом загрузить объекты model по значениям field."""
+    objects = model.objects.filter(**{f'{field}__in': values})
+    return {str(getattr(obj, field)): obj for obj in objects}
+
+
+def validate_items(items, serializer_class, context
+                   ) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """Проверить объекты по одному без запросов к базе.
+    Returns:
+        Tuple: Номера и данные корректных объектов, результаты по всем.
+    """
+    valid = []
+    results = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index,
+                            'errors': {'non_field_errors': [
+                                MESSAGE_NOT_OBJECT]}})
+            continue
+        serializer = serializer_class(data=item, context=context)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+            results.append({'index': index})
+        else:
+            results.append({'index': index, 'errors': serializer.errors})
+    return valid, results
+
+
+def insert_titles(titles: List[Title]) -> bool:
+    """bulk_create возвращает id только там, где база это умеет
+    (PostgreSQL). На остальных базах произведения сохраняются по одному:
+    id нужны для строк title_genre. Поисковый индекс и сводки категорий
+    тогда уже обновлены сигналами post_save.
+    Returns:
+        bool: Произведения сохранены по одному, с сигналами.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        Title.objects.bulk_create(titles, batch_size=BATCH_SIZE)
+        return False
+    for title in titles:
+        title.save(force_insert=True)
+    return True
+
+
+def bulk_create_titles(items) -> List[dict]:
+    """Создать произведения из списка объектов.
+    Слаги категорий и жанров загружаются одним запросом на таблицу,
+    произведения и их жанры вставляются пакетами в одной транзакции.
+    Returns:
+        List[dict]: По каждому объекту id или ошибки.
+    """
+    context = {'prefetched': {
+        Category: prefetch(Category, 'slug',
+                           collect_values(items, 'category')),
+        Genre: prefetch(Genre, 'slug', collect_values(items, 'genre')),
+    }}
+    valid, results = validate_items(items, TitleBulkSerializer, context)
+    if not valid:
+        return results
+    titles = []
+    with transaction.atomic():
+        for _, data in valid:
+            data = dict(data)
+            genres = data.pop('genre')
+            titles.append((Title(**data), genres))
+        saved = insert_titles([title for title, _ in titles])
+        Title.genre.through.objects.bulk_create(
+            (Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+             for title, genres in titles
+             for genre in {genre.pk: genre for genre in genres}.values()),
+            batch_size=BATCH_SIZE
+        )
+        genre_ids = {genre.pk for _, genres in titles for genre in genres}
+        if saved:
+            refresh_stats(set(), genre_ids)
+        else:
+            index_titles([title for title, _ in titles])
+            refresh_stats({title.category_id for title, _ in titles},
+                          genre_ids)
+    for (index, _), (title, _) in zip(valid, titles):
+        results[index]['id'] = title.pk
+    bump_version('title')
+    return results
+
+
+def drop_duplicates(reviews: List[Tuple[int, Review]],
+                    results: List[dict]) -> List[Tuple[int, Review]]:
+    """Убрать отзывы к произведениям, на которые автор уже ответил
+    (в базе или раньше в этом же запросе), отметив их ошибкой, как при
+    создании одного отзыва.
+    """
+    existing = set(Review.objects.filter(
+        title_id__in=[review.title_id for _, review in reviews],
+        author_id__in=[review.author_id for _, review in reviews],
+    ).values_list('title_id', 'author_id'))
+    unique = []
+    for index, review in reviews:
+        pair = (review.title_id, review.author_id)
+        if pair in existing:
+            results[index]['errors'] = {'non_field_errors': [
+                MESSAGE_DUPLICATE_REVIEW]}
+            continue
+        existing.add(pair)
+        unique.append((index, review))
+    return unique
+
+
+def insert_reviews(reviews: List[Review]) -> Dict[int, List[int]]:
+    """Вставить отзывы и один раз на произведение пересчитать рейтинг.
+    Returns:
+        Dict: Сумма и число новых оценок по произведениям.
+    """
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+        for review in reviews:
+            totals[review.title_id][0] += review.score
+            totals[review.title_id][1] += 1
+        for title_id, (score_sum, review_count) in totals.items():
+            update_title_rating(title_id, score_sum, review_count)
+    return totals
+
+
+def bulk_create_reviews(items) -> List[dict]:
+    """Создать отзывы от имени авторов из списка объектов.
+    Произведения, авторы и уже оставленные отзывы загружаются одним
+    запросом на таблицу, рейтинги пересчитываются один раз
+    на произведение.
+    Returns:
+        List[dict]: По каждому объекту id (если база его вернула)
+        или ошибки.
+    """
+    context = {'prefetched': {
+        Title: prefetch(Title, 'pk', collect_values(items, 'title')),
+        User: prefetch(User, 'username', collect_values(items, 'author')),
+    }}
+    valid, results = validate_items(items, ReviewBulkSerializer, context)
+    reviews = drop_duplicates(
+        [(index, Review(**data)) for index, data in valid], results
+    )
+    while reviews:
+        try:
+            totals = insert_reviews([review for _, review in reviews])
+            break
+        except IntegrityError:
+            # Параллельный запрос успел оставить отзыв той же пары.
+            # Если новых дубликатов нет, ошибка не про уникальность.
+            unique = drop_duplicates(reviews, results)
+            if len(unique) == len(reviews):
+                raise
+            reviews = unique
+    if not reviews:
+        return results
+    for index, review in reviews:
+        results[index]['id'] = review.pk
+    # Те же версии, что у сигнала review_changed для каждого отзыва.
+    bump_version('title', *(f'title:{title_id}' for title_id in totals),
+                 *(f'review:{review.pk}' for _, review in reviews
+                   if review.pk is not None))
+    return results
@@ -0,0 +1,278 @@
+import hashlib
+import time
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from . import metrics
+
+CACHE_ALIAS: str = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+CACHE_TIMEOUT: int = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+VERSION_KEY: str = 'version:{}'
+MODIFIED_KEY: str = 'modified:{}'
+RESPONSE_KEY: str = 'response:{}'
+CACHE_HEADER: str = 'X-Cache'
+SAFE_METHODS: tuple = ('GET', 'HEAD')
+# Бэкенды, данные которых видны только своему процессу: сдвиг версии
+# в fillbase или в другом воркере до них не доходит.
+PROCESS_LOCAL_BACKENDS: tuple = (LocMemCache, DummyCache)
+
+
+class PreconditionFailedError(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Объект изменен другим запросом, получите его заново.'
+    default_code = 'precondition_failed'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def is_shared_cache() -> bool:
+    """Версии видны всем процессам: воркерам и командам manage.py."""
+    return not isinstance(get_cache(), PROCESS_LOCAL_BACKENDS)
+
+
+def initial_version() -> int:
+    """Начальная версия - время в микросекундах, чтобы после вытеснения
+    счетчика из кэша версии не повторялись.
+    """
+    return int(time.time() * 1000000)
+
+
+def get_versions(names: Iterable[str]) -> Dict[str, int]:
+    """Текущие версии коллекций, отсутствующие создаются."""
+    cache = get_cache()
+    keys = {name: VERSION_KEY.format(name) for name in names}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key not in stored:
+            cache.add(key, initial_version(), None)
+            stored[key] = cache.get(key)
+        versions[name] = stored[key]
+    return versions
+
+
+def bump_version(*names: str) -> None:
+    """Сменить версии коллекций после фиксации транзакции: иначе
+    параллельный GET успел бы закэшировать под новой версией данные
+    до фиксации. Вне транзакции версии меняются сразу.
+    """
+    transaction.on_commit(lambda: apply_version_bump(names))
+
+
+def apply_version_bump(names: Iterable[str]) -> None:
+    """Сменить версии коллекций - закэшированные ответы устаревают."""
+    cache = get_cache()
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+    now = time.time()
+    cache.set_many({MODIFIED_KEY.format(name): now for name in names}, None)
+
+
+def get_last_modified(versions: Dict[str, int]) -> float:
+    """Время последнего изменения коллекций. Если время изменения
+    не сохранилось, берется время создания версии.
+    """
+    keys = {name: MODIFIED_KEY.format(name) for name in versions}
+    stored = get_cache().get_many(keys.values())
+    return max((stored.get(key, versions[name] / 1000000)
+                for name, key in keys.items()), default=0)
+
+
+def is_json(request) -> bool:
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', None) == 'json'
+
+
+def cached_response(entry: dict, key: str) -> HttpResponse:
+    """Ответ из записи кэша: готовые байты JSON со сжатыми вариантами
+    или данные для рендера.
+    """
+    if 'content' not in entry:
+        return Response(entry['data'], headers={CACHE_HEADER: 'HIT'})
+    response = HttpResponse(entry['content'],
+                            content_type=entry['content_type'])
+    response.precompressed = entry['encodings']
+    response.response_cache_key = key
+    response[CACHE_HEADER] = 'HIT'
+    return response
+
+
+class ConditionalResponseMixin:
+    """
+    ETag и Last-Modified для list и retrieve по версиям коллекций,
+    без сериализации ответа. If-None-Match и If-Modified-Since отвечают
+    304 до обращения к базе; If-Match при изменении и удалении
+    отвечает 412, если объект уже изменен.
+    Версии - cache_collections, для одного объекта коллекции
+    из cache_object_versions заменяются версией "<коллекция>:<pk>".
+    """
+    cache_collections = ()
+    cache_object_versions = ()
+    cache_vary_on_role = False
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request,
+                                             *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request,
+                                             *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.get_checked_write(super().update, request,
+                                      *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.get_checked_write(super().destroy, request,
+                                      *args, **kwargs)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        versions = self.get_cache_versions()
+        etag = self.get_etag(request, versions)
+        last_modified = get_last_modified(versions)
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.get_response(handler, request, versions,
+                                         *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_response(self, handler, request, versions, *args, **kwargs):
+        return handler(request, *args, **kwargs)
+
+    def get_checked_write(self, handler, request, *args, **kwargs):
+        """Изменение с проверкой If-Match. Строка блокируется до конца
+        транзакции, чтобы два запроса с одним ETag не прошли оба.
+        Новый ETag ставится в ответ только после фиксации.
+        """
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if not if_match:
+            return handler(request, *args, **kwargs)
+        with transaction.atomic():
+            self.lock_object()
+            etag = self.get_etag(request, self.get_cache_versions())
+            etags = [tag[2:] if tag.startswith('W/') else tag
+                     for tag in parse_etags(if_match)]
+            if '*' not in etags and etag not in etags:
+                raise PreconditionFailedError
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                # Версии сдвигаются после фиксации: новый ETag считается
+                # тогда же, после колбэков сдвига версий.
+                transaction.on_commit(lambda: response.__setitem__(
+                    'ETag', self.get_etag(request,
+                                          self.get_cache_versions())
+                ))
+        return response
+
+    def lock_object(self) -> None:
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        model = self.get_queryset().model
+        list(model._default_manager.select_for_update().filter(**{
+            self.lookup_field: self.kwargs[lookup_url_kwarg]
+        }).values_list('pk'))
+
+    @staticmethod
+    def is_not_modified(request, etag: str,
+                        last_modified: float) -> bool:
+        if request.method not in SAFE_METHODS:
+            return False
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [tag[2:] if tag.startswith('W/') else tag
+                     for tag in parse_etags(if_none_match)]
+            return '*' in etags or etag in etags
+        since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return since is not None and int(last_modified) <= since
+
+    def get_cache_version_names(self) -> List[str]:
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if lookup is None:
+            return list(self.cache_collections)
+        names = [name for name in self.cache_collections
+                 if name not in self.cache_object_versions]
+        names.extend(f'{name}:{lookup}'
+                     for name in self.cache_object_versions)
+        return names
+
+    def get_cache_versions(self) -> Dict[str, int]:
+        return get_versions(self.get_cache_version_names())
+
+    def get_cache_raw(self, request, versions: Dict[str, int]) -> str:
+        user = request.user
+        role = ''
+        if self.cache_vary_on_role and user.is_authenticated:
+            role = f'{user.role}:{user.is_superuser}'
+        query = sorted(request.query_params.lists())
+        return f'{request.path}|{query}|{role}|{sorted(versions.items())}'
+
+    def get_etag(self, request, versions: Dict[str, int]) -> str:
+        """Сильный ETag: представление зависит еще от формата ответа."""
+        renderer = getattr(request, 'accepted_media_type', '')
+        raw = f'{self.get_cache_raw(request, versions)}|{renderer}'
+        return '"{}"'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+class CachedResponseMixin(ConditionalResponseMixin):
+    """
+    Кэширование ответов list и retrieve поверх ETag.
+    Ключ строится из пути, параметров запроса, роли пользователя
+    (если cache_vary_on_role), версий коллекций и формата ответа.
+    Ответ JSON хранится готовыми байтами вместе со сжатыми вариантами
+    (их дописывает CompressionMiddleware), попадание не рендерится
+    и не сжимается заново. Остальные форматы хранят данные ответа.
+    """
+
+    def get_response(self, handler, request, versions, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_response_cache_key(request, versions)
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.incr('response_cache.hit')
+            return cached_response(entry, key)
+        metrics.incr('response_cache.miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            if is_json(request):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(key, {
+                        'content': rendered.content,
+                        'content_type': rendered['Content-Type'],
+                        'encodings': {},
+                    }, CACHE_TIMEOUT)
+                )
+                response.response_cache_key = key
+            else:
+                cache.set(key, {'data': response.data}, CACHE_TIMEOUT)
+        response[CACHE_HEADER] = 'MISS'
+        return response
+
+    def get_response_cache_key(self, request,
+                               versions: Dict[str, int]) -> str:
+        renderer = getattr(request, 'accepted_media_type', '')
+        raw = f'{self.get_cache_raw(request, versions)}|{renderer}'
+        return RESPONSE_KEY.format(
+            hashlib.md5(raw.encode('utf-8')).hexdigest()
+        )
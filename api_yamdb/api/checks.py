@@ -0,0 +1,22 @@
+from django.core.checks import Tags, Warning, register
+
+from .cache import CACHE_ALIAS, is_shared_cache
+
+W001: str = 'api.W001'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии коллекций и пользователей должны жить в общем кэше:
+    иначе записи из fillbase, generatebase и других воркеров не сбрасывают
+    закэшированные ответы, ETag и пользователей аутентификации.
+    """
+    if is_shared_cache():
+        return []
+    return [Warning(
+        f'Кэш "{CACHE_ALIAS}" хранит данные в памяти процесса: версии, '
+        'сдвинутые другим процессом, не сбрасывают кэш ответов.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша '
+             '(memcached, база), как в infra/docker-compose.yaml.',
+        id=W001,
+    )]
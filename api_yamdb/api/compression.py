@@ -0,0 +1,146 @@
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from . import metrics
+from .cache import get_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_SIZE: int = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+BROTLI_QUALITY: int = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+ZSTD_LEVEL: int = getattr(settings, 'COMPRESSION_ZSTD_LEVEL', 3)
+COMPRESSIBLE_TYPES: Tuple[str, ...] = (
+    'application/json', 'text/', 'application/javascript',
+)
+CACHE_TIMEOUT: int = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+# Кодировки в порядке предпочтения сервера; brotli и zstd - если
+# установлены их библиотеки.
+CODECS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    CODECS['br'] = lambda content: brotli.compress(content,
+                                                   quality=BROTLI_QUALITY)
+if zstandard is not None:
+    CODECS['zstd'] = lambda content: zstandard.ZstdCompressor(
+        level=ZSTD_LEVEL).compress(content)
+CODECS['gzip'] = compress_string
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Кодировка по Accept-Encoding: наибольший q, при равных -
+    порядок CODECS. * разрешает кодировки, не названные явно.
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    ranked = [(-accepted.get(name, accepted.get('*', 0.0)), index, name)
+              for index, name in enumerate(CODECS)]
+    quality, _, name = min(ranked)
+    return name if quality < 0 else None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    """Сжать и учесть в метриках объем и процессорное время."""
+    started = time.thread_time()
+    compressed = CODECS[encoding](content)
+    cpu_us = int((time.thread_time() - started) * 1000000)
+    metrics.incr(f'compression.{encoding}.responses')
+    metrics.incr('compression.responses')
+    metrics.incr('compression.bytes_in', len(content))
+    metrics.incr('compression.bytes_out', len(compressed))
+    metrics.incr('compression.cpu_us', cpu_us)
+    return compressed
+
+
+def store_compressed(key: str, encoding: str, content: bytes) -> None:
+    """Дописать сжатое тело в запись кэша ответов."""
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None or 'encodings' not in entry:
+        return
+    entry['encodings'][encoding] = content
+    cache.set(key, entry, CACHE_TIMEOUT)
+
+
+def ratio() -> float:
+    bytes_in = metrics.get('compression.bytes_in')
+    return metrics.get('compression.bytes_out') / bytes_in if bytes_in else 0
+
+
+def cpu_ms_per_response() -> float:
+    responses = metrics.get('compression.responses')
+    if not responses:
+        return 0
+    return metrics.get('compression.cpu_us') / responses / 1000
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов по Accept-Encoding: brotli, zstd (если есть
+    библиотеки) или gzip. Сжимаются ответы 200 текстовых типов
+    не короче MIN_SIZE байт. Ответ из кэша ответов приносит уже
+    сжатые тела (precompressed) - повторные попадания не сжимаются
+    заново, а новое сжатие дописывается в запись кэша
+    (response_cache_key). ETag становится слабым: тело другое,
+    данные те же.
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        metrics.register_gauge('compression.ratio', ratio)
+        metrics.register_gauge('compression.cpu_ms_per_response',
+                               cpu_ms_per_response)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        content = getattr(response, 'precompressed', {}).get(encoding)
+        if content is not None:
+            metrics.incr('compression.cached')
+        else:
+            content = compress(response.content, encoding)
+            key = getattr(response, 'response_cache_key', None)
+            if key is not None:
+                store_compressed(key, encoding, content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag', '')
+        if etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
+
+    @staticmethod
+    def is_compressible(response) -> bool:
+        return (not response.streaming
+                and response.status_code == 200
+                and not response.has_header('Content-Encoding')
+                and len(response.content) >= MIN_SIZE
+                and response.get('Content-Type', '').startswith(
+                    COMPRESSIBLE_TYPES))
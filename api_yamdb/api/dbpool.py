@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+from django.db import OperationalError, connections
+
+from . import metrics
+
+MAX_SIZE: int = 10
+TIMEOUT: float = 5.0
+HEALTH_CHECK_IDLE: float = 30.0
+MESSAGE_TIMEOUT: str = ('Нет свободного соединения с базой {}: '
+                        'все {} заняты дольше {} с.')
+
+_pools: Dict[str, 'ConnectionPool'] = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeoutError(OperationalError):
+    """Соединение из пула не освободилось за время ожидания."""
+
+
+def is_healthy(connection) -> bool:
+    """Проверить соединение простым запросом."""
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+def close_quietly(connection) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Пул DB-API соединений процесса для многопоточных воркеров.
+    Соединений не больше max_size; когда все заняты, поток ждет
+    освобождения не дольше timeout секунд. Свободное соединение
+    перед выдачей проверяется запросом SELECT 1.
+    """
+
+    def __init__(self, alias: str, max_size: int = MAX_SIZE,
+                 timeout: float = TIMEOUT):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self.idle = deque()
+        self.condition = threading.Condition()
+
+    def acquire(self, connect: Callable[[], object]):
+        """Выдать свободное соединение или открыть новое через connect.
+        Raises:
+            PoolTimeoutError: Все соединения заняты дольше timeout.
+        """
+        while True:
+            connection = self.take(connect)
+            if connection is not None:
+                return connection
+
+    def take(self, connect: Callable[[], object]):
+        """Одна попытка: None, если выданное соединение не прошло проверку.
+        """
+        with self.condition:
+            deadline = None
+            while not self.idle and self.size >= self.max_size:
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    metrics.incr('db.connections.waits')
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr('db.connections.timeouts')
+                    raise PoolTimeoutError(MESSAGE_TIMEOUT.format(
+                        self.alias, self.max_size, self.timeout
+                    ))
+                self.condition.wait(remaining)
+            if self.idle:
+                connection = self.idle.pop()
+            else:
+                connection = None
+                self.size += 1
+        if connection is None:
+            return self.open(connect)
+        if is_healthy(connection):
+            metrics.incr('db.connections.reused')
+            return connection
+        metrics.incr('db.connections.discarded')
+        self.discard(connection)
+        return None
+
+    def open(self, connect: Callable[[], object]):
+        try:
+            connection = connect()
+        except BaseException:
+            self.forget()
+            raise
+        metrics.incr('db.connections.opened')
+        return connection
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Вернуть соединение в пул. Незавершенная транзакция
+        откатывается; соединение с ошибкой закрывается.
+        """
+        if not discard:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append(connection)
+            self.condition.notify()
+
+    def discard(self, connection) -> None:
+        close_quietly(connection)
+        self.forget()
+
+    def forget(self) -> None:
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close_idle(self) -> None:
+        """Закрыть свободные соединения, например перед fork."""
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection in idle:
+            close_quietly(connection)
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    """Пул базы alias, настройки - из ключа POOL в DATABASES."""
+    pool = _pools.get(alias)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict.get('POOL') or {}
+            pool = ConnectionPool(alias,
+                                  max_size=options.get('MAX_SIZE', MAX_SIZE),
+                                  timeout=options.get('TIMEOUT', TIMEOUT))
+            metrics.register_gauge(f'db.pool.{alias}.size',
+                                   lambda: pool.size)
+            metrics.register_gauge(f'db.pool.{alias}.idle',
+                                   lambda: len(pool.idle))
+            _pools[alias] = pool
+        return _pools[alias]
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Подмешивается к DatabaseWrapper бэкенда: connect() берет
+    соединение из пула, close() возвращает его туда. Вместе с
+    CONN_MAX_AGE = 0 соединение занято только на время запроса.
+    """
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+        return self.pool.acquire(
+            lambda: parent.get_new_connection(conn_params)
+        )
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection,
+                              discard=self.errors_occurred)
+
+
+def mark_idle() -> None:
+    """В конце запроса: запомнить, с какого момента простаивают
+    постоянные соединения потока.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+def check_connections() -> None:
+    """В начале запроса: постоянные соединения (CONN_MAX_AGE > 0)
+    с HEALTH_CHECKS, простоявшие дольше HEALTH_CHECK_IDLE секунд
+    (или неизвестно сколько), проверяются запросом, упавшие
+    закрываются - Django откроет новое при первом обращении.
+    Соединение из только что закончившегося запроса не проверяется.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if (connection.connection is None or connection.in_atomic_block
+                or isinstance(connection, PooledDatabaseWrapperMixin)):
+            continue
+        settings_dict = connection.settings_dict
+        idle_since = getattr(connection, 'idle_since', None)
+        stale = idle_since is None or now - idle_since >= settings_dict.get(
+            'HEALTH_CHECK_IDLE', HEALTH_CHECK_IDLE)
+        if (settings_dict.get('HEALTH_CHECKS') and stale
+                and not connection.is_usable()):
+            metrics.incr('db.connections.discarded')
+            connection.close()
+            continue
+        metrics.incr('db.connections.reused')
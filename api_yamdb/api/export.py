@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import datetime, time
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from rest_framework.exceptions import ValidationError
+from reviews.models import Comment, Review, Title
+
+CHUNK_SIZE: int = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+BUFFER_SIZE: int = 64 * 1024
+TITLE_FIELDS: Tuple[str, ...] = ('id', 'name', 'year', 'description',
+                                 'category', 'genre', 'rating', 'modified')
+INCLUDES: Tuple[str, ...] = ('reviews', 'comments')
+MESSAGE_FIELDS: str = 'Неизвестные поля: {}. Доступны: {}.'
+MESSAGE_SINCE: str = 'Ожидается дата или дата и время в формате ISO 8601.'
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def split_param(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or '').split(',')
+            if part.strip()]
+
+
+def parse_export_params(params) -> Tuple[List[str], object, set]:
+    """Разобрать fields, since и include.
+    Raises:
+        ValidationError: Неизвестные поля или некорректная дата.
+    Returns:
+        Tuple: Поля произведения, нижняя граница modified, вложения.
+    """
+    errors = {}
+    fields = split_param(params.get('fields')) or list(TITLE_FIELDS)
+    unknown = set(fields).difference(TITLE_FIELDS)
+    if unknown:
+        errors['fields'] = MESSAGE_FIELDS.format(sorted(unknown),
+                                                 list(TITLE_FIELDS))
+    include = set(split_param(params.get('include')))
+    if include.difference(INCLUDES):
+        errors['include'] = MESSAGE_FIELDS.format(
+            sorted(include.difference(INCLUDES)), list(INCLUDES)
+        )
+    since = None
+    if params.get('since'):
+        since = parse_since(params['since'])
+        if since is None:
+            errors['since'] = MESSAGE_SINCE
+    if errors:
+        raise ValidationError(errors)
+    if 'comments' in include:
+        include.add('reviews')
+    return fields, since, include
+
+
+def parse_since(value: str):
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                return None
+            since = datetime.combine(date, time.min)
+    except ValueError:
+        return None
+    return make_aware(since) if is_naive(since) else since
+
+
+def chunks(iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def title_genres(title_ids) -> Dict[int, List[dict]]:
+    genres = defaultdict(list)
+    rows = (Title.genre.through.objects.filter(title_id__in=title_ids)
+            .order_by('genre__name')
+            .values_list('title_id', 'genre__name', 'genre__slug'))
+    for title_id, name, slug in rows:
+        genres[title_id].append({'name': name, 'slug': slug})
+    return genres
+
+
+class GroupedRows:
+    """
+    Строки серверного курсора, отсортированные по ключу группы.
+    group(key) отдает подряд идущие строки с ключом key, строки
+    с меньшими ключами пропускаются: ключи запрашиваются по возрастанию
+    в том же порядке. В памяти одна строка.
+    """
+
+    def __init__(self, rows, key) -> None:
+        self.rows = iter(rows)
+        self.key = key
+        self.row = next(self.rows, None)
+
+    def group(self, key) -> Iterator[tuple]:
+        while self.row is not None and self.key(self.row) < key:
+            self.row = next(self.rows, None)
+        while self.row is not None and self.key(self.row) == key:
+            yield self.row
+            self.row = next(self.rows, None)
+
+
+def review_rows(since) -> GroupedRows:
+    """Отзывы по произведениям в порядке (title_id, pub_date, id)."""
+    reviews = Review.objects.order_by('title_id', 'pub_date', 'id')
+    if since is not None:
+        reviews = reviews.filter(title__modified__gte=since)
+    return GroupedRows(
+        reviews.values_list('title_id', 'pub_date', 'id', 'author__username',
+                            'text', 'score').iterator(chunk_size=CHUNK_SIZE),
+        key=itemgetter(0)
+    )
+
+
+def comment_rows(since) -> GroupedRows:
+    """Комментарии в порядке отзывов, ключ - (title_id, pub_date, id)
+    отзыва.
+    """
+    # F(): по имени связи Django отсортировал бы по Meta.ordering Title.
+    comments = Comment.objects.order_by(F('review__title_id').asc(),
+                                        'review__pub_date', 'review_id',
+                                        'pub_date', 'id')
+    if since is not None:
+        comments = comments.filter(review__title__modified__gte=since)
+    return GroupedRows(
+        comments.values_list('review__title_id', 'review__pub_date',
+                             'review_id', 'id', 'author__username', 'text',
+                             'pub_date').iterator(chunk_size=CHUNK_SIZE),
+        key=itemgetter(0, 1, 2)
+    )
+
+
+def review_parts(title_id, reviews: GroupedRows,
+                 comments: Optional[GroupedRows]) -> Iterator[str]:
+    """Массив отзывов произведения по частям: отзыв или комментарий
+    за раз, даже у произведения с сотнями тысяч отзывов.
+    """
+    yield '['
+    separator = ''
+    for key_title, pub_date, review_id, author, text, score in (
+            reviews.group(title_id)):
+        review = encoder.encode({'id': review_id, 'author': author,
+                                 'text': text, 'score': score,
+                                 'pub_date': pub_date})
+        if comments is None:
+            yield separator + review
+        else:
+            yield f'{separator}{review[:-1]}, "comments": ['
+            comment_separator = ''
+            for *_, comment_id, author, text, comment_date in (
+                    comments.group((key_title, pub_date, review_id))):
+                yield comment_separator + encoder.encode({
+                    'id': comment_id, 'author': author, 'text': text,
+                    'pub_date': comment_date,
+                })
+                comment_separator = ', '
+            yield ']}'
+        separator = ', '
+    yield ']'
+
+
+def buffered(parts: Iterator[str], size: int) -> Iterator[str]:
+    """Склеить мелкие части ответа в куски не меньше size символов."""
+    buffer = []
+    length = 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def title_row(title, fields, genres) -> dict:
+    row = {}
+    for field in fields:
+        if field == 'category':
+            category = title.category
+            row[field] = category and {'name': category.name,
+                                       'slug': category.slug}
+        elif field == 'genre':
+            row[field] = genres.get(title.pk, [])
+        else:
+            row[field] = getattr(title, field)
+    return row
+
+
+def export_titles(fields, since=None, include=()) -> Iterator[str]:
+    """Строки NDJSON с произведениями, по одной на произведение.
+    Произведения читаются серверным курсором пакетами по CHUNK_SIZE,
+    жанры - одним запросом на пакет. Отзывы и комментарии идут своими
+    курсорами в порядке произведений и сливаются с ними, строка
+    с отзывами пишется по частям: в памяти пакет произведений
+    и по одной строке отзывов и комментариев, сколько бы отзывов
+    ни было у произведения.
+    """
+    return buffered(title_parts(fields, since, include), BUFFER_SIZE)
+
+
+def title_parts(fields, since, include) -> Iterator[str]:
+    titles = Title.objects.select_related('category').order_by('id')
+    if since is not None:
+        titles = titles.filter(modified__gte=since)
+    reviews = comments = None
+    if 'reviews' in include:
+        reviews = review_rows(since)
+    if 'comments' in include:
+        comments = comment_rows(since)
+    for chunk in chunks(titles.iterator(chunk_size=CHUNK_SIZE), CHUNK_SIZE):
+        ids = [title.pk for title in chunk]
+        genres = title_genres(ids) if 'genre' in fields else {}
+        for title in chunk:
+            row = encoder.encode(title_row(title, fields, genres))
+            if reviews is None:
+                yield row + '\n'
+                continue
+            yield row[:-1] + ', "reviews": '
+            yield from review_parts(title.pk, reviews, comments)
+            yield '}\n'
@@ -0,0 +1,179 @@
+from collections import defaultdict
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+from reviews.models import Title
+
+from .serializers import (CategorySerializer, CommentSerializer,
+                          GenreSerializer, ReviewSerializer,
+                          TitleListSerializer)
+
+FAST_LISTS: bool = getattr(settings, 'FAST_LIST_SERIALIZERS', True)
+# Поля, значение которых из .values() уже совпадает с выводом DRF.
+PASSTHROUGH_FIELDS: Tuple[type, ...] = (
+    serializers.CharField, serializers.IntegerField,
+    serializers.SlugRelatedField,
+)
+
+
+class RowRenderer:
+    """
+    Вывод списка только для чтения без экземпляров моделей:
+    словари ответа собираются из строк .values() заранее
+    скомпилированными функциями полей. Порядок ключей и значения
+    берутся из serializer_class, поэтому JSON совпадает побайтно.
+    Поле с методом get_<имя> вычисляется им по столбцам requires[имя],
+    остальные читаются из столбца lookups.get(имя, имя) и, если нужно,
+    приводятся to_representation поля DRF. fields - подмножество
+    полей ответа: читаются только их столбцы.
+    """
+    serializer_class = None
+    lookups: Dict[str, str] = {}
+    requires: Dict[str, Tuple[str, ...]] = {}
+
+    def __init__(self, fields: Optional[Sequence[str]] = None) -> None:
+        selected = [(name, field) for name, field
+                    in self.serializer_class().fields.items()
+                    if fields is None or name in fields]
+        self.names = [name for name, _ in selected]
+        self.columns: List[str] = []
+        for name in self.names:
+            if hasattr(self, f'get_{name}'):
+                columns = self.requires.get(name, ())
+            else:
+                columns = (self.lookups.get(name, name),)
+            self.columns.extend(column for column in columns
+                                if column not in self.columns)
+        self.plan: List[Tuple[str, Callable[[dict], object]]] = [
+            (name, self.compile(name, field)) for name, field in selected
+        ]
+
+    def compile(self, name: str, field) -> Callable[[dict], object]:
+        getter = getattr(self, f'get_{name}', None)
+        if getter is not None:
+            return getter
+        get = itemgetter(self.lookups.get(name, name))
+        if type(field) in PASSTHROUGH_FIELDS:
+            return get
+        convert = field.to_representation
+
+        def get_converted(row):
+            value = get(row)
+            return None if value is None else convert(value)
+
+        return get_converted
+
+    def values(self, queryset, ordering=()):
+        """Строки для пагинации: столбцы ответа и поля сортировки."""
+        columns = list(self.columns)
+        columns.extend(field for field in ordering if field not in columns)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def prepare(self, rows: List[dict]) -> None:
+        """Дописать в строки страницы связи, загруженные отдельно."""
+
+    def render(self, rows) -> List[dict]:
+        rows = list(rows)
+        self.prepare(rows)
+        return self.build(rows)
+
+    def build(self, rows: List[dict]) -> List[dict]:
+        """Словари ответа, без запросов к базе."""
+        plan = self.plan
+        return [{name: get(row) for name, get in plan} for row in rows]
+
+
+class TitleRowRenderer(RowRenderer):
+    serializer_class = TitleListSerializer
+    requires = {
+        'rating': ('score_sum', 'review_count'),
+        'genre': ('id',),
+        'category': ('category', 'category__name', 'category__slug'),
+    }
+
+    def __init__(self, fields: Optional[Sequence[str]] = None) -> None:
+        super().__init__(fields)
+        self.genre_fields = list(GenreSerializer().fields)
+        self.category_fields = list(CategorySerializer().fields)
+
+    def prepare(self, rows: List[dict]) -> None:
+        """Жанры страницы одним запросом в порядке prefetch_related:
+        по сортировке модели жанра.
+        """
+        if 'genre' not in self.names:
+            return
+        genres = defaultdict(list)
+        ordering = [
+            '{}genre__{}'.format('-' * field.startswith('-'),
+                                 field.lstrip('-'))
+            for field in Title.genre.field.related_model._meta.ordering
+        ]
+        lookups = [f'genre__{field}' for field in self.genre_fields]
+        links = (Title.genre.through.objects
+                 .filter(title_id__in=[row['id'] for row in rows])
+                 .order_by(*ordering).values_list('title_id', *lookups))
+        for title_id, *values in links:
+            genres[title_id].append(dict(zip(self.genre_fields, values)))
+        for row in rows:
+            row['genre'] = genres.get(row['id'], [])
+
+    def get_rating(self, row: dict) -> Optional[float]:
+        if not row['review_count']:
+            return None
+        return row['score_sum'] / row['review_count']
+
+    def get_genre(self, row: dict) -> List[dict]:
+        return row['genre']
+
+    def get_category(self, row: dict) -> Optional[dict]:
+        if row['category'] is None:
+            return None
+        return {field: row[f'category__{field}']
+                for field in self.category_fields}
+
+
+class ReviewRowRenderer(RowRenderer):
+    serializer_class = ReviewSerializer
+    lookups = {'author': 'author__username'}
+
+
+class CommentRowRenderer(RowRenderer):
+    serializer_class = CommentSerializer
+    lookups = {'author': 'author__username'}
+
+
+class FastListMixin:
+    """
+    list через RowRenderer (row_renderer_class), если включен
+    FAST_LIST_SERIALIZERS. Фильтры, пагинация и кэш ответов
+    работают как прежде, меняется только сборка словарей.
+    Поля ответа - context['fields'] сериализатора, как у DRF.
+    """
+    row_renderer_class = None
+    _row_renderers: Dict[tuple, RowRenderer] = {}
+
+    def get_row_renderer(self) -> Optional[RowRenderer]:
+        if not FAST_LISTS or self.row_renderer_class is None:
+            return None
+        fields = self.get_serializer_context().get('fields')
+        key = (self.row_renderer_class, fields)
+        renderer = self._row_renderers.get(key)
+        if renderer is None:
+            renderer = self.row_renderer_class(fields)
+            self._row_renderers[key] = renderer
+        return renderer
+
+    def list(self, request, *args, **kwargs):
+        renderer = self.get_row_renderer()
+        if renderer is None:
+            return super().list(request, *args, **kwargs)
+        ordering = [field.lstrip('-') for field in self.cursor_ordering]
+        rows = renderer.values(self.filter_queryset(self.get_queryset()),
+                               ordering)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(renderer.render(page))
+        return Response(renderer.render(rows))
@@ -1,25 +1,65 @@
+from typing import List, Optional
+
 import django_filters
-from reviews.models import Title
+from rest_framework.filters import OrderingFilter
+from reviews.models import Category, Genre, Title
+from reviews.search import search_titles
 
 
 class TitlesFilter(django_filters.FilterSet):
     """
-    Фильтрация произведений по имени, категории, жанру или году
+    Фильтрация произведений по имени, категории, жанру или году,
+    полнотекстовый поиск по названию и описанию с ранжированием
     """
     name = django_filters.CharFilter(
         field_name='name',
         lookup_expr='contains'
     )
-    category = django_filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='contains'
+    category = django_filters.CharFilter(method='filter_category')
+    genre = django_filters.CharFilter(method='filter_genre')
 
-    )
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='contains'
-    )
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'genre', 'category', 'year')
+        fields = ('name', 'genre', 'category', 'year', 'search')
+
+    # Вхождение в слаг индексом не найти, поэтому сначала подзапросом
+    # выбираются id категорий и жанров, а произведения ищутся по ним
+    # индексами (category_id, ...) и (genre_id, title_id).
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category__in=Category.objects.filter(
+            slug__contains=value
+        ).values('pk'))
+
+    def filter_genre(self, queryset, name, value):
+        return queryset.filter(pk__in=Title.genre.through.objects.filter(
+            genre__in=Genre.objects.filter(
+                slug__contains=value).values('pk')
+        ).values('title_id'))
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+class TitlesOrderingFilter(OrderingFilter):
+    """
+    Сортировка произведений ?ordering=rating|year|name, с минусом -
+    по убыванию. rating сортируется по сохраненному полю avg_score,
+    порядок дополняется id: так он однозначен для курсоров и совпадает
+    с индексами (поле, id).
+    """
+    fields_map = {'rating': 'avg_score'}
+
+    def get_ordering(self, request, queryset, view) -> Optional[List[str]]:
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        fields = []
+        for term in ordering:
+            name = term.lstrip('-')
+            prefix = term[:len(term) - len(name)]
+            fields.append(prefix + self.fields_map.get(name, name))
+        if not any(field.lstrip('-') == 'id' for field in fields):
+            fields.append('-id' if fields[-1].startswith('-') else 'id')
+        return fields
@@ -1,24 +1,103 @@
-import contextlib
 import csv
+import gzip
+import json
 import os
-from typing import Dict, List
+import threading
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Set, Tuple
 
 from django.apps import apps
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from ...cache import bump_version
 
 PATH: str = os.path.join('static', 'data')
 FILE_EXT: str = '.csv'
+GZIP_EXT: str = '.gz'
+BATCH_SIZE: int = 5000
+PROGRESS_INTERVAL: float = 1.0
 APPS_MODELS: dict = {model.__name__.lower(): model
                      for model in apps.get_models(include_auto_created=True)}
 
 
-def change_key_name(key):
-    """Подменить значение ключа для user."""
-    name = ['author', 'user']
-    try:
-        name.remove(key)
-    except ValueError:
-        return key
-    return name[0]
+def open_csv(path, mode='r', compress=None):
+    """Открыть csv. Сжатие gzip определяется по расширению .gz,
+    если не указано явно.
+    """
+    if compress is None:
+        compress = path.endswith(GZIP_EXT)
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def table_name(file_name) -> str:
+    """Имя таблицы по имени файла: title.csv или title.csv.gz."""
+    for ext in (FILE_EXT + GZIP_EXT, FILE_EXT):
+        if file_name.endswith(ext):
+            return file_name[:-len(ext)]
+    return ''
+
+
+def refresh_derived_data(models, stdout, rating=True) -> None:
+    """bulk-вставки не вызывают сигналы моделей: после загрузки
+    сдвинуть счетчики id, пересчитать рейтинги (если rating),
+    поисковый индекс и сводки, сбросить кэш ответов.
+    """
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    if rating:
+        call_command('rebuildrating', verbosity=0, stdout=stdout)
+    call_command('rebuildsearch', stdout=stdout)
+    call_command('rebuildstats', stdout=stdout)
+    bump_version('category', 'genre', 'title')
+
+
+class RelatedRowNotFoundError(Exception):
+    """В строке csv ссылка на запись, которой нет в связанной таблице."""
+
+
+class Checkpoint():
+    """Прогресс импорта по таблицам в json-файле: сколько строк
+    каждой таблицы уже закоммичено и закончена ли таблица.
+    """
+
+    def __init__(self, path, resume=True) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.data: Dict[str, dict] = self.load() if resume else {}
+
+    def load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def rows_done(self, table) -> int:
+        return self.data.get(table, {}).get('rows', 0)
+
+    def is_done(self, table) -> bool:
+        return self.data.get(table, {}).get('done', False)
+
+    def save(self, table, rows, done=False) -> None:
+        """Записать прогресс таблицы атомарной заменой файла."""
+        with self.lock:
+            self.data[table] = {'rows': rows, 'done': done}
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.data, file)
+            os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        with self.lock:
+            self.data = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
 
 
 class File():
@@ -27,15 +106,23 @@ class File():
                                'отличается. Используйте {}.')
     MESSAGE_SUCCESS: str = ('Данные файла {}.csv успешно занесены в базу. '
                             'Заполнено {} строк.')
+    MESSAGE_PROGRESS: str = ('Файл {}.csv: записано {} строк, '
+                             '{:.0f} строк/с.')
 
-    def __init__(self, file_name) -> None:
+    def __init__(self, file_name, batch_size=BATCH_SIZE,
+                 checkpoint=None) -> None:
         self.file_name = file_name
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
 
     @property
     def get_file_path(self) -> str:
-        """Получить путь до файла.
+        """Получить путь до файла, несжатый csv в приоритете.
         """
-        return os.path.join(PATH, self.file_name + FILE_EXT)
+        path = os.path.join(PATH, self.file_name + FILE_EXT)
+        if not os.path.exists(path) and os.path.exists(path + GZIP_EXT):
+            return path + GZIP_EXT
+        return path
 
     @property
     def get_table(self) -> object:
@@ -58,118 +145,150 @@ class File():
         return [f.name for f in table_model._meta.fields
                 if f.__class__.__name__ == 'ForeignKey']
 
-    def open_read_save_file_for_simple_table(self) -> List[str]:
-        """Открыть файл и записать его в таблицу без связей.
+    @property
+    def get_related_tables(self) -> List[str]:
+        """Получить имена таблиц, на которые ссылается таблица.
         """
-        with open(self.get_file_path, 'r', encoding="utf-8") as csvfile:
+        table_model = self.get_table
+        return [f.related_model.__name__.lower()
+                for f in table_model._meta.fields
+                if f.__class__.__name__ == 'ForeignKey']
+
+    def open_read_save_file(self) -> int:
+        """Открыть файл и записать его в таблицу, пропустив строки,
+        уже записанные по контрольной точке.
+        Raises:
+            RelatedRowNotFoundError: Нет записи, на которую ссылается строка.
+        Returns:
+            int: Количество строк файла в таблице.
+        """
+        with open_csv(self.get_file_path) as csvfile:
             rows = csv.reader(csvfile, delimiter=',')
             field_name = next(rows)
-            count = self.save_by_simple_rows(rows, field_name)
+            skip = 0
+            if self.checkpoint is not None:
+                skip = self.checkpoint.rows_done(self.file_name)
+            rows = islice(rows, skip, None)
+            count = self.save_rows(rows, field_name,
+                                   self.get_related_ids(field_name), skip)
             print(self.MESSAGE_SUCCESS.format(self.file_name, count))
+        return count
 
-    def open_read_save_file_for_ralated_table(self,
-                                              unrecorded_files
-                                              ) -> List[str]:
-        """Открыть файл и записать его в таблицу
+    def get_related_ids(self, field_name
+                        ) -> Dict[str, Tuple[str, Set[int]]]:
+        """Загрузить id связанных таблиц один раз на файл.
         Args:
-            unrecorded_files (list): Пустой список
+            field_name (list): Заголовок csv, столбец связи называется
+            как поле (author) или как столбец таблицы (title_id).
         Returns:
-            List[str]: Список файлов, которые не были записаны в таблицы.
+            Dict[str, Tuple[str, Set[int]]]: Столбец csv -
+            (столбец таблицы, множество существующих id).
         """
-        with open(self.get_file_path, 'r', encoding="utf-8") as csvfile:
-            rows = csv.reader(csvfile, delimiter=',')
-            field_name = next(rows)
-            data = self.save_by_related_rows(rows, field_name)
-            check_recorded_row = data['check']
-            if False not in check_recorded_row:
-                print(self.MESSAGE_SUCCESS.format(self.file_name,
-                                                  data['row_done']))
-            else:
-                unrecorded_files.append(self.file_name)
-        return unrecorded_files
-
-    def save_by_simple_rows(self, rows, field_name) -> dict:
-        """Построчная запись в таблицу.
+        related = {}
+        ids_by_model = {}
+        for field in self.get_table._meta.fields:
+            if not field.is_relation:
+                continue
+            for column in (field.name, field.attname):
+                if column not in field_name:
+                    continue
+                model = field.related_model
+                if model not in ids_by_model:
+                    ids_by_model[model] = set(
+                        model.objects.values_list('pk', flat=True)
+                    )
+                related[column] = (field.attname, ids_by_model[model])
+        return related
+
+    def save_rows(self, rows, field_name, related, skip=0) -> int:
+        """Записать строки пакетами по batch_size через bulk_create,
+        печатая скорость записи. Каждый пакет - отдельная транзакция,
+        после нее прогресс сохраняется в контрольную точку.
         Raises:
             TypeError: В csv есть столбец,
             название которого не совпадает с табличными столбцами.
-        Returns:
-            List[bool]: Контрольный список - удачно ли прошла запись строки.
         """
-        count = 0
-        for row in rows:
-            values_for_save: Dict[str, str] = dict(zip(field_name, row))
+        columns = [related[name][0] if name in related else name
+                   for name in field_name]
+        checks = [(index, related[name][1])
+                  for index, name in enumerate(field_name)
+                  if name in related]
+        nullable = self.get_nullable_indexes(field_name)
+        table = self.get_table
+        count = skip
+        started = reported = time.monotonic()
+        for number, batch in enumerate(self.read_batches(rows, checks,
+                                                         nullable)):
             try:
-                data = self.get_table(**values_for_save)
-            except ValueError:
-                pass
+                objects = [table(**dict(zip(columns, row)))
+                           for row in batch]
             except TypeError as e:
                 raise TypeError(self.MESSAGE_TYPE_ERROR.format(
                     self.file_name,
                     self.get_table_all_fields
                 )) from e
-            data.save()
-            count += 1
+            if not number and self.checkpoint is not None:
+                objects = self.drop_existing(objects)
+            with transaction.atomic():
+                table.objects.bulk_create(objects)
+            count += len(batch)
+            if self.checkpoint is not None:
+                self.checkpoint.save(self.file_name, count)
+            if time.monotonic() - reported >= PROGRESS_INTERVAL:
+                reported = time.monotonic()
+                self.print_progress(count - skip, reported - started)
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.file_name, count, done=True)
+        self.print_progress(count - skip, time.monotonic() - started)
         return count
 
-    def save_by_related_rows(self, rows, field_name) -> dict:
-        """Построчная запись в таблицу.
-        Raises:
-            TypeError: В csv есть столбец,
-            название которого не совпадает с табличными столбцами.
-        Returns:
-            List[bool]: Контрольный список - удачно ли прошла запись строки.
+    def drop_existing(self, objects) -> list:
+        """Убрать из пакета строки, уже записанные в таблицу: пакет мог
+        закоммититься до сохранения контрольной точки.
         """
-        check_recorded_row = []
-        count = 0
-        for row in rows:
-            record_flag = True
-            values_for_save = (
-                self.save_by_rows_related_from_another_table(
-                    dict(zip(field_name, row))
-                )
-            )
-            try:
-                data = self.get_table(**values_for_save)
-            except ValueError:
-                pass
-            except TypeError as e:
-                raise TypeError(self.MESSAGE_TYPE_ERROR.format(
-                    self.file_name,
-                    self.get_table_all_fields
-                )) from e
-            try:
-                data.save()
-                count += 1
-            except Exception:
-                record_flag = False
-            check_recorded_row.append(record_flag)
-            data = {
-                'check': check_recorded_row,
-                'row_done': count
-            }
-        return data
-
-    def save_by_rows_related_from_another_table(self,
-                                                values_for_save
-                                                ) -> Dict[str, object]:
-        """Построчная запись в таблицу для таблиц с related_field
-        Args:
-            values_for_save (_type_): Данные,
-            которые не имеют ссылочных объектов.
-        Returns:
-            Dict[str, object]: Измененные данные,
-            в которых вместо строки объект.
+        ids = [obj.pk for obj in objects if obj.pk is not None]
+        existing = set(self.get_table.objects.filter(
+            pk__in=ids).values_list('pk', flat=True))
+        return [obj for obj in objects
+                if obj.pk is None or int(obj.pk) not in existing]
+
+    def print_progress(self, count, elapsed) -> None:
+        print(self.MESSAGE_PROGRESS.format(
+            self.file_name, count, count / elapsed if elapsed else 0
+        ))
+
+    def get_nullable_indexes(self, field_name) -> List[int]:
+        """Столбцы csv, пустое значение которых означает NULL:
+        nullable поля, кроме строковых.
+        """
+        fields = {field.name: field for field in self.get_table._meta.fields}
+        return [index for index, name in enumerate(field_name)
+                if name in fields and fields[name].null
+                and fields[name].get_internal_type() not in (
+                    'CharField', 'TextField')]
+
+    def read_batches(self, rows, checks,
+                     nullable=()) -> Iterator[List[list]]:
+        """Читать строки csv пакетами, подставляя id связей и NULL.
+        Raises:
+            RelatedRowNotFoundError: Нет записи, на которую ссылается строка.
         """
-        for key, value in values_for_save.items():
-            if key in self.get_table_related_fields:
-                key = change_key_name(key)
-                table_related = APPS_MODELS[key]
-                with contextlib.suppress(table_related.DoesNotExist):
-                    value = table_related.objects.get(id=value)
-                key = change_key_name(key)
-            values_for_save[key] = value
-        return values_for_save
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            for row in batch:
+                for index in nullable:
+                    if row[index] == '':
+                        row[index] = None
+                for index, ids in checks:
+                    if not row[index]:
+                        row[index] = None
+                    elif int(row[index]) in ids:
+                        row[index] = int(row[index])
+                    else:
+                        raise RelatedRowNotFoundError(row)
+            yield batch
 
     def __str__(self) -> str:
         return self.file_name
@@ -0,0 +1,123 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...benchmark import SCENARIOS, compare, dump, run_benchmark
+
+ROWS: int = 1000
+REQUESTS: int = 200
+CONCURRENCY: int = 4
+WARMUP: int = 10
+MESSAGE_UNKNOWN: str = 'Сценариев {} нет. Используйте имена - {}.'
+MESSAGE_SCENARIO: str = ('{name:<16} {throughput_rps:>9.1f} зап/с  '
+                         'p50 {p50:>7.2f}  p95 {p95:>7.2f}  '
+                         'p99 {p99:>7.2f} мс  SQL {queries_per_request:>5.1f}'
+                         '  ошибок {errors}')
+MESSAGE_CHANGE: str = ('{name:<16} зап/с {throughput_rps:+.1f}%  '
+                       'p95 {p95_ms:+.1f}%  SQL {queries_per_request:+.1f}%')
+MESSAGE_SERIALIZATION: str = ('{name:<16} DRF {drf_us_per_item:>8.1f}  '
+                              'быстрый {fast_us_per_item:>8.1f}  '
+                              'экономия {saved_us_per_item:>8.1f} мкс/объект')
+MESSAGE_SAVED: str = 'Отчет сохранен в {}.'
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон основных эндпоинтов в процессе: '
+            'пропускная способность, p50/p95/p99 и SQL на запрос. '
+            'Данные засеиваются в отдельную тестовую базу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios',
+            nargs='*',
+            help='Сценарии, по умолчанию все.'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=ROWS,
+            help='Количество произведений в засеянных данных.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=REQUESTS,
+            help='Количество учитываемых запросов на сценарий.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=CONCURRENCY,
+            help='Количество потоков, на SQLite всегда 1.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=WARMUP,
+            help='Неучитываемые запросы перед каждым сценарием.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора данных.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для отчета JSON.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Отчет JSON прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять тестовую базу после прогона.'
+        )
+
+    def handle(self, *args, **options):
+        """Создать тестовую базу, засеять ее и прогнать сценарии.
+        Raises:
+            CommandError: Запрошены сценарии, которых нет.
+        """
+        names = [scenario.name for scenario in SCENARIOS]
+        unknown = set(options['scenarios']).difference(names)
+        if unknown:
+            raise CommandError(MESSAGE_UNKNOWN.format(sorted(unknown),
+                                                      names))
+        concurrency = options['concurrency']
+        if connection.vendor == 'sqlite':
+            concurrency = 1
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            report = run_benchmark(
+                options['rows'], options['requests'], max(concurrency, 1),
+                options['warmup'], options['seed'], options['scenarios']
+            )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+        self.write_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(dump(report) + '\n')
+            self.stdout.write(MESSAGE_SAVED.format(options['output']))
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                base = json.load(file)
+            for name, change in compare(base, report).items():
+                self.stdout.write(MESSAGE_CHANGE.format(name=name, **change))
+
+    def write_report(self, report) -> None:
+        for name, result in report['scenarios'].items():
+            self.stdout.write(MESSAGE_SCENARIO.format(
+                name=name, **result, **result['latency_ms']
+            ))
+        for name, result in report['serialization'].items():
+            self.stdout.write(MESSAGE_SERIALIZATION.format(name=name,
+                                                           **result))
@@ -0,0 +1,181 @@
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ._models import APPS_MODELS, BATCH_SIZE, FILE_EXT, GZIP_EXT, open_csv
+
+WORKERS: int = 4
+APP_LABELS: Tuple[str, ...] = ('reviews', 'users')
+# Производные данные: пересчитываются fillbase после загрузки.
+SKIP_TABLES: Tuple[str, ...] = ('titlesearchterm', 'emailoutbox',
+                                'categorystats', 'genrestats')
+SKIP_FIELDS: Tuple[str, ...] = ('score_sum', 'review_count', 'avg_score')
+# Пароли, права и служебные поля пользователей не выгружаются:
+# только столбцы user.csv, которые читает fillbase, в том же порядке.
+TABLE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'user': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+             'last_name'),
+}
+# Связи, столбец которых в csv называется как поле, а не title_id.
+FIELD_COLUMNS: Tuple[str, ...] = ('author', 'category')
+MESSAGE_UNKNOWN: str = ('Таблиц {} нет. Используйте имена - {}.')
+MESSAGE_PUBLIC: str = ('Папка {} внутри STATIC_ROOT раздается nginx '
+                       'публично: выберите другую.')
+MESSAGE_SUCCESS: str = ('Таблица {} выгружена в {}: {} строк, '
+                        '{:.0f} строк/с.')
+
+
+class Command(BaseCommand):
+    help = ('Команда для выгрузки таблиц в .csv в формате fillbase.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables',
+            nargs='*',
+            help='Таблицы для выгрузки, по умолчанию все таблицы проекта.'
+        )
+        parser.add_argument(
+            '--output',
+            required=True,
+            help='Папка для файлов, не внутри STATIC_ROOT.'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы (.csv.gz, fillbase читает их).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном запросе.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=WORKERS,
+            help='Количество таблиц, выгружаемых одновременно.'
+        )
+
+    def handle(self, *args, **options):
+        """Выгрузить таблицы параллельно, каждую - пакетами по
+        возрастанию первичного ключа, без загрузки таблицы в память.
+        Файл пишется во временный и заменяется целиком.
+        Raises:
+            CommandError: Запрошены таблицы, которых нет, или папка
+            раздается как статика.
+        """
+        tables = self.get_tables(options['tables'])
+        self.check_output(options['output'])
+        os.makedirs(options['output'], exist_ok=True)
+        self.batch_size = options['batch_size']
+        self.compress = options['gzip']
+        self.ext = FILE_EXT + GZIP_EXT if self.compress else FILE_EXT
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            workers = 1
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = [executor.submit(self.dump_table, table,
+                                       options['output'])
+                       for table in tables]
+        for future in futures:
+            self.stdout.write(MESSAGE_SUCCESS.format(*future.result()))
+
+    @staticmethod
+    def get_tables(names) -> List[str]:
+        default = [name for name, model in APPS_MODELS.items()
+                   if model._meta.app_label in APP_LABELS
+                   and name not in SKIP_TABLES]
+        if not names:
+            return default
+        unknown = set(names).difference(APPS_MODELS)
+        if unknown:
+            raise CommandError(MESSAGE_UNKNOWN.format(sorted(unknown),
+                                                      default))
+        return names
+
+    @staticmethod
+    def check_output(output) -> None:
+        static_root = os.path.realpath(settings.STATIC_ROOT)
+        path = os.path.realpath(output)
+        if os.path.commonpath([static_root, path]) == static_root:
+            raise CommandError(MESSAGE_PUBLIC.format(output))
+
+    @staticmethod
+    def get_columns(model) -> Tuple[List[str], List[str]]:
+        """Столбцы csv и соответствующие им столбцы таблицы.
+        Returns:
+            Tuple[List[str], List[str]]: Заголовок csv, поля для выборки.
+        """
+        header, fields = [], []
+        names = TABLE_FIELDS.get(model._meta.model_name)
+        concrete = (model._meta.concrete_fields if names is None
+                    else [model._meta.get_field(name) for name in names])
+        for field in concrete:
+            if field.name in SKIP_FIELDS:
+                continue
+            if field.is_relation and field.name not in FIELD_COLUMNS:
+                header.append(field.attname)
+            else:
+                header.append(field.name)
+            fields.append(field.attname)
+        return header, fields
+
+    def read_rows(self, model, fields) -> Iterator[tuple]:
+        """Строки таблицы пакетами по pk: каждый пакет - отдельный
+        запрос с условием pk > последний выгруженный.
+        """
+        queryset = model._default_manager.order_by('pk').values_list(
+            'pk', *fields
+        )
+        last_pk = None
+        while True:
+            batch = queryset
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch[:self.batch_size])
+            for row in batch:
+                yield row[1:]
+            if len(batch) < self.batch_size:
+                return
+            last_pk = batch[-1][0]
+
+    def dump_table(self, table, output) -> Tuple[str, str, int, float]:
+        """Выгрузка одной таблицы в отдельном потоке со своим соединением.
+        """
+        model = APPS_MODELS[table]
+        header, fields = self.get_columns(model)
+        path = os.path.join(output, table + self.ext)
+        tmp_path = f'{path}.tmp'
+        count = 0
+        started = time.monotonic()
+        try:
+            with open_csv(tmp_path, 'w', compress=self.compress) as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                for row in self.read_rows(model, fields):
+                    writer.writerow(self.format_row(row))
+                    count += 1
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+        # fillbase предпочтет несжатый файл: старый файл другого формата
+        # не должен подменить свежую выгрузку.
+        other = path[:-len(GZIP_EXT)] if self.compress else path + GZIP_EXT
+        if os.path.exists(other):
+            os.remove(other)
+        elapsed = time.monotonic() - started
+        return table, path, count, count / elapsed if elapsed else 0
+
+    @staticmethod
+    def format_row(row) -> list:
+        return ['' if value is None
+                else value.isoformat() if hasattr(value, 'isoformat')
+                else value
+                for value in row]
@@ -1,10 +1,16 @@
 import os
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
-from ._models import APPS_MODELS, FILE_EXT, PATH, File
+from ._models import (APPS_MODELS, BATCH_SIZE, PATH, Checkpoint, File,
+                      RelatedRowNotFoundError, refresh_derived_data,
+                      table_name)
 
+CHECKPOINT_FILE: str = '.fillbase_checkpoint.json'
+WORKERS: int = 4
 MESSAGE_VALUE_ERROR: str = ('В папке {} есть файлы - {}, '
                             'для которых нет таблиц. '
                             'Используйте имена - {}.')
@@ -12,25 +18,57 @@ MESSAGE_EXCEPTION: str = ('В таблице {} есть некорректны
                           'которые никуда не ссылаются. '
                           'Проверьте csv.')
 MESSAGE_COMMAND_ERROR: str = ('В папке {} нет файлов для импорта.')
+MESSAGE_CYCLE_ERROR: str = ('Таблицы {} ссылаются друг на друга, '
+                            'порядок импорта не определить.')
+MESSAGE_SKIP: str = ('Файл {}.csv уже импортирован '
+                     '(контрольная точка), пропускаем.')
 
 
 class Command(BaseCommand):
     help = ('Команда для импорта .csv в базу данных. ')
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном INSERT.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=WORKERS,
+            help='Количество таблиц, импортируемых одновременно.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Не продолжать прерванный импорт, начать заново.'
+        )
+
     def handle(self, *args, **options):
-        """Распределить таблицы на зависимые и простые,
-        Установить в необходимом порядке, для создания related связей.
+        """Построить порядок импорта по ForeignKey моделей
+        и загружать таблицы одного уровня параллельно.
+        Прогресс сохраняется в контрольную точку: прерванный импорт
+        продолжается с последнего записанного пакета.
         Raises:
-            Exception: Выйти из цикла, если есть данные,
-            которые не могут быть установлены по причине
-            полного отсутствия ссылки в related таблицах.
+            CommandError: Есть данные, которые не могут быть установлены
+            по причине отсутствия ссылки в related таблицах.
             (Ошибка при заполнении csv оператором)
         """
+        self.batch_size = options['batch_size']
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            # sqlite пишет в один поток, параллельные записи упрутся
+            # в блокировку базы.
+            workers = 1
         files_names = self.files_is_exists_and_file_name_is_done()
-        data = self.distribute_files(files_names)
-        if len(data['simple']):
-            self.save_files_not_related(data['simple'])
-        self.save_files_with_related(data['related'])
+        checkpoint = Checkpoint(os.path.join(PATH, CHECKPOINT_FILE),
+                                resume=not options['restart'])
+        for level in self.get_import_levels(files_names):
+            self.save_files_level(level, checkpoint, workers)
+        self.refresh_derived_data(files_names)
+        checkpoint.remove()
 
     def files_is_exists_and_file_name_is_done(self) -> list:
         """Проверяем наличие файлов и корректности их имен.
@@ -40,8 +78,8 @@ class Command(BaseCommand):
         Returns:
             list: Список названий файлов .csv
         """
-        files_names: list = [_.replace(FILE_EXT, '') for _ in os.listdir(PATH)
-                             if _.endswith(FILE_EXT)]
+        files_names: list = sorted({table_name(_) for _ in os.listdir(PATH)
+                                    if table_name(_)})
         if not len(files_names):
             raise CommandError(MESSAGE_COMMAND_ERROR.format(PATH))
 
@@ -53,56 +91,74 @@ class Command(BaseCommand):
             )
         return files_names
 
-    def distribute_files(self, files_names) -> Dict[str, list]:
-        """Распределить файлы по зависимости таблиц на простые и related.
+    def get_import_levels(self, files_names) -> List[List[str]]:
+        """Топологическая сортировка файлов по связям таблиц.
+        Таблицы одного уровня не зависят друг от друга.
+        Ссылки на таблицы, которых нет среди файлов, считаются
+        уже заполненными.
         Args:
             files_names (list): Список всех файлов в папке.
+        Raises:
+            CommandError: Таблицы ссылаются друг на друга по кругу.
         Returns:
-            Dict[str, list]: Словарь с распределенными
-            по simple и related именами файлов.
+            List[List[str]]: Уровни импорта по порядку.
         """
-        related_tables = []
-        simple_tables = []
-        for file_name in files_names:
-            file = File(file_name)
-            if len(file.get_table_related_fields):
-                related_tables.append(file_name)
-            else:
-                simple_tables.append(file_name)
-        return {'simple': simple_tables,
-                'related': related_tables}
+        dependencies: Dict[str, set] = {
+            file_name: set(File(file_name).get_related_tables)
+            .intersection(files_names).difference({file_name})
+            for file_name in files_names
+        }
+        levels = []
+        while dependencies:
+            level = sorted(file_name for file_name, related
+                           in dependencies.items() if not related)
+            if not level:
+                raise CommandError(
+                    MESSAGE_CYCLE_ERROR.format(sorted(dependencies))
+                )
+            levels.append(level)
+            dependencies = {file_name: related.difference(level)
+                            for file_name, related in dependencies.items()
+                            if file_name not in level}
+        return levels
 
-    def save_files_not_related(self, files_names) -> None:
-        """Установка простых таблиц, не имеющих связей.
+    def save_files_level(self, files_names, checkpoint, workers) -> None:
+        """Импорт независимых таблиц в пуле потоков.
         Args:
-            files_names (list): Cписок файлов для установки.
+            files_names (list): Файлы одного уровня.
+            checkpoint (Checkpoint): Контрольная точка импорта.
+            workers (int): Размер пула.
         """
-        for file_name in files_names:
-            file = File(file_name)
-            file.open_read_save_file_for_simple_table()
+        pending = [file_name for file_name in files_names
+                   if not checkpoint.is_done(file_name)]
+        for file_name in set(files_names).difference(pending):
+            self.stdout.write(MESSAGE_SKIP.format(file_name))
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = [executor.submit(self.save_file, file_name, checkpoint)
+                       for file_name in pending]
+        for future in futures:
+            future.result()
 
-    def save_files_with_related(self, related_files) -> None:
-        """Установка созависимых таблиц, не имеющих связей.
-        Args:
-            related_files (list): Список с названиями зависимых таблиц.
+    def save_file(self, file_name, checkpoint) -> None:
+        """Импорт одного файла в отдельном потоке со своим соединением.
         Raises:
-            Exception: Таблица не может быть установлена по причине
-            ошибки оператора. Не существует данных для связи.
+            CommandError: В файле есть ссылка на несуществующую запись.
         """
-        start_round_flag = True
-        while start_round_flag:
-            unrecorded_files = []
-            for file_name in related_files:
-                file = File(file_name)
-                unrecorded_files: dict = (
-                    file.open_read_save_file_for_ralated_table(
-                        unrecorded_files
-                    )
-                )
-            if len(unrecorded_files):
-                if related_files == unrecorded_files:
-                    raise Exception(MESSAGE_EXCEPTION.format(file))
-                related_files = unrecorded_files
-                start_round_flag = True
-            else:
-                start_round_flag = False
+        file = File(file_name, self.batch_size, checkpoint)
+        try:
+            file.open_read_save_file()
+        except RelatedRowNotFoundError as e:
+            raise CommandError(MESSAGE_EXCEPTION.format(file)) from e
+        finally:
+            connection.close()
+
+    def refresh_derived_data(self, files_names) -> None:
+        """bulk_create не вызывает сигналы моделей: после импорта
+        пересчитать производные данные.
+        Args:
+            files_names (list): Список импортированных файлов.
+        """
+        refresh_derived_data(
+            [APPS_MODELS[file_name] for file_name in files_names],
+            self.stdout
+        )
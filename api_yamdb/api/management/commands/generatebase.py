@@ -0,0 +1,351 @@
+import argparse
+import csv
+import io
+import math
+import random
+import time
+from bisect import bisect
+from datetime import datetime
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from ._models import refresh_derived_data
+
+BATCH_SIZE: int = 10000
+ZIPF: float = 1.1
+START_DATE: datetime = datetime(2010, 1, 1, tzinfo=timezone.utc)
+# Момент генерации: от него считаются даты и годы, а не от часов,
+# чтобы одно зерно давало одни данные в любой день.
+NOW: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DATE_FORMAT: str = '%Y-%m-%d'
+CATEGORIES: Tuple[Tuple[str, str, int], ...] = (
+    ('Фильм', 'movie', 40), ('Книга', 'book', 30), ('Сериал', 'series', 12),
+    ('Музыка', 'music', 10), ('Игра', 'game', 8),
+)
+GENRES: Tuple[Tuple[str, str, int], ...] = (
+    ('Драма', 'drama', 24), ('Комедия', 'comedy', 18),
+    ('Боевик', 'action', 10), ('Триллер', 'thriller', 9),
+    ('Мелодрама', 'romance', 8), ('Фантастика', 'sci-fi', 8),
+    ('Детектив', 'detective', 7), ('Приключения', 'adventure', 7),
+    ('Фэнтези', 'fantasy', 6), ('Ужасы', 'horror', 5),
+    ('Мультфильм', 'animation', 4), ('Документальный', 'documentary', 3),
+    ('Рок', 'rock', 3), ('Поп', 'pop', 3), ('Классика', 'classic', 2),
+)
+# Накопленные веса оценок 1..10: оценки смещены вверх, как в живых
+# каталогах, у каждого произведения свой профиль.
+SCORES: Tuple[int, ...] = tuple(range(1, 11))
+SCORE_PROFILES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(accumulate(weights)) for weights in (
+        (1, 1, 1, 2, 3, 6, 12, 22, 27, 25),
+        (2, 2, 4, 6, 10, 16, 22, 20, 11, 7),
+        (14, 12, 14, 14, 13, 11, 9, 6, 4, 3),
+    )
+)
+PROFILE_WEIGHTS: Tuple[int, ...] = (20, 60, 80)
+ADJECTIVES: Tuple[str, ...] = (
+    'Тихий', 'Последний', 'Красный', 'Долгий', 'Северный', 'Забытый',
+    'Белый', 'Ночной', 'Далекий', 'Новый', 'Старый', 'Золотой',
+)
+NOUNS: Tuple[str, ...] = (
+    'берег', 'город', 'путь', 'сад', 'ветер', 'дом', 'остров', 'поезд',
+    'дождь', 'лес', 'мост', 'огонь',
+)
+MESSAGE_TOO_MANY: str = ('Отзывов {} больше, чем пар произведение-автор '
+                         '({} x {}): уникальность отзыва не соблюсти.')
+MESSAGE_NOT_EMPTY: str = ('Таблица {} не пуста: generatebase заполняет '
+                          'пустую базу, id начинаются с 1 '
+                          '(очистить - manage.py flush).')
+MESSAGE_BAD_NOW: str = 'Дата {!r} не в формате ГГГГ-ММ-ДД после {:%Y-%m-%d}.'
+MESSAGE_TABLE: str = 'Таблица {}: {} строк.'
+MESSAGE_RESULT: str = 'Записано строк: {}, {:.0f} строк/с.'
+
+
+class Table:
+    """
+    Строки одной таблицы: столбцы из модели, постоянные значения
+    по умолчанию, переменные - в порядке variable.
+    """
+
+    def __init__(self, model, variable: Sequence[str]) -> None:
+        fields = [field for field in model._meta.concrete_fields
+                  if not field.primary_key or field.name in variable]
+        self.model = model
+        self.name = model._meta.db_table
+        self.columns = [field.column for field in fields]
+        self.datetimes = [index for index, field in enumerate(fields)
+                          if field.get_internal_type() == 'DateTimeField']
+        self.defaults = [None if field.name in variable
+                         else field.get_default() for field in fields]
+        names = [field.name for field in fields]
+        self.indexes = [names.index(name) for name in variable]
+        self.rows: List[list] = []
+        self.count = 0
+
+    def add(self, *values) -> None:
+        row = list(self.defaults)
+        for index, value in zip(self.indexes, values):
+            row[index] = value
+        self.rows.append(row)
+
+    def flush(self, cursor) -> None:
+        if not self.rows:
+            return
+        if connection.vendor == 'postgresql':
+            self.copy(cursor)
+        else:
+            self.insert(cursor)
+        self.count += len(self.rows)
+        self.rows = []
+
+    def copy(self, cursor) -> None:
+        """COPY FROM STDIN: пустая строка в кавычках, NULL - без."""
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+            self.rows)
+        buffer.seek(0)
+        cursor.cursor.copy_expert('COPY {} ({}) FROM STDIN WITH CSV'.format(
+            connection.ops.quote_name(self.name),
+            ', '.join(map(connection.ops.quote_name, self.columns))
+        ), buffer)
+
+    def insert(self, cursor) -> None:
+        adapt = connection.ops.adapt_datetimefield_value
+        for row in self.rows:
+            for index in self.datetimes:
+                row[index] = adapt(row[index])
+        cursor.executemany('INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(self.name),
+            ', '.join(map(connection.ops.quote_name, self.columns)),
+            ', '.join(['%s'] * len(self.columns))
+        ), self.rows)
+
+
+def reference_date(value: str) -> datetime:
+    """Значение --now: дата ГГГГ-ММ-ДД позже START_DATE, полночь UTC."""
+    try:
+        now = datetime.strptime(value, DATE_FORMAT).replace(
+            tzinfo=timezone.utc)
+    except ValueError:
+        now = None
+    if now is None or now <= START_DATE:
+        raise argparse.ArgumentTypeError(
+            MESSAGE_BAD_NOW.format(value, START_DATE))
+    return now
+
+
+def zipf_counts(total: int, size: int, cap: int, exponent: float,
+                rng: random.Random) -> List[int]:
+    """Разложить total по size корзинам с весами 1/rank^exponent
+    (ранги перемешаны), не больше cap в корзине.
+    """
+    if not size:
+        return []
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    left = total - sum(counts)
+    rank = 0
+    while left > 0:
+        extra = min(cap - counts[rank], left, 1 + left // size)
+        counts[rank] += extra
+        left -= extra
+        rank = (rank + 1) % size
+    rng.shuffle(counts)
+    return counts
+
+
+def coprime_step(size: int, rng: random.Random) -> int:
+    """Шаг, обходящий все size авторов без повторов."""
+    if size <= 1:
+        return 1
+    step = rng.randrange(1, size)
+    while math.gcd(step, size) != 1:
+        step = rng.randrange(1, size)
+    return step
+
+
+class Command(BaseCommand):
+    help = ('Сгенерировать детерминированный набор данных заданного '
+            'объема: пользователи, произведения, отзывы и комментарии.')
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Количество пользователей.'),
+            ('titles', 1000, 'Количество произведений.'),
+            ('reviews', 10000, 'Количество отзывов.'),
+            ('comments', 20000, 'Примерное количество комментариев.'),
+            ('seed', 0, 'Зерно генератора: одно зерно - одни данные.'),
+            ('batch-size', BATCH_SIZE, 'Количество строк в одной вставке.'),
+        ):
+            parser.add_argument(f'--{name}', type=int, default=default,
+                                help=help_text)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=ZIPF,
+            help='Показатель перекоса отзывов по произведениям.'
+        )
+        parser.add_argument(
+            '--now',
+            type=reference_date,
+            default=NOW,
+            help=('Дата генерации ГГГГ-ММ-ДД: до нее идут даты '
+                  'регистрации и публикации, от нее - годы выпуска.')
+        )
+
+    def handle(self, *args, **options):
+        """Данные пишутся пакетами: COPY на PostgreSQL, executemany
+        на остальных базах. id задаются явно с 1, после записи счетчики
+        id сдвигаются и пересчитываются производные данные.
+        Raises:
+            CommandError: Отзывов больше, чем пар произведение-автор,
+                или в таблицах пользователей, произведений, отзывов
+                и комментариев уже есть строки.
+        """
+        users, titles = options['users'], options['titles']
+        reviews = options['reviews']
+        if reviews > users * titles:
+            raise CommandError(MESSAGE_TOO_MANY.format(reviews, titles,
+                                                       users))
+        for model in (User, Title, Review, Comment):
+            if model.objects.exists():
+                raise CommandError(MESSAGE_NOT_EMPTY.format(
+                    model._meta.db_table))
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = options['now']
+        self.started = time.monotonic()
+        self.tables: List[Table] = []
+        with connection.cursor() as cursor:
+            self.cursor = cursor
+            self.user_ids = self.generate_users(users)
+            self.categories = self.ensure_catalog(Category, CATEGORIES)
+            self.genres = self.ensure_catalog(Genre, GENRES)
+            self.generate_titles(
+                zipf_counts(reviews, titles, users, options['zipf'],
+                            self.rng),
+                options['comments'] / reviews if reviews else 0
+            )
+        elapsed = time.monotonic() - self.started
+        total = sum(table.count for table in self.tables)
+        for table in self.tables:
+            self.stdout.write(MESSAGE_TABLE.format(table.name, table.count))
+        self.stdout.write(MESSAGE_RESULT.format(
+            total, total / elapsed if elapsed else 0))
+        refresh_derived_data(
+            [table.model for table in self.tables], self.stdout,
+            rating=False
+        )
+
+    def table(self, model, *variable) -> Table:
+        table = Table(model, variable)
+        self.tables.append(table)
+        return table
+
+    def flush(self, *tables: Table) -> None:
+        """Записать буферы по порядку ссылок в одной транзакции."""
+        with transaction.atomic():
+            for table in tables:
+                table.flush(self.cursor)
+
+    def random_date(self, start: datetime) -> datetime:
+        return start + (self.now - start) * self.rng.random()
+
+    def generate_users(self, count: int) -> List[int]:
+        table = self.table(User, 'id', 'username', 'email', 'password',
+                           'date_joined')
+        for user_id in range(1, count + 1):
+            table.add(user_id, f'gen{user_id}', f'gen{user_id}@yamdb.fake',
+                      '!', self.random_date(START_DATE))
+            if len(table.rows) >= self.batch_size:
+                self.flush(table)
+        self.flush(table)
+        return list(range(1, count + 1))
+
+    def ensure_catalog(self, model, items) -> Tuple[List[int], List[int]]:
+        """id категорий или жанров по слагам (недостающие создаются
+        без явного id) и накопленные веса для выбора. Произведения
+        ссылаются на них по слагу, так что данные от id не зависят.
+        """
+        slugs = [slug for _, slug, _ in items]
+        existing = set(model.objects.filter(
+            slug__in=slugs).values_list('slug', flat=True))
+        table = self.table(model, 'name', 'slug')
+        for name, slug, _ in items:
+            if slug not in existing:
+                table.add(name, slug)
+        self.flush(table)
+        pks = dict(model.objects.filter(
+            slug__in=slugs).values_list('slug', 'pk'))
+        return ([pks[slug] for slug in slugs],
+                list(accumulate(weight for *_, weight in items)))
+
+    def choose(self, catalog: Tuple[List[int], List[int]]) -> int:
+        ids, cum_weights = catalog
+        return ids[bisect(cum_weights, self.rng.random() * cum_weights[-1])]
+
+    def generate_titles(self, counts: List[int], comments_mean: float):
+        """Произведения вместе с отзывами и комментариями: сумма
+        оценок и число отзывов известны при записи произведения.
+        """
+        titles = self.table(Title, 'id', 'name', 'year', 'category',
+                            'description', 'score_sum', 'review_count',
+                            'avg_score', 'modified')
+        links = self.table(Title.genre.through, 'title', 'genre')
+        reviews = self.table(Review, 'id', 'title', 'author', 'text',
+                             'score', 'pub_date')
+        comments = self.table(Comment, 'id', 'review', 'author', 'text',
+                              'pub_date')
+        buffers = (titles, links, reviews, comments)
+        title_id = review_id = comment_id = 1
+        step = coprime_step(len(self.user_ids), self.rng)
+        for count in counts:
+            scores = self.rng.choices(SCORES, cum_weights=self.rng.choices(
+                SCORE_PROFILES, cum_weights=PROFILE_WEIGHTS)[0], k=count)
+            self.add_title(titles, title_id, scores)
+            for genre_id in {self.choose(self.genres)
+                             for _ in range(self.rng.randint(1, 3))}:
+                links.add(title_id, genre_id)
+            start = self.rng.randrange(len(self.user_ids))
+            for number, score in enumerate(scores):
+                author = self.user_ids[(start + number * step)
+                                       % len(self.user_ids)]
+                pub_date = self.random_date(START_DATE)
+                reviews.add(review_id, title_id, author,
+                            f'Отзыв {review_id}', score, pub_date)
+                for _ in range(self.comment_count(comments_mean)):
+                    comments.add(comment_id, review_id,
+                                 self.rng.choice(self.user_ids),
+                                 f'Комментарий {comment_id}',
+                                 self.random_date(pub_date))
+                    comment_id += 1
+                review_id += 1
+            title_id += 1
+            if max(len(table.rows) for table in buffers) >= self.batch_size:
+                self.flush(*buffers)
+        self.flush(*buffers)
+
+    def add_title(self, titles: Table, title_id: int,
+                  scores: List[int]) -> None:
+        name = '{} {}'.format(self.rng.choice(ADJECTIVES),
+                              self.rng.choice(NOUNS))
+        year = max(1900, self.now.year - int(abs(self.rng.gauss(0, 25))))
+        titles.add(title_id, f'{name} {title_id}', year,
+                   self.choose(self.categories),
+                   f'{name}: описание произведения {title_id}.',
+                   sum(scores), len(scores),
+                   sum(scores) / len(scores) if scores else 0, self.now)
+
+    def comment_count(self, mean: float) -> int:
+        """Число комментариев к отзыву: экспоненциальный хвост
+        со средним mean.
+        """
+        if mean <= 0:
+            return 0
+        return int(self.rng.expovariate(1 / mean) + 0.5)
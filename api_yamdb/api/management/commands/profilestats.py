@@ -0,0 +1,82 @@
+import pstats
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from django.core.management.base import BaseCommand
+
+from ...profiling import PROFILE_DIR, load_profiles
+
+TOP: int = 10
+SORT_KEYS: Tuple[str, ...] = ('tottime', 'cumulative', 'ncalls')
+SUMMARY_FIELDS: Tuple[str, ...] = ('total_ms', 'view_ms', 'serializer_ms',
+                                   'sql_ms', 'sql_count')
+MESSAGE_EMPTY: str = 'В {} нет профилей.'
+MESSAGE_ROUTE: str = ('\n{route}: профилей {count}, в среднем '
+                      '{total_ms:.1f} мс, view {view_ms:.1f} мс, '
+                      'сериализация {serializer_ms:.1f} мс, '
+                      'SQL {sql_count:.1f} запросов за {sql_ms:.1f} мс.')
+MESSAGE_FUNCTION: str = '  {:>10.1f} мс {:>10.1f} мс {:>8} {}'
+MESSAGE_HEADER: str = '  {:>13} {:>13} {:>8} {}'.format(
+    'собств.', 'накопл.', 'вызовов', 'функция'
+)
+
+
+class Command(BaseCommand):
+    help = ('Свести сохраненные профили запросов по маршрутам '
+            'и показать самые горячие функции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=TOP,
+            help='Сколько функций показать для маршрута.'
+        )
+        parser.add_argument(
+            '--route',
+            help='Только маршрут, например TitlesViewSet.list.'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default=SORT_KEYS[0],
+            help='Порядок функций: собственное время, накопленное '
+                 'или число вызовов.'
+        )
+
+    def handle(self, *args, **options):
+        routes = self.group_by_route(options['route'])
+        if not routes:
+            self.stdout.write(MESSAGE_EMPTY.format(PROFILE_DIR))
+            return
+        for route, profiles in sorted(routes.items()):
+            self.stdout.write(MESSAGE_ROUTE.format(
+                route=route, count=len(profiles),
+                **self.mean_summary([meta for _, meta in profiles])
+            ))
+            self.write_hot_functions([path for path, _ in profiles],
+                                     options['sort'], options['top'])
+
+    @staticmethod
+    def group_by_route(route) -> Dict[str, List[tuple]]:
+        routes = defaultdict(list)
+        for path, meta in load_profiles():
+            if route is None or meta['route'] == route:
+                routes[meta['route']].append((path, meta))
+        return routes
+
+    @staticmethod
+    def mean_summary(metas) -> Dict[str, float]:
+        return {field: sum(meta[field] for meta in metas) / len(metas)
+                for field in SUMMARY_FIELDS}
+
+    def write_hot_functions(self, paths, sort, top) -> None:
+        """Функции, суммированные по всем профилям маршрута."""
+        stats = pstats.Stats(*paths).sort_stats(sort)
+        self.stdout.write(MESSAGE_HEADER)
+        for function in stats.fcn_list[:top]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[function]
+            self.stdout.write(MESSAGE_FUNCTION.format(
+                tottime * 1000, cumtime * 1000, ncalls,
+                pstats.func_std_string(function)
+            ))
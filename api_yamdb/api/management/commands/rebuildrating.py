@@ -0,0 +1,79 @@
+from typing import Dict, Tuple
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from reviews.models import Review, Title
+from reviews.stats import refresh_stats
+
+from ...cache import bump_version
+
+MESSAGE_DRIFT: str = ('Произведение {}: сумма оценок {} -> {}, '
+                      'отзывов {} -> {}.')
+MESSAGE_RESULT: str = ('Проверено произведений: {}. '
+                       'Расхождений: {}. {}')
+MESSAGE_FIXED: str = 'Рейтинги пересчитаны.'
+MESSAGE_DRY_RUN: str = 'Изменения не записаны (--dry-run).'
+BATCH_SIZE: int = 1000
+
+
+class Command(BaseCommand):
+    help = ('Пересчитать сумму оценок, число отзывов и среднюю оценку '
+            'произведений по таблице отзывов и сообщить о расхождениях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, не исправляя их.'
+        )
+
+    def handle(self, *args, **options):
+        totals = self.get_review_totals()
+        drifted = []
+        checked = 0
+        titles = Title.objects.order_by('pk').only(
+            'pk', 'score_sum', 'review_count', 'avg_score'
+        )
+        for title in titles.iterator(chunk_size=BATCH_SIZE):
+            checked += 1
+            score_sum, review_count = totals.get(title.pk, (0, 0))
+            avg_score = score_sum / review_count if review_count else 0
+            if (title.score_sum, title.review_count,
+                    title.avg_score) == (score_sum, review_count, avg_score):
+                continue
+            if options['verbosity'] >= 1:
+                self.stdout.write(MESSAGE_DRIFT.format(
+                    title.pk, title.score_sum, score_sum,
+                    title.review_count, review_count
+                ))
+            title.score_sum = score_sum
+            title.review_count = review_count
+            title.avg_score = avg_score
+            title.modified = timezone.now()
+            drifted.append(title)
+        if drifted and not options['dry_run']:
+            with transaction.atomic():
+                Title.objects.bulk_update(
+                    drifted,
+                    ('score_sum', 'review_count', 'avg_score', 'modified'),
+                    batch_size=BATCH_SIZE
+                )
+                # bulk_update обходит сигналы: сбрасываем кэш выдачи
+                # и сводки категорий и жанров, посчитанные по рейтингам.
+                bump_version('title', *(f'title:{title.pk}'
+                                        for title in drifted))
+                refresh_stats()
+        self.stdout.write(MESSAGE_RESULT.format(
+            checked, len(drifted),
+            MESSAGE_DRY_RUN if options['dry_run'] else MESSAGE_FIXED
+        ))
+
+    def get_review_totals(self) -> Dict[int, Tuple[int, int]]:
+        """Сумма оценок и число отзывов по каждому произведению.
+        """
+        rows = (Review.objects.order_by().values('title_id')
+                .annotate(score_sum=Sum('score'), review_count=Count('id')))
+        return {row['title_id']: (row['score_sum'], row['review_count'])
+                for row in rows}
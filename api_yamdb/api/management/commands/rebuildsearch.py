@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from reviews.models import Title
+from reviews.search import BATCH_SIZE, index_titles
+
+MESSAGE_RESULT: str = 'Поисковый индекс перестроен для {} произведений.'
+
+
+class Command(BaseCommand):
+    help = ('Перестроить поисковый индекс по названиям '
+            'и описаниям произведений.')
+
+    def handle(self, *args, **options):
+        count = 0
+        batch = []
+        titles = Title.objects.order_by('pk').only(
+            'pk', 'name', 'description'
+        )
+        for title in titles.iterator(chunk_size=BATCH_SIZE):
+            batch.append(title)
+            if len(batch) == BATCH_SIZE:
+                index_titles(batch)
+                count += len(batch)
+                batch = []
+        index_titles(batch)
+        count += len(batch)
+        self.stdout.write(MESSAGE_RESULT.format(count))
@@ -0,0 +1,33 @@
+from typing import Dict, Tuple
+
+from django.core.management.base import BaseCommand
+from reviews.models import CategoryStats, GenreStats
+from reviews.stats import refresh_stats
+
+MESSAGE_RESULT: str = ('Сводки пересчитаны: категорий {}, жанров {}. '
+                       'Исправлено расхождений: {}.')
+
+
+def snapshot(model, key) -> Dict[int, Tuple[int, int, int]]:
+    return {row[0]: row[1:] for row in model.objects.values_list(
+        key, 'title_count', 'review_count', 'score_sum'
+    )}
+
+
+class Command(BaseCommand):
+    help = ('Пересчитать сводки по категориям и жанрам '
+            'по таблицам произведений.')
+
+    def handle(self, *args, **options):
+        models = ((CategoryStats, 'category_id'), (GenreStats, 'genre_id'))
+        before = [snapshot(model, key) for model, key in models]
+        refresh_stats()
+        after = [snapshot(model, key) for model, key in models]
+        drifted = sum(
+            old.get(pk) != values
+            for old, new in zip(before, after)
+            for pk, values in new.items()
+        )
+        self.stdout.write(MESSAGE_RESULT.format(
+            len(after[0]), len(after[1]), drifted
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...outbox import BATCH_SIZE, send_batch, stats
+
+MESSAGE_BATCH: str = 'Отправлено писем: {}, с ошибкой: {}.'
+MESSAGE_STATS: str = ('В очереди: {depth}, самое старое ждет '
+                      '{oldest_seconds:.0f} с, без шансов: {dead}.')
+INTERVAL: float = 5.0
+
+
+class Command(BaseCommand):
+    help = ('Отправить письма из очереди пакетами через одно соединение '
+            'с почтовым сервером, с повторами при ошибках.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество писем за одно соединение.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая очередь.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=INTERVAL,
+            help='Пауза между опросами пустой очереди, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_batch(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(MESSAGE_BATCH.format(sent, failed))
+            # Пакет целиком с ошибкой - сервер, скорее всего, недоступен:
+            # остаток очереди ждет паузы, а не сгорает попытками.
+            if sent and sent + failed == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(MESSAGE_STATS.format(**stats()))
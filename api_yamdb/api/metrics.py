@@ -0,0 +1,38 @@
+import threading
+from collections import Counter
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Counter = Counter()
+_gauges: Dict[str, Callable[[], object]] = {}
+
+
+def incr(name: str, value: int = 1) -> None:
+    """Увеличить счетчик процесса."""
+    with _lock:
+        _counters[name] += value
+
+
+def get(name: str) -> int:
+    """Текущее значение счетчика."""
+    with _lock:
+        return _counters[name]
+
+
+def register_gauge(name: str, func: Callable[[], object]) -> None:
+    """Зарегистрировать показатель, вычисляемый при запросе метрик."""
+    _gauges[name] = func
+
+
+def snapshot() -> Dict[str, object]:
+    """Текущие значения счетчиков и показателей."""
+    with _lock:
+        data = dict(_counters)
+    for name, func in _gauges.items():
+        data[name] = func()
+    return dict(sorted(data.items()))
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from users.models import EmailOutbox
+
+from . import metrics
+
+BATCH_SIZE: int = getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS: int = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS: int = getattr(settings, 'OUTBOX_BACKOFF_SECONDS', 30)
+LEASE_SECONDS: int = getattr(settings, 'OUTBOX_LEASE_SECONDS', 300)
+
+
+def enqueue(recipient: str, subject: str, body: str) -> EmailOutbox:
+    """Поставить письмо в очередь на отправку."""
+    message = EmailOutbox.objects.create(
+        recipient=recipient, subject=subject, body=body
+    )
+    metrics.incr('outbox.enqueued')
+    return message
+
+
+def pending():
+    return EmailOutbox.objects.filter(sent__isnull=True,
+                                      attempts__lt=MAX_ATTEMPTS)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Экспоненциальная пауза перед следующей попыткой."""
+    return timedelta(seconds=BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def claim_batch(batch_size: int) -> List[EmailOutbox]:
+    """Забрать пакет писем, которым пора отправляться.
+    Письма сдвигаются на LEASE_SECONDS вперед, чтобы параллельный
+    обработчик их не взял; строки блокируются только на время выборки.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            pending().filter(next_attempt__lte=now)
+            .order_by('next_attempt')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(
+            pk__in=[message.pk for message in messages]
+        ).update(next_attempt=now + timedelta(seconds=LEASE_SECONDS))
+    return messages
+
+
+def mark_failed(message: EmailOutbox, error: Exception, now) -> None:
+    """Запомнить ошибку и отложить следующую попытку."""
+    message.last_error = repr(error)
+    message.next_attempt = now + backoff(message.attempts)
+
+
+def send_batch(batch_size: int = BATCH_SIZE) -> Tuple[int, int]:
+    """Отправить пакет писем через одно соединение с почтовым сервером.
+    Returns:
+        Tuple[int, int]: Отправлено и не отправлено писем.
+    """
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        # Сервер недоступен: попытка засчитывается всему пакету.
+        now = timezone.now()
+        for message in messages:
+            message.attempts += 1
+            mark_failed(message, error, now)
+        failed = len(messages)
+    else:
+        try:
+            for message in messages:
+                message.attempts += 1
+                now = timezone.now()
+                try:
+                    EmailMessage(message.subject, message.body,
+                                 settings.FROM_EMAIL, [message.recipient],
+                                 connection=connection).send()
+                except Exception as error:
+                    mark_failed(message, error, now)
+                    failed += 1
+                else:
+                    message.sent = now
+                    message.last_error = ''
+                    sent += 1
+                    metrics.incr('outbox.latency_ms_total', int(
+                        (now - message.created).total_seconds() * 1000
+                    ))
+        finally:
+            connection.close()
+    finally:
+        EmailOutbox.objects.bulk_update(
+            messages, ('attempts', 'sent', 'next_attempt', 'last_error')
+        )
+    metrics.incr('outbox.sent', sent)
+    metrics.incr('outbox.failed', failed)
+    return sent, failed
+
+
+def stats() -> Dict[str, object]:
+    """Глубина очереди и возраст самого старого неотправленного письма."""
+    queue = pending()
+    oldest = queue.order_by('created').values_list('created',
+                                                   flat=True).first()
+    return {
+        'depth': queue.count(),
+        'oldest_seconds': (timezone.now() - oldest).total_seconds()
+        if oldest else 0,
+        'dead': EmailOutbox.objects.filter(
+            sent__isnull=True, attempts__gte=MAX_ATTEMPTS
+        ).count(),
+    }
+
+
+metrics.register_gauge('outbox.queue_depth', lambda: pending().count())
@@ -0,0 +1,176 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from typing import List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_MODE: str = 'cursor'
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу (keyset): страница выбирается условием
+    на поля сортировки, а не OFFSET, и без COUNT(*).
+    Сортировка берется из атрибута cursor_ordering у view.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.model = queryset.model
+        position, self.reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [(field, not desc) for field, desc in ordering]
+        queryset = queryset.order_by(*(
+            f'-{field}' if desc else field for field, desc in ordering
+        ))
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def get_ordering(view) -> List[Tuple[str, bool]]:
+        """Поля сортировки в виде (имя поля, по убыванию)."""
+        return [(field.lstrip('-'), field.startswith('-'))
+                for field in view.cursor_ordering]
+
+    @staticmethod
+    def after(ordering, position) -> Q:
+        """Условие "строка идет после position" для сортировки ordering:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        conditions = []
+        for index, (field, desc) in enumerate(ordering):
+            lookup = f'{field}__lt' if desc else f'{field}__gt'
+            equal = {name: value for (name, _), value
+                     in zip(ordering[:index], position)}
+            conditions.append(Q(**equal, **{lookup: position[index]}))
+        return reduce(or_, conditions)
+
+    def position_value(self, row, name: str) -> str:
+        """Значение поля сортировки строкой: из объекта модели
+        или из словаря .values().
+        """
+        if isinstance(row, dict):
+            row = self.model(**{name: row[name]})
+        return row._meta.get_field(name).value_to_string(row)
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        position = [self.position_value(instance, field)
+                    for field, _ in self.ordering]
+        data = json.dumps({'p': position, 'r': int(reverse)})
+        cursor = urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   cursor)
+
+    def decode_cursor(self, request) -> Tuple[Optional[list], bool]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode('ascii')))
+            position = data['p']
+            reverse = bool(data['r'])
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [self.parse_position_value(field, value)
+                        for (field, _), value in zip(self.ordering, position)]
+        except (BinasciiError, KeyError, TypeError, ValueError,
+                UnicodeEncodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def parse_position_value(self, name: str, value):
+        """Значение из курсора, приведенное to_python поля сортировки.
+        Raises:
+            ValueError: Значение пустое.
+            ValidationError: Значение не приводится к типу поля.
+        """
+        value = self.model._meta.get_field(name).to_python(value)
+        if value is None:
+            raise ValueError
+        return value
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """
+    По умолчанию нумерованные страницы. Курсорный режим включается
+    параметром ?pagination=cursor, наличием ?cursor=
+    или атрибутом view.pagination_mode = 'cursor'.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_cursor(request, view):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_cursor(self, request, view) -> bool:
+        params = request.query_params
+        if self.keyset_class.cursor_query_param in params:
+            return True
+        mode = params.get(self.mode_query_param,
+                          getattr(view, 'pagination_mode', None))
+        return mode == CURSOR_MODE
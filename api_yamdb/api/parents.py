@@ -0,0 +1,43 @@
+from typing import NamedTuple, Optional
+
+from django.shortcuts import get_object_or_404
+from reviews.models import Review, Title
+
+
+class Parents(NamedTuple):
+    """Родители вложенного маршрута titles/{title_id}/reviews/..."""
+    title: Title
+    review: Optional[Review] = None
+
+
+def get_parents(request, kwargs) -> Parents:
+    """Родители из kwargs маршрута, загруженные один раз за запрос:
+    view, сериализаторы и разрешения получают одни и те же объекты.
+    """
+    parents = getattr(request, '_parents', None)
+    if parents is None:
+        parents = load_parents(kwargs)
+        request._parents = parents
+    return parents
+
+
+def load_parents(kwargs) -> Parents:
+    """Одним запросом загрузить отзыв вместе с произведением.
+    Raises:
+        Http404: Произведения нет или отзыв относится к другому.
+    """
+    review_id = kwargs.get('review_id')
+    if review_id is None:
+        return Parents(get_object_or_404(Title, pk=kwargs.get('title_id')))
+    review = get_object_or_404(
+        Review.objects.select_related('title'),
+        pk=review_id, title_id=kwargs.get('title_id')
+    )
+    return Parents(review.title, review)
+
+
+class ParentsMixin:
+    """get_parents() для viewset вложенных маршрутов."""
+
+    def get_parents(self) -> Parents:
+        return get_parents(self.request, self.kwargs)
@@ -0,0 +1,179 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import APIException
+
+from . import metrics
+from .authentication import CachedJWTAuthentication
+
+SAMPLE_RATE: float = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+HEADER: str = getattr(settings, 'PROFILE_HEADER', 'HTTP_X_PROFILE')
+PROFILE_DIR: str = getattr(settings, 'PROFILE_DIR', 'profiles')
+MAX_FILES: int = getattr(settings, 'PROFILE_MAX_FILES', 500)
+PROFILE_EXT: str = '.prof'
+META_EXT: str = '.json'
+UNKNOWN_ROUTE: str = 'unresolved'
+VIEWS_FILE: str = os.path.join('rest_framework', 'views.py')
+SERIALIZERS_FILE: str = os.path.join('rest_framework', 'serializers.py')
+FASTPATH_FILE: str = os.path.join('api', 'fastpath.py')
+
+_rotate_lock = threading.Lock()
+
+
+class QueryTimer:
+    """Обертка выполнения SQL: число запросов и суммарное время."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def route_name(request) -> str:
+    """Имя маршрута вида TitlesViewSet.list или MetricsViewSet.get."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNKNOWN_ROUTE
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name or UNKNOWN_ROUTE
+    method = request.method.lower()
+    action = (getattr(match.func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+def cumulative(stats: pstats.Stats, file_suffix: str,
+               names: Tuple[str, ...]) -> float:
+    """Наибольшее накопленное время среди функций names из файла.
+    Берется наибольшее, а не сумма: вложенные вызовы уже входят
+    во внешний.
+    """
+    return max((value[3] for (file_name, _, name), value
+                in stats.stats.items()
+                if name in names and file_name.endswith(file_suffix)),
+               default=0.0)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование cProfile выборки запросов (PROFILE_SAMPLE_RATE)
+    или запросов администратора с заголовком X-Profile.
+    Профиль и сводка (SQL, сериализация, view) пишутся в PROFILE_DIR,
+    старые файлы удаляются сверх PROFILE_MAX_FILES.
+    Без выборки и заголовка запрос проходит без профилирования.
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def should_profile(self, request) -> bool:
+        if HEADER in request.META:
+            return self.is_admin(request)
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    @staticmethod
+    def is_admin(request) -> bool:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                result = CachedJWTAuthentication().authenticate(request)
+            except APIException:
+                return False
+            user = result[0] if result else None
+        return bool(user and user.is_authenticated and user.is_admin)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        total = time.perf_counter() - started
+        stats = pstats.Stats(profiler)
+        save_profile(stats, {
+            'route': route_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': total * 1000,
+            'view_ms': cumulative(stats, VIEWS_FILE, ('dispatch',)) * 1000,
+            'serializer_ms': (
+                cumulative(stats, SERIALIZERS_FILE, ('data',))
+                + cumulative(stats, SERIALIZERS_FILE, ('is_valid',))
+                + cumulative(stats, FASTPATH_FILE, ('build',))
+            ) * 1000,
+            'sql_count': timer.count,
+            'sql_ms': timer.duration * 1000,
+        })
+        metrics.incr('profiler.requests')
+        return response
+
+
+def save_profile(stats: pstats.Stats, meta: Dict[str, object]) -> str:
+    """Записать профиль и сводку, удалив самые старые профили."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, '{}-{}-{}'.format(
+        time.time_ns(), os.getpid(), threading.get_ident()
+    ))
+    stats.dump_stats(stem + PROFILE_EXT)
+    with open(stem + META_EXT, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    rotate()
+    return stem
+
+
+def rotate() -> None:
+    with _rotate_lock:
+        stems = list_profiles()
+        for stem in stems[:max(len(stems) - MAX_FILES, 0)]:
+            for ext in (META_EXT, PROFILE_EXT):
+                try:
+                    os.remove(stem + ext)
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles() -> List[str]:
+    """Пути профилей без расширения, от старых к новым."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted(
+        os.path.join(PROFILE_DIR, name[:-len(META_EXT)])
+        for name in os.listdir(PROFILE_DIR) if name.endswith(META_EXT)
+    )
+
+
+def load_profiles() -> Iterator[Tuple[str, Dict[str, object]]]:
+    """Пары (путь к .prof, сводка) сохраненных профилей."""
+    for stem in list_profiles():
+        try:
+            with open(stem + META_EXT, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            continue
+        if os.path.exists(stem + PROFILE_EXT):
+            yield stem + PROFILE_EXT, meta
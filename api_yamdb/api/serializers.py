@@ -1,34 +1,91 @@
 from core.validators import UserRegexValidator, validate_username
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (Category, CategoryStats, Comment, Genre,
+                            GenreStats, Review, Title)
 from users.models import User
 
+MESSAGE_DUPLICATE_REVIEW: str = ('Вы можете добавить только один'
+                                 ' отзыв к произведению')
 
-class ReviewSerializer(serializers.ModelSerializer):
+
+class SelectedFieldsMixin:
+    """
+    Оставляет в сериализаторе только поля context['fields'],
+    если они заданы (параметры ?fields= и ?omit=).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields).difference(fields):
+                self.fields.pop(name)
+
+
+class PrefetchedSlugField(SlugRelatedField):
+    """
+    Связь по слагу без запроса на каждое значение: объекты берутся
+    из словаря context['prefetched'][модель], загруженного заранее.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)) or isinstance(data, bool):
+            self.fail('invalid')
+        objects = self.context['prefetched'][self.get_queryset().model]
+        try:
+            return objects[str(data)]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=str(data))
+
+
+class ReviewSerializer(SelectedFieldsMixin, serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True)
 
     class Meta:
         model = Review
         exclude = ('title',)
 
-    def validate(self, data):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise ValidationError('Вы можете добавить только один'
-                                      ' отзыв к произведению')
-        return data
+    def create(self, validated_data):
+        """Повторный отзыв отсекает ограничение unique_title_author,
+        а не запрос перед вставкой: так нет гонки двух POST.
+        Raises:
+            ValidationError: Автор уже оставил отзыв к произведению.
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=validated_data['title'],
+                author=validated_data['author']
+            ).exists():
+                raise
+        raise ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [MESSAGE_DUPLICATE_REVIEW]
+        })
+
+
+class ReviewBulkSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор массового создания отзывов администратором.
+    """
+    title = PrefetchedSlugField(slug_field='pk',
+                                queryset=Title.objects.all())
+    author = PrefetchedSlugField(slug_field='username',
+                                 queryset=User.objects.all())
+
+    class Meta:
+        model = Review
+        fields = ('title', 'author', 'text', 'score')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SelectedFieldsMixin, serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True)
 
     class Meta:
@@ -117,6 +174,32 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
+class CategoryStatsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор сводки по категории
+    """
+    name = serializers.CharField(source='category.name')
+    slug = serializers.CharField(source='category.slug')
+    rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        fields = ('name', 'slug', 'title_count', 'review_count', 'rating')
+        model = CategoryStats
+
+
+class GenreStatsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор сводки по жанру
+    """
+    name = serializers.CharField(source='genre.name')
+    slug = serializers.CharField(source='genre.slug')
+    rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        fields = ('name', 'slug', 'title_count', 'review_count', 'rating')
+        model = GenreStats
+
+
 class TitleCreateSerializer(serializers.ModelSerializer):
     """
     Сериализатор создания произведений
@@ -132,23 +215,38 @@ class TitleCreateSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = ('__all__')
+        fields = ('id', 'name', 'year', 'category', 'description', 'genre')
         model = Title
 
 
-class TitleListSerializer(serializers.ModelSerializer):
+class TitleBulkSerializer(TitleCreateSerializer):
+    """
+    Сериализатор массового создания произведений
+    """
+    category = PrefetchedSlugField(
+        slug_field='slug',
+        queryset=Category.objects.all()
+    )
+    genre = PrefetchedSlugField(
+        many=True,
+        slug_field='slug',
+        queryset=Genre.objects.all()
+    )
+
+    class Meta(TitleCreateSerializer.Meta):
+        fields = ('name', 'year', 'category', 'description', 'genre')
+
+
+class TitleListSerializer(SelectedFieldsMixin,
+                          serializers.ModelSerializer):
     """
     Сериализатор вывода списка произведений
     """
     genre = GenreSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
-    rating = serializers.SerializerMethodField()
+    rating = serializers.FloatField(read_only=True)
 
     class Meta:
         fields = ('id', 'name', 'year', 'rating',
                   'description', 'genre', 'category')
         model = Title
-
-    def get_rating(self, obj):
-        rating = obj.reviews.aggregate(Avg('score'))
-        return rating.get('score__avg')
@@ -0,0 +1,103 @@
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+from . import metrics
+from .authentication import user_version_name
+from .cache import bump_version
+from .dbpool import PooledDatabaseWrapperMixin, check_connections, mark_idle
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    bump_version('category')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    bump_version('genre')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    bump_version('title', f'title:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genre_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Title):
+        bump_version('title', f'title:{instance.pk}')
+    else:
+        # Изменены произведения жанра: устаревают все выдачи с жанрами.
+        bump_version('title', 'genre')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Отзыв меняет рейтинг произведения в выдаче."""
+    bump_version('title', f'title:{instance.title_id}',
+                 f'review:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Закэшированный для аутентификации пользователь устаревает."""
+    bump_version(user_version_name(instance.pk))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, **kwargs):
+    """Для пользователя, загруженного не из базы, достать прежний логин."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or (loaded and 'username' in loaded):
+        return
+    instance._loaded_values = (
+        User.objects.filter(pk=instance.pk).values('username').first() or {}
+    )
+
+
+@receiver(post_save, sender=User)
+def username_changed(sender, instance, created, **kwargs):
+    """Логин автора выводится в отзывах: при его смене устаревают
+    отзывы пользователя и списки отзывов их произведений.
+    """
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    old_username = loaded.get('username', instance.username)
+    instance._loaded_values = dict(loaded, username=instance.username)
+    if created or old_username == instance.username:
+        return
+    reviews = Review.objects.filter(author=instance).values_list('pk',
+                                                                 'title_id')
+    names = set()
+    for pk, title_id in reviews:
+        names.update((f'title:{title_id}', f'review:{pk}'))
+    if names:
+        bump_version(*names)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Открытия соединений из пула считает сам пул."""
+    if not isinstance(connection, PooledDatabaseWrapperMixin):
+        metrics.incr('db.connections.opened')
+
+
+@receiver(request_started)
+def request_connections_checked(sender, **kwargs):
+    check_connections()
+
+
+@receiver(request_finished)
+def request_connections_idle(sender, **kwargs):
+    mark_idle()
@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from rest_framework.exceptions import ValidationError
+
+from .export import MESSAGE_FIELDS, split_param
+
+FIELDS_PARAM: str = 'fields'
+OMIT_PARAM: str = 'omit'
+
+
+def parse_sparse_fields(params, available: Sequence[str]
+                        ) -> Optional[Tuple[str, ...]]:
+    """Поля ответа по ?fields= и ?omit= в порядке available.
+    Raises:
+        ValidationError: Неизвестные поля.
+    Returns:
+        Tuple: Выбранные поля или None, если параметров нет.
+    """
+    fields = split_param(params.get(FIELDS_PARAM))
+    omit = split_param(params.get(OMIT_PARAM))
+    if not fields and not omit:
+        return None
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = set(names).difference(available)
+        if unknown:
+            errors[param] = MESSAGE_FIELDS.format(sorted(unknown),
+                                                  list(available))
+    if errors:
+        raise ValidationError(errors)
+    selected = set(fields or available).difference(omit)
+    return tuple(name for name in available if name in selected)
+
+
+@lru_cache(maxsize=None)
+def serializer_fields(serializer_class) -> Tuple[str, ...]:
+    return tuple(serializer_class().fields)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= и ?omit= для list и retrieve. Сериализатор оставляет
+    выбранные поля (context['fields']), запрос к базе читает только
+    их столбцы (sparse_columns, по умолчанию столбец с именем поля)
+    и загружает только их связи (sparse_select_related,
+    sparse_prefetch_related).
+    """
+    sparse_actions: Tuple[str, ...] = ('list', 'retrieve')
+    sparse_columns: Dict[str, Tuple[str, ...]] = {}
+    sparse_select_related: Dict[str, str] = {}
+    sparse_prefetch_related: Dict[str, str] = {}
+
+    def get_sparse_fields(self) -> Optional[Tuple[str, ...]]:
+        if self.action not in self.sparse_actions:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = parse_sparse_fields(
+                self.request.query_params,
+                serializer_fields(self.get_serializer_class())
+            )
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
+
+    def sparse_queryset(self, queryset):
+        """Связи и столбцы только для выбранных полей; поля сортировки
+        остаются - по ним строится курсор.
+        """
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        queryset = queryset.select_related(None).prefetch_related(None)
+        related = [self.sparse_select_related[name] for name in fields
+                   if name in self.sparse_select_related]
+        if related:
+            queryset = queryset.select_related(*related)
+        prefetch = [self.sparse_prefetch_related[name] for name in fields
+                    if name in self.sparse_prefetch_related]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        columns = {'pk'}
+        for name in fields:
+            columns.update(self.sparse_columns.get(name, (name,)))
+        columns.update(field.lstrip('-')
+                       for field in getattr(self, 'cursor_ordering', ()))
+        return queryset.only(*columns)
@@ -0,0 +1,83 @@
+import threading
+from typing import List, Tuple
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from . import metrics
+from .lru import LRUCache
+
+MAX_KEYS: int = getattr(settings, 'THROTTLE_MAX_KEYS', 100000)
+IDENTITY_FIELDS: Tuple[str, ...] = ('username', 'email')
+
+buckets = LRUCache(MAX_KEYS, ttl=3600)
+_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение «ведро токенов»: ведро ключа вмещает num запросов
+    из ставки num/период и пополняется равномерно за период.
+    Запрос проходит, если токен есть во всех ведрах его ключей.
+    Ведра лежат в ограниченном LRU-кэше процесса и пропадают,
+    когда успели бы наполниться. Ставка без значения в
+    DEFAULT_THROTTLE_RATES отключает ограничение.
+    """
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_keys(self, request, view) -> List[str]:
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+        keys = [f'{self.scope}:{key}'
+                for key in self.get_keys(request, view)]
+        now = self.timer()
+        speed = self.num_requests / self.duration
+        with _lock:
+            levels = [self.level(key, now, speed) for key in keys]
+            allowed = all(level >= 1 for level in levels)
+            if allowed:
+                for key, level in zip(keys, levels):
+                    buckets.set(key, (level - 1, now), ttl=self.duration)
+        self.wait_time = max([(1 - level) / speed for level in levels
+                              if level < 1], default=0)
+        metrics.incr('throttle.{}.{}'.format(
+            self.scope, 'allowed' if allowed else 'rejected'))
+        return allowed
+
+    def level(self, key: str, now: float, speed: float) -> float:
+        """Токенов в ведре сейчас с учетом пополнения."""
+        tokens, updated = buckets.get(key, (self.num_requests, now))
+        return min(self.num_requests, tokens + (now - updated) * speed)
+
+    def wait(self) -> float:
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Ведро на адрес клиента."""
+    scope = 'auth_ip'
+
+    def get_keys(self, request, view) -> List[str]:
+        return [self.get_ident(request)]
+
+
+class AuthIdentityThrottle(TokenBucketThrottle):
+    """Ведра на username и email из тела запроса: пачка запросов
+    к одному пользователю с разных адресов тоже ограничена.
+    """
+    scope = 'auth_identity'
+
+    def get_keys(self, request, view) -> List[str]:
+        data = request.data if hasattr(request.data, 'get') else {}
+        keys = []
+        for field in IDENTITY_FIELDS:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                keys.append(f'{field}:{value.strip().lower()}')
+        return keys
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    RegisterViewSet, ReviewViewSet, TitlesViewSet,
-                    TokenViewSet, UserViewSet)
+                    MetricsViewSet, RegisterViewSet, ReviewBulkViewSet,
+                    ReviewViewSet, TitlesViewSet, TokenViewSet, UserViewSet)
 
 router_v1 = routers.DefaultRouter()
 router_v1.register(r'categories', CategoryViewSet, basename='Category')
@@ -25,4 +25,6 @@ auth_patterns = [
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth_patterns)),
+    path('v1/reviews/bulk/', ReviewBulkViewSet.as_view()),
+    path('v1/metrics/', MetricsViewSet.as_view()),
 ]
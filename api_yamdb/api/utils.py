@@ -1,9 +1,8 @@
 from django.conf import settings
-from django.core.mail import BadHeaderError, send_mail
-from rest_framework import status
-from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import AccessToken
 
+from .outbox import enqueue
+
 URL_POINT: str = f'{settings.ALLOWED_HOSTS[0]}/api/v1/auth/token/'
 SUBJECT: str = 'Получение токена на проекте YaMDB.'
 MESSAGE: str = ('{}, для получения токена '
@@ -18,16 +17,5 @@ def get_token_for_user(user):
 
 
 def send_email_for_user(user, confirmation_code):
-    """Отправляем email пользователю."""
-    try:
-        send_mail(
-            SUBJECT,
-            MESSAGE.format(user, confirmation_code),
-            settings.FROM_EMAIL,
-            [user.email],
-        )
-    except BadHeaderError:
-        return Response({
-            'message': 'Письмо с кодом проверки не может быть '
-                       'отправлено. Обратитесь в тех.поддержку.'
-        }, status=status.HTTP_400_BAD_REQUEST)
+    """Ставим email пользователю в очередь, отправит sendoutbox."""
+    enqueue(user.email, SUBJECT, MESSAGE.format(user, confirmation_code))
@@ -1,32 +1,66 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.db import DatabaseError
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import (Category, CategoryStats, Comment, Genre,
+                            GenreStats, Review, Title)
 
-from .filters import TitlesFilter
+from . import metrics
+from .bulk import bulk_create_reviews, bulk_create_titles, check_items
+from .cache import CachedResponseMixin, ConditionalResponseMixin
+from .export import export_titles, parse_export_params
+from .fastpath import (CommentRowRenderer, FastListMixin, ReviewRowRenderer,
+                       TitleRowRenderer)
+from .filters import TitlesFilter, TitlesOrderingFilter
+from .pagination import PageNumberOrCursorPagination
+from .parents import ParentsMixin
+from .parsers import NDJSONParser
 from .permissions import (AdminOrReadOnly, AdminOrSuperUserOnly,
                           IsAuthorModeratorAdminOrReadOnly)
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, RegisterSerializer,
+from .serializers import (CategorySerializer, CategoryStatsSerializer,
+                          CommentSerializer, GenreSerializer,
+                          GenreStatsSerializer, RegisterSerializer,
                           ReviewSerializer, TitleCreateSerializer,
                           TitleListSerializer, TokenSerializer, UserSerializer)
+from .sparse import SparseFieldsMixin
+from .throttling import AuthIdentityThrottle, AuthIPThrottle
 from .utils import get_token_for_user, send_email_for_user
 
 User = get_user_model()
 
 
+def bulk_response(request, create_items):
+    """Ответ массового создания: результат по каждому объекту.
+    201 - если создан хотя бы один объект, иначе 400.
+    """
+    error = check_items(request.data)
+    if error:
+        return Response({'message': error},
+                        status=status.HTTP_400_BAD_REQUEST)
+    results = create_items(request.data)
+    created = sum('errors' not in result for result in results)
+    return Response(
+        {'created': created, 'results': results},
+        status=status.HTTP_201_CREATED if created
+        else status.HTTP_400_BAD_REQUEST
+    )
+
+
 class RegisterViewSet(APIView):
     """
     Регистрация пользователя POST.
     """
+    throttle_classes = (AuthIPThrottle, AuthIdentityThrottle)
+
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if not serializer.is_valid():
@@ -52,6 +86,8 @@ class TokenViewSet(APIView):
     """
     Получение токена POST.
     """
+    throttle_classes = (AuthIPThrottle, AuthIdentityThrottle)
+
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         if not serializer.is_valid():
@@ -102,27 +138,89 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class ReviewBulkViewSet(APIView):
+    """
+    Массовое создание отзывов от имени авторов POST, для администратора.
+    """
+    permission_classes = (AdminOrSuperUserOnly,)
+    parser_classes = (JSONParser, NDJSONParser)
+
+    def post(self, request):
+        return bulk_response(request, bulk_create_reviews)
+
+
+class MetricsViewSet(APIView):
+    """
+    Счетчики процесса для администратора GET.
+    """
+    permission_classes = (AdminOrSuperUserOnly,)
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+class TitlesViewSet(CachedResponseMixin, FastListMixin, SparseFieldsMixin,
+                    viewsets.ModelViewSet):
     """
     Предоставляет CRUD-действия для произведений
     """
-    queryset = Title.objects.all()
+    cache_collections = ('title', 'category', 'genre')
+    cache_object_versions = ('title',)
+    queryset = (Title.objects.select_related('category')
+                .prefetch_related('genre'))
     serializer_class = TitleListSerializer
+    row_renderer_class = TitleRowRenderer
+    sparse_columns = {'rating': ('score_sum', 'review_count'),
+                      'genre': (), 'category': ('category',)}
+    sparse_select_related = {'category': 'category'}
+    sparse_prefetch_related = {'genre': 'genre'}
     permission_classes = (AdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, TitlesOrderingFilter)
     filterset_class = TitlesFilter
-    pagination_class = PageNumberPagination
+    ordering_fields = ('rating', 'year', 'name')
+    pagination_class = PageNumberOrCursorPagination
+
+    @property
+    def cursor_ordering(self):
+        """Курсор идет в порядке ?ordering=, без него - по убыванию id."""
+        ordering = TitlesOrderingFilter().get_ordering(
+            self.request, self.queryset, self
+        )
+        return ordering or ('-id',)
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return TitleCreateSerializer
         return TitleListSerializer
 
+    @action(detail=False,
+            methods=['post'],
+            parser_classes=(JSONParser, NDJSONParser),
+            permission_classes=(AdminOrSuperUserOnly,))
+    def bulk(self, request):
+        """Массовое создание: массив JSON или NDJSON."""
+        return bulk_response(request, bulk_create_titles)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=(AdminOrSuperUserOnly,))
+    def export(self, request):
+        """Выгрузка всего каталога потоком NDJSON.
+        Параметры: fields, since (по полю modified),
+        include=reviews,comments.
+        """
+        fields, since, include = parse_export_params(request.query_params)
+        return StreamingHttpResponse(
+            export_titles(fields, since, include),
+            content_type=NDJSONParser.media_type
+        )
+
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     Возвращает список, создает новые и удаляет существующие категории
     """
+    cache_collections = ('category',)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     pagination_class = PageNumberPagination
@@ -139,11 +237,21 @@ class CategoryViewSet(viewsets.ModelViewSet):
         category.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    # Роутер сортирует действия по имени метода: маршрут stats/
+    # должен идти раньше шаблона slug, иначе GET попадет в slug.
+    @action(detail=False, methods=['get'], url_path='stats')
+    def overview(self, request):
+        """Сводка по категориям из таблицы сводок, без агрегации."""
+        queryset = (CategoryStats.objects.select_related('category')
+                    .order_by('category__name'))
+        return Response(CategoryStatsSerializer(queryset, many=True).data)
+
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     Возвращает список, создает новые и удаляет существующие жанры
     """
+    cache_collections = ('genre',)
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     pagination_class = PageNumberPagination
@@ -160,36 +268,72 @@ class GenreViewSet(viewsets.ModelViewSet):
         genre.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    # Роутер сортирует действия по имени метода: маршрут stats/
+    # должен идти раньше шаблона slug, иначе GET попадет в slug.
+    @action(detail=False, methods=['get'], url_path='stats')
+    def overview(self, request):
+        """Сводка по жанрам из таблицы сводок, без агрегации."""
+        queryset = (GenreStats.objects.select_related('genre')
+                    .order_by('genre__name'))
+        return Response(GenreStatsSerializer(queryset, many=True).data)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(ParentsMixin, ConditionalResponseMixin, FastListMixin,
+                    SparseFieldsMixin, viewsets.ModelViewSet):
     """
     Возвращает список, создает / редактирует / удаляет отзывы
     """
+    cache_object_versions = ('review',)
     serializer_class = ReviewSerializer
+    row_renderer_class = ReviewRowRenderer
+    sparse_columns = {'author': ('author', 'author__username')}
+    sparse_select_related = {'author': 'author'}
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get("title_id"))
-        return title.reviews.all()
+        """Для одного отзыва произведение не загружается: условие
+        на title_id само вернет 404 для чужого отзыва.
+        """
+        queryset = Review.objects.select_related('author')
+        if self.kwargs.get('pk') is not None:
+            return queryset.filter(title_id=self.kwargs.get('title_id'))
+        return queryset.filter(title=self.get_parents().title)
+
+    def get_cache_version_names(self):
+        """Список отзывов меняется вместе с версией произведения."""
+        if self.kwargs.get('pk') is None:
+            return [f'title:{self.kwargs.get("title_id")}']
+        return super().get_cache_version_names()
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user,
+                        title=self.get_parents().title)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ParentsMixin, FastListMixin, SparseFieldsMixin,
+                     viewsets.ModelViewSet):
     """
     Возвращает список, создает / редактирует / удаляет комментарии
     """
     serializer_class = CommentSerializer
+    row_renderer_class = CommentRowRenderer
+    sparse_columns = {'author': ('author', 'author__username')}
+    sparse_select_related = {'author': 'author'}
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs.get("review_id"))
-        return review.comments.all()
+        queryset = Comment.objects.select_related('author')
+        if self.kwargs.get('pk') is not None:
+            return queryset.filter(
+                review_id=self.kwargs.get('review_id'),
+                review__title_id=self.kwargs.get('title_id')
+            )
+        return queryset.filter(review=self.get_parents().review)
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user,
+                        review=self.get_parents().review)
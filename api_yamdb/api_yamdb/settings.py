@@ -27,12 +27,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.admission.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -63,10 +66,48 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postress'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Постоянные соединения; с пулом (ENGINE api.backends.*)
+        # соединение возвращается в пул в конце каждого запроса.
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE',
+            default=0 if os.getenv('DB_ENGINE', '').startswith(
+                'api.backends.') else 60
+        )),
+        'HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS',
+                                   default='true').lower() == 'true',
+        # Проверять только соединения, простоявшие дольше стольких секунд.
+        'HEALTH_CHECK_IDLE': float(os.getenv('DB_HEALTH_CHECK_IDLE',
+                                             default=30)),
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+        },
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', default=60))
+AUTH_USER_LOCAL_CACHE_TTL = float(os.getenv('AUTH_USER_LOCAL_CACHE_TTL',
+                                            default=1))
+FAST_LIST_SERIALIZERS = os.getenv('FAST_LIST_SERIALIZERS',
+                                  default='true').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', default=0))
+PROFILE_DIR = os.getenv('PROFILE_DIR',
+                        default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', default=500))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,11 +146,24 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('THROTTLE_AUTH_IP', default='20/min'),
+        'auth_identity': os.getenv('THROTTLE_AUTH_IDENTITY',
+                                   default='5/min'),
+    },
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+}
+THROTTLE_MAX_KEYS = int(os.getenv('THROTTLE_MAX_KEYS', default=100000))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT',
+                                        default=0))
+ADMISSION_LIMITS = {
+    '/api/v1/auth/': int(os.getenv('ADMISSION_AUTH_IN_FLIGHT', default=0)),
 }
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', default=1))
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_title_rating(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    totals = (Review.objects.order_by().values('title_id')
+              .annotate(score_sum=Sum('score'), review_count=Count('id')))
+    for row in totals:
+        Title.objects.filter(pk=row['title_id']).update(
+            score_sum=row['score_sum'],
+            review_count=row['review_count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_auto_20220818_0050'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_title_rating, migrations.RunPython.noop),
+    ]
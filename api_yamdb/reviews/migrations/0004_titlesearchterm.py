@@ -0,0 +1,52 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def build_search_index(apps, schema_editor):
+    from reviews.search import title_terms
+
+    Title = apps.get_model('reviews', 'Title')
+    TitleSearchTerm = apps.get_model('reviews', 'TitleSearchTerm')
+    rows = []
+    titles = Title.objects.order_by('pk').values_list(
+        'pk', 'name', 'description'
+    )
+    for pk, name, description in titles.iterator(chunk_size=BATCH_SIZE):
+        rows.extend(
+            TitleSearchTerm(title_id=pk, term=term, weight=weight)
+            for term, weight in title_terms(name, description).items()
+        )
+        if len(rows) >= BATCH_SIZE:
+            TitleSearchTerm.objects.bulk_create(rows)
+            rows = []
+    TitleSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Вес')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='reviews.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlesearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'title'), name='unique_term_title'),
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_catalog_stats(apps, schema_editor):
+    Category = apps.get_model('reviews', 'Category')
+    Genre = apps.get_model('reviews', 'Genre')
+    Title = apps.get_model('reviews', 'Title')
+    CategoryStats = apps.get_model('reviews', 'CategoryStats')
+    GenreStats = apps.get_model('reviews', 'GenreStats')
+    totals = {'titles': Count('id'), 'score': Sum('score_sum'),
+              'reviews': Sum('review_count')}
+    rows = {row['category_id']: row for row in Title.objects.order_by()
+            .values('category_id').annotate(**totals)}
+    CategoryStats.objects.bulk_create(
+        CategoryStats(category_id=pk,
+                      title_count=rows.get(pk, {}).get('titles', 0),
+                      score_sum=rows.get(pk, {}).get('score') or 0,
+                      review_count=rows.get(pk, {}).get('reviews') or 0)
+        for pk in Category.objects.values_list('pk', flat=True)
+    )
+    rows = {row['genre_id']: row for row in Title.genre.through.objects
+            .order_by().values('genre_id').annotate(
+                titles=Count('title_id'), score=Sum('title__score_sum'),
+                reviews=Sum('title__review_count'))}
+    GenreStats.objects.bulk_create(
+        GenreStats(genre_id=pk,
+                   title_count=rows.get(pk, {}).get('titles', 0),
+                   score_sum=rows.get(pk, {}).get('score') or 0,
+                   review_count=rows.get(pk, {}).get('reviews') or 0)
+        for pk in Genre.objects.values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('title_count', models.PositiveIntegerField(default=0, verbose_name='Количество произведений')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Сводка по категории',
+                'verbose_name_plural': 'Сводки по категориям',
+            },
+        ),
+        migrations.CreateModel(
+            name='GenreStats',
+            fields=[
+                ('title_count', models.PositiveIntegerField(default=0, verbose_name='Количество произведений')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('genre', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Genre', verbose_name='Жанр')),
+            ],
+            options={
+                'verbose_name': 'Сводка по жанру',
+                'verbose_name_plural': 'Сводки по жанрам',
+            },
+        ),
+        migrations.RunPython(fill_catalog_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+
+def fill_avg_score(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Title.objects.filter(review_count__gt=0).update(
+        avg_score=Cast(F('score_sum'), FloatField()) / F('review_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_catalog_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='avg_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Средняя оценка для сортировки'),
+        ),
+        migrations.RunPython(fill_avg_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['avg_score', 'id'], name='title_avg_score_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'id'], name='title_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+        ),
+    ]
@@ -46,6 +46,14 @@ class Category(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def delete(self):
+        from .stats import deleting_scope
+        with deleting_scope():
+            return super().delete()
+
+
 class Title(models.Model):
     name = models.TextField(
         max_length=256,
@@ -77,14 +85,165 @@ class Title(models.Model):
         verbose_name='Жанр'
     )
 
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+
+    review_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+
+    # rating, сохраненный для индекса: без отзывов 0, а не None.
+    avg_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Средняя оценка для сортировки'
+    )
+
+    modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Изменено'
+    )
+
+    objects = TitleQuerySet.as_manager()
+
     class Meta:
         ordering = ('-id',)
+        # Сортировки ?ordering= дополняются id: индекс (поле, id)
+        # отдает строки в нужном порядке в обе стороны.
+        indexes = (
+            models.Index(fields=('avg_score', 'id'),
+                         name='title_avg_score_id_idx'),
+            models.Index(fields=('year', 'id'), name='title_year_id_idx'),
+            models.Index(fields=('name', 'id'), name='title_name_id_idx'),
+            models.Index(fields=('category', 'year', 'id'),
+                         name='title_category_year_id_idx'),
+        )
         verbose_name = "Произведние"
         verbose_name_plural = "Произведния"
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        from .stats import deleting_scope
+        with deleting_scope():
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем категорию из базы, чтобы при ее смене
+        перенести произведение между сводками категорий.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @property
+    def rating(self):
+        """Средняя оценка по отзывам, None если отзывов нет."""
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
+
+class CatalogStats(models.Model):
+    """
+    Сводка по произведениям группы: число произведений, отзывов
+    и сумма оценок. Поддерживается сигналами, пересчитывается
+    командой rebuildstats.
+    """
+    title_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество произведений'
+    )
+
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating(self):
+        """Средняя оценка по отзывам, None если отзывов нет."""
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
+
+class CategoryStats(CatalogStats):
+    category = models.OneToOneField(
+        Category,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Категория'
+    )
+
+    class Meta:
+        verbose_name = 'Сводка по категории'
+        verbose_name_plural = 'Сводки по категориям'
+
+
+class GenreStats(CatalogStats):
+    genre = models.OneToOneField(
+        Genre,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Жанр'
+    )
+
+    class Meta:
+        verbose_name = 'Сводка по жанру'
+        verbose_name_plural = 'Сводки по жанрам'
+
+
+class TitleSearchTerm(models.Model):
+    """
+    Инвертированный индекс полнотекстового поиска:
+    основа слова из названия или описания произведения и ее вес.
+    """
+    title = models.ForeignKey(
+        Title,
+        related_name='search_terms',
+        on_delete=models.CASCADE,
+        verbose_name='Произведение'
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Основа слова'
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'title'],
+                name='unique_term_title'
+            )
+        ]
+
+    def __str__(self):
+        return self.term
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -121,6 +280,11 @@ class Review(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
+        # Отзывы произведения в порядке ленты без сортировки в памяти.
+        indexes = (
+            models.Index(fields=('title', '-pub_date', '-id'),
+                         name='review_title_pub_date_idx'),
+        )
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -128,6 +292,15 @@ class Review(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем значения из базы, чтобы при сохранении
+        пересчитать рейтинг произведения на разницу оценок.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -155,3 +328,7 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('review', '-pub_date', '-id'),
+                         name='comment_review_pub_date_idx'),
+        )
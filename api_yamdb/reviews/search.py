@@ -0,0 +1,191 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+
+from .models import Title, TitleSearchTerm
+
+NAME_WEIGHT: int = 3
+DESCRIPTION_WEIGHT: int = 1
+MIN_TOKEN_LENGTH: int = 2
+MAX_TERM_LENGTH: int = 64
+BATCH_SIZE: int = 1000
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+STOP_WORDS: set = {
+    'без', 'в', 'во', 'да', 'для', 'до', 'же', 'за', 'и', 'из', 'или',
+    'к', 'ко', 'как', 'на', 'над', 'не', 'ни', 'но', 'о', 'об', 'от',
+    'по', 'под', 'при', 'про', 'с', 'со', 'то', 'у', 'что',
+    'a', 'an', 'and', 'at', 'by', 'for', 'in', 'of', 'on', 'or', 'the',
+    'to', 'with',
+}
+
+VOWELS: str = 'аеиоуыэюя'
+PERFECTIVE_GERUND: Tuple[tuple, tuple] = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE: Tuple[tuple, tuple] = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE: Tuple[tuple, tuple] = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE: Tuple[tuple, tuple] = ((), ('ся', 'сь'))
+VERB: Tuple[tuple, tuple] = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN: Tuple[tuple, tuple] = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE: Tuple[tuple, tuple] = ((), ('ейше', 'ейш'))
+DERIVATIONAL: Tuple[tuple, tuple] = ((), ('ость', 'ост'))
+ENGLISH_SUFFIXES: Tuple[str, ...] = ("'s", 'ing', 'ies', 'ed', 'es', 's')
+
+
+def remove_ending(word: str, endings: Tuple[tuple, tuple]) -> Optional[str]:
+    """Снять самое длинное окончание из группы, как among в Snowball.
+    Окончания первой группы снимаются только после "а" или "я".
+    Returns:
+        Optional[str]: Слово без окончания или None, если снять нечего.
+    """
+    after_a, plain = endings
+    found = max((ending for ending in after_a + plain
+                 if word.endswith(ending)), key=len, default=None)
+    if found is None:
+        return None
+    stem = word[:-len(found)]
+    if found in after_a and found not in plain and not stem.endswith(
+            ('а', 'я')):
+        return None
+    return stem
+
+
+def regions(word: str) -> Tuple[int, int]:
+    """Начало областей RV и R2 алгоритма Snowball."""
+    def after_vowel_consonant(start: int) -> int:
+        for index in range(start + 1, len(word)):
+            if word[index - 1] in VOWELS and word[index] not in VOWELS:
+                return index + 1
+        return len(word)
+
+    rv = next((index + 1 for index, letter in enumerate(word)
+               if letter in VOWELS), len(word))
+    return rv, after_vowel_consonant(after_vowel_consonant(0))
+
+
+def stem_russian(word: str) -> str:
+    """Стемминг русского слова по алгоритму Snowball (Портер)."""
+    rv_start, r2_start = regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+    stem = remove_ending(rv, PERFECTIVE_GERUND)
+    if stem is None:
+        rv = remove_ending(rv, REFLEXIVE) or rv
+        stem = remove_ending(rv, ADJECTIVE)
+        if stem is not None:
+            stem = remove_ending(stem, PARTICIPLE) or stem
+        else:
+            stem = remove_ending(rv, VERB)
+            if stem is None:
+                stem = remove_ending(rv, NOUN)
+    rv = rv if stem is None else stem
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = rv[max(r2_start - rv_start, 0):]
+    stem = remove_ending(r2, DERIVATIONAL)
+    if stem is not None:
+        rv = rv[:len(rv) - len(r2) + len(stem)]
+    stem = remove_ending(rv, SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif stem is not None:
+        rv = stem[:-1] if stem.endswith('нн') else stem
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+    return head + rv
+
+
+def stem_english(word: str) -> str:
+    for suffix in ENGLISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word.endswith('ss'):
+                return word
+            word = word[:-len(suffix)]
+            return word + 'y' if suffix == 'ies' else word
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбить текст на основы слов без стоп-слов."""
+    terms = []
+    for token in TOKEN_RE.findall((text or '').lower().replace('ё', 'е')):
+        if len(token) < MIN_TOKEN_LENGTH or token in STOP_WORDS:
+            continue
+        if CYRILLIC_RE.search(token):
+            token = stem_russian(token)
+        else:
+            token = stem_english(token)
+        terms.append(token[:MAX_TERM_LENGTH])
+    return terms
+
+
+def title_terms(name: str, description: Optional[str]) -> Dict[str, int]:
+    """Основы слов произведения с весами: название весит больше."""
+    weights: Counter = Counter()
+    for term in tokenize(name):
+        weights[term] += NAME_WEIGHT
+    for term in tokenize(description):
+        weights[term] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def index_titles(titles: Iterable[Title]) -> None:
+    """Перестроить записи индекса для переданных произведений."""
+    titles = list(titles)
+    rows = [
+        TitleSearchTerm(title_id=title.pk, term=term, weight=weight)
+        for title in titles
+        for term, weight in title_terms(title.name,
+                                        title.description).items()
+    ]
+    with transaction.atomic():
+        TitleSearchTerm.objects.filter(
+            title_id__in=[title.pk for title in titles]
+        ).delete()
+        # SQLite ограничивает число строк в одном INSERT.
+        batch_size = connection.ops.bulk_batch_size(
+            TitleSearchTerm._meta.concrete_fields, rows
+        )
+        TitleSearchTerm.objects.bulk_create(
+            rows, batch_size=min(BATCH_SIZE, batch_size or BATCH_SIZE)
+        )
+
+
+def search_titles(queryset, query: str):
+    """Отобрать произведения, содержащие все слова запроса,
+    и упорядочить их по сумме весов найденных слов.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return queryset.none()
+    matches = (TitleSearchTerm.objects.filter(term__in=terms)
+               .order_by().values('title_id'))
+    matched_ids = (matches.annotate(matched=Count('term'))
+                   .filter(matched=len(terms)).values('title_id'))
+    rank = (matches.filter(title_id=OuterRef('pk'))
+            .annotate(rank=Sum('weight')).values('rank'))
+    return (queryset.filter(id__in=matched_ids)
+            .annotate(search_rank=Subquery(rank, output_field=IntegerField()))
+            .order_by('-search_rank', '-id'))
@@ -0,0 +1,159 @@
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, CategoryStats, Genre, GenreStats, Review, Title
+from .search import index_titles
+from .stats import (deleting_titles, shift_reviews, shift_stats, title_links,
+                    title_totals)
+
+RATING_FIELDS: set = {'title_id', 'score'}
+
+
+def update_title_rating(title_id, score_delta, count_delta):
+    """Атомарно изменить сумму оценок, число отзывов и среднюю оценку
+    произведения.
+    """
+    if not score_delta and not count_delta:
+        return
+    score_sum = F('score_sum') + score_delta
+    review_count = F('review_count') + count_delta
+    Title.objects.filter(pk=title_id).update(
+        score_sum=score_sum,
+        review_count=review_count,
+        avg_score=Coalesce(
+            Cast(score_sum, FloatField()) / NullIf(review_count, 0),
+            Value(0.0)
+        ),
+        modified=timezone.now()
+    )
+    shift_reviews(title_id, score_delta, count_delta)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Для отзыва, загруженного не из базы, достать прежнюю оценку."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or (loaded and RATING_FIELDS <= set(loaded)):
+        return
+    instance._loaded_values = (
+        Review.objects.filter(pk=instance.pk)
+        .values('title_id', 'score').first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Учесть новый отзыв или изменение оценки в рейтинге."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or not loaded:
+        update_title_rating(instance.title_id, instance.score, 1)
+    elif loaded['title_id'] != instance.title_id:
+        update_title_rating(loaded['title_id'], -loaded['score'], -1)
+        update_title_rating(instance.title_id, instance.score, 1)
+    else:
+        update_title_rating(instance.title_id,
+                            instance.score - loaded['score'], 0)
+    instance._loaded_values = {'title_id': instance.title_id,
+                               'score': instance.score}
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убрать удаленный отзыв, в том числе каскадно, из рейтинга."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if not loaded or not RATING_FIELDS <= set(loaded):
+        loaded = {'title_id': instance.title_id, 'score': instance.score}
+    update_title_rating(loaded['title_id'], -loaded['score'], -1)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, **kwargs):
+    """Обновить поисковый индекс по названию и описанию."""
+    index_titles([instance])
+
+
+@receiver(pre_save, sender=Title)
+def remember_title_category(sender, instance, **kwargs):
+    """Для произведения, загруженного не из базы, достать категорию."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or (loaded and 'category_id' in loaded):
+        return
+    instance._loaded_values = (
+        Title.objects.filter(pk=instance.pk).values('category_id').first()
+        or {}
+    )
+
+
+@receiver(post_save, sender=Title)
+def title_moved(sender, instance, created, **kwargs):
+    """Учесть новое произведение или смену категории в сводках."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if created:
+        shift_stats([instance.category_id], [], titles=1)
+    elif loaded.get('category_id') != instance.category_id:
+        _, score, reviews = title_totals([instance.pk])
+        shift_stats([loaded.get('category_id')], [], -1, -score, -reviews)
+        shift_stats([instance.category_id], [], 1, score, reviews)
+    instance._loaded_values = dict(loaded, category_id=instance.category_id)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Добавление и удаление жанров произведения с любой стороны связи."""
+    links = Title.genre.through.objects
+    if action == 'pre_clear':
+        instance._cleared_links = set(
+            links.filter(genre_id=instance.pk).values_list('title_id',
+                                                           flat=True)
+            if reverse else
+            links.filter(title_id=instance.pk).values_list('genre_id',
+                                                           flat=True)
+        )
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_links', None)
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        titles, score, reviews = title_totals(pk_set)
+        shift_stats([], [instance.pk], sign * titles, sign * score,
+                    sign * reviews)
+    else:
+        _, score, reviews = title_totals([instance.pk])
+        shift_stats([], pk_set, sign, sign * score, sign * reviews)
+
+
+@receiver(pre_delete, sender=Title)
+def title_deleting(sender, instance, **kwargs):
+    """Убрать произведение из сводок целиком до каскадного удаления
+    его отзывов и связей с жанрами.
+    """
+    category_ids, genre_ids = title_links(instance.pk)
+    _, score, reviews = title_totals([instance.pk])
+    shift_stats(category_ids, genre_ids, -1, -score, -reviews)
+    # Отметку снимает deleting_scope в Title.delete и QuerySet.delete,
+    # для других путей удаления - фиксация транзакции.
+    pk = instance.pk
+    deleting_titles().add(pk)
+    transaction.on_commit(lambda: deleting_titles().discard(pk))
+
+
+@receiver(post_save, sender=Category)
+def category_created(sender, instance, created, **kwargs):
+    if created:
+        CategoryStats.objects.get_or_create(category=instance)
+
+
+@receiver(post_save, sender=Genre)
+def genre_created(sender, instance, created, **kwargs):
+    if created:
+        GenreStats.objects.get_or_create(genre=instance)
@@ -0,0 +1,128 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Category, CategoryStats, Genre, GenreStats, Title
+
+_deleting = threading.local()
+
+
+def deleting_titles() -> set:
+    """id произведений, удаляемых в этом потоке: их сводки уже
+    уменьшены целиком, каскадное удаление отзывов не учитывается.
+    """
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@contextmanager
+def deleting_scope() -> Iterator[None]:
+    """Удаление произведений: отметки deleting_titles, поставленные
+    внутри, снимаются на выходе, даже если удаление упало или откатилось.
+    """
+    ids = deleting_titles()
+    before = set(ids)
+    try:
+        yield
+    finally:
+        ids.intersection_update(before)
+
+
+def shift_stats(category_ids: Iterable[int], genre_ids: Iterable[int],
+                titles: int = 0, score: int = 0, reviews: int = 0) -> None:
+    """Атомарно сдвинуть сводки категорий и жанров на разницу."""
+    if not (titles or score or reviews):
+        return
+    values = {
+        'title_count': F('title_count') + titles,
+        'score_sum': F('score_sum') + score,
+        'review_count': F('review_count') + reviews,
+    }
+    category_ids = [pk for pk in category_ids if pk is not None]
+    genre_ids = list(genre_ids)
+    if category_ids:
+        CategoryStats.objects.filter(
+            category_id__in=category_ids).update(**values)
+    if genre_ids:
+        GenreStats.objects.filter(genre_id__in=genre_ids).update(**values)
+
+
+def title_links(title_id) -> Tuple[List[int], List[int]]:
+    """Категория и жанры произведения из базы."""
+    category_ids = list(Title.objects.filter(pk=title_id)
+                        .values_list('category_id', flat=True))
+    genre_ids = list(Title.genre.through.objects.filter(title_id=title_id)
+                     .values_list('genre_id', flat=True))
+    return category_ids, genre_ids
+
+
+def title_totals(title_ids) -> Tuple[int, int, int]:
+    """Число произведений, сумма оценок и отзывов по id из базы."""
+    totals = Title.objects.filter(pk__in=title_ids).aggregate(
+        titles=Count('id'), score=Sum('score_sum'),
+        reviews=Sum('review_count')
+    )
+    return totals['titles'], totals['score'] or 0, totals['reviews'] or 0
+
+
+def shift_reviews(title_id, score: int, reviews: int) -> None:
+    """Учесть изменение отзывов произведения в сводках."""
+    if title_id in deleting_titles():
+        return
+    category_ids, genre_ids = title_links(title_id)
+    shift_stats(category_ids, genre_ids, score=score, reviews=reviews)
+
+
+def refresh_stats(category_ids: Optional[Iterable[int]] = None,
+                  genre_ids: Optional[Iterable[int]] = None) -> None:
+    """Пересчитать сводки заново по таблицам произведений.
+    Без аргументов - все сводки, иначе только для переданных id.
+    """
+    categories = Category.objects.all()
+    genres = Genre.objects.all()
+    titles = Title.objects.order_by().exclude(category_id=None)
+    links = Title.genre.through.objects.order_by()
+    scoped = category_ids is not None or genre_ids is not None
+    if scoped:
+        categories = categories.filter(pk__in=list(category_ids or ()))
+        titles = titles.filter(category_id__in=categories.values('pk'))
+        genres = genres.filter(pk__in=list(genre_ids or ()))
+        links = links.filter(genre_id__in=genres.values('pk'))
+    category_rows = titles.values('category_id').annotate(
+        titles=Count('id'), score=Sum('score_sum'),
+        reviews=Sum('review_count')
+    )
+    genre_rows = links.values('genre_id').annotate(
+        titles=Count('title_id'), score=Sum('title__score_sum'),
+        reviews=Sum('title__review_count')
+    )
+    with transaction.atomic():
+        replace_stats(CategoryStats, 'category_id',
+                      list(categories.values_list('pk', flat=True)),
+                      {row['category_id']: row for row in category_rows},
+                      scoped=scoped)
+        replace_stats(GenreStats, 'genre_id',
+                      list(genres.values_list('pk', flat=True)),
+                      {row['genre_id']: row for row in genre_rows},
+                      scoped=scoped)
+
+
+def replace_stats(model, key: str, ids: List[int], rows: dict,
+                  scoped: bool) -> None:
+    """Заменить сводки ids посчитанными rows."""
+    stale = model.objects.all()
+    if scoped:
+        stale = stale.filter(**{f'{key}__in': ids})
+    stale.delete()
+    model.objects.bulk_create(
+        (model(**{key: pk},
+               title_count=rows.get(pk, {}).get('titles', 0),
+               score_sum=rows.get(pk, {}).get('score') or 0,
+               review_count=rows.get(pk, {}).get('reviews') or 0)
+         for pk in ids),
+        batch_size=1000
+    )
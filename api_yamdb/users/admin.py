@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 
-from .models import User
+from .models import EmailOutbox, User
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -15,5 +15,14 @@ class UserAdmin(admin.ModelAdmin):
     readonly_fields = ('date_joined',)
 
 
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipient', 'subject', 'created',
+                    'attempts', 'sent', 'next_attempt')
+    search_fields = ('recipient',)
+    list_filter = ('sent',)
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(User, UserAdmin)
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
 admin.site.unregister(Group)
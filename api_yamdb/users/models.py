@@ -49,6 +49,15 @@ class User(AbstractUser):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем логин из базы, чтобы при его смене сбросить
+        закэшированные отзывы пользователя.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     @property
     def is_admin(self) -> bool:
         return self.role == ADMIN or self.is_staff
@@ -59,3 +68,53 @@ class User(AbstractUser):
 
     def __str__(self) -> str:
         return self.username
+
+
+class EmailOutbox(models.Model):
+    """
+    Очередь исходящих писем.
+    Письмо ставится в очередь при регистрации,
+    отправляется командой sendoutbox.
+    """
+    recipient = models.EmailField(
+        'Получатель',
+    )
+    subject = models.CharField(
+        'Тема',
+        max_length=255,
+    )
+    body = models.TextField(
+        'Текст письма',
+    )
+    created = models.DateTimeField(
+        'Поставлено в очередь',
+        auto_now_add=True,
+    )
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        auto_now_add=True,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток отправки',
+        default=0,
+    )
+    sent = models.DateTimeField(
+        'Отправлено',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        indexes = [
+            models.Index(fields=['sent', 'next_attempt'],
+                         name='outbox_pending_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipient}: {self.subject}'
@@ -1,9 +1,172 @@
+import os
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+def pytest_configure(config):
+    """Без DB_ENGINE в окружении тесты с базой идут на sqlite в памяти.
+    Модуль настроек при этом не меняется - test_settings проверяет его.
+    """
+    if os.getenv('DB_ENGINE'):
+        return
+    from django.conf import settings
+    from django.db import connections
+    settings.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+    connections.__dict__.pop('databases', None)
+    connections._databases = settings.DATABASES
+    if hasattr(connections._connections, 'default'):
+        del connections['default']
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from api.authentication import user_cache
+    from api.throttling import buckets
+    from django.core.cache import caches
+    for cache in caches.all():
+        cache.clear()
+    user_cache.clear()
+    buckets.clear()
+
+
+@pytest.fixture(autouse=True)
+def run_on_commit(request, monkeypatch):
+    """Тест с базой идет внутри транзакции, которая не фиксируется,
+    и колбэки transaction.on_commit не выполняются. Здесь они
+    выполняются, когда код выходит из своего внешнего блока atomic,
+    а вне блоков - сразу, как после фиксации настоящей транзакции.
+    """
+    marker = request.node.get_closest_marker('django_db')
+    if marker is None or marker.kwargs.get('transaction'):
+        return
+    request.getfixturevalue('db')
+    from django.db import connection, transaction
+    blocks = []
+    atomic_enter = transaction.Atomic.__enter__
+    atomic_exit = transaction.Atomic.__exit__
+    on_commit = connection.on_commit
+
+    def run_callbacks():
+        callbacks = connection.run_on_commit
+        connection.run_on_commit = []
+        for _, callback in callbacks:
+            callback()
+
+    def enter(self):
+        blocks.append(self)
+        return atomic_enter(self)
+
+    def exit_and_run(self, exc_type, exc_value, traceback):
+        blocks.remove(self)
+        atomic_exit(self, exc_type, exc_value, traceback)
+        if not blocks:
+            run_callbacks()
+
+    def on_commit_or_run(func):
+        on_commit(func)
+        if not blocks:
+            run_callbacks()
+
+    monkeypatch.setattr(transaction.Atomic, '__enter__', enter)
+    monkeypatch.setattr(transaction.Atomic, '__exit__', exit_and_run)
+    monkeypatch.setattr(connection, 'on_commit', on_commit_or_run)
+
+
+@pytest.fixture
+def api_client():
+    from rest_framework.test import APIClient
+    return APIClient()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='reader', email='reader@yamdb.fake'
+    )
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='boss', email='boss@yamdb.fake', role='admin'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.test import APIClient
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    from rest_framework.test import APIClient
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def make_catalog(django_user_model):
+    """Наполнить базу: rows категорий, жанров, произведений,
+    отзывов к первому произведению и комментариев к первому отзыву.
+    """
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    def make(rows):
+        Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}')
+            for i in range(rows)
+        )
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(rows)
+        )
+        categories = list(Category.objects.order_by('id'))
+        genres = list(Genre.objects.order_by('id'))
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {i}', year=1900 + i % 100,
+                  description='Описание', category=categories[i])
+            for i in range(rows)
+        )
+        titles = list(Title.objects.order_by('id'))
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title=title, genre=genres[index])
+            for i, title in enumerate(titles)
+            for index in {i % rows, (i + 1) % rows}
+        )
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f'author{i}',
+                              email=f'author{i}@yamdb.fake')
+            for i in range(rows)
+        )
+        authors = list(django_user_model.objects.filter(
+            username__startswith='author').order_by('id'))
+        Review.objects.bulk_create(
+            Review(title=titles[0], author=author, text='Отзыв',
+                   score=1 + i % 10)
+            for i, author in enumerate(authors)
+        )
+        review = Review.objects.order_by('id').first()
+        Comment.objects.bulk_create(
+            Comment(review=review, author=author, text='Комментарий')
+            for author in authors
+        )
+        return titles[0], review
+
+    return make
@@ -0,0 +1,62 @@
+import pytest
+from api.utils import get_token_for_user
+from rest_framework.test import APIClient
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {get_token_for_user(user)["token"]}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+
+    def test_user_query_leaves_hot_path(self, user,
+                                        django_assert_num_queries):
+        client = token_client(user)
+        with django_assert_num_queries(1):
+            assert client.get('/api/v1/users/me/').status_code == 200
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/users/me/')
+        assert response.data['username'] == user.username
+
+    def test_role_change_applies_at_once(self, user, admin):
+        client = token_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        response = token_client(admin).patch(
+            f'/api/v1/users/{user.username}/', {'role': 'admin'}
+        )
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200
+
+    def test_deactivated_user_rejected(self, user):
+        client = token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_request_changes_do_not_leak(self, user):
+        client = token_client(user)
+        client.patch('/api/v1/users/me/', {'bio': 'новое'})
+        assert client.get('/api/v1/users/me/').data['bio'] == 'новое'
+
+    def test_local_version_cache_shortens_ttl(self, user, monkeypatch,
+                                              settings, tmp_path,
+                                              django_assert_num_queries):
+        from api import authentication
+        monkeypatch.setattr(authentication, 'USER_CACHE_LOCAL_TTL', 0)
+        client = token_client(user)
+        client.get('/api/v1/users/me/')
+        with django_assert_num_queries(1):
+            client.get('/api/v1/users/me/')
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            client.get('/api/v1/users/me/')
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from api.benchmark import SCENARIOS, compare, dump, percentile, run_benchmark
+from django.core.management import CommandError, call_command
+
+
+class TestPercentile:
+
+    def test_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+        assert [percentile(values, rank) for rank in (50, 95, 99)] == [
+            50.0, 95.0, 99.0]
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([], 50) == 0.0
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    def test_all_scenarios(self):
+        report = run_benchmark(rows=20, requests=6, warmup=2)
+        assert set(report['scenarios']) == {
+            scenario.name for scenario in SCENARIOS}
+        for name, result in report['scenarios'].items():
+            assert result['requests'] == 6, name
+            assert result['errors'] == 0, name
+            latency = result['latency_ms']
+            assert latency['p50'] <= latency['p95'] <= latency['p99'], name
+            assert result['queries_per_request'] >= 0
+        assert report['meta']['database'] == 'sqlite'
+        assert dump(report).startswith('{\n  "meta"')
+
+    def test_compare(self):
+        report = run_benchmark(rows=5, requests=3, warmup=0,
+                               names=['title_detail'])
+        base = json.loads(dump(report))
+        base['scenarios']['title_detail']['queries_per_request'] *= 2
+        base['scenarios']['gone'] = base['scenarios']['title_detail']
+        changes = compare(base, report)
+        assert set(changes) == {'title_detail'}
+        assert changes['title_detail']['queries_per_request'] == -50.0
+        assert changes['title_detail']['throughput_rps'] == 0.0
+
+    def test_unknown_scenario(self):
+        with pytest.raises(CommandError):
+            call_command('benchmark', 'nope')
@@ -0,0 +1,171 @@
+import json
+
+import pytest
+from api.serializers import MESSAGE_DUPLICATE_REVIEW
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import (Category, CategoryStats, Genre, GenreStats, Review,
+                            Title)
+
+
+@pytest.fixture
+def dictionaries():
+    Category.objects.create(name='Фильм', slug='movie')
+    Genre.objects.bulk_create([Genre(name='Драма', slug='drama'),
+                               Genre(name='Комедия', slug='comedy')])
+
+
+def slug_lookups(queries, table):
+    return [query for query in queries
+            if query['sql'].startswith('SELECT')
+            and f'"{table}"."slug" IN' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+
+    def test_partial_success(self, admin_client, dictionaries):
+        items = [
+            {'name': f'Фильм {number}', 'year': 2000, 'category': 'movie',
+             'genre': ['drama', 'comedy']}
+            for number in range(3)
+        ]
+        items[1]['genre'] = ['drama', 'western']
+        items.append('не объект')
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post('/api/v1/titles/bulk/', items,
+                                         format='json')
+        assert response.status_code == 201
+        assert response.data['created'] == 2
+        results = response.data['results']
+        assert 'genre' in results[1]['errors']
+        assert 'errors' in results[3]
+        assert len(slug_lookups(context.captured_queries,
+                                'reviews_category')) == 1
+        assert len(slug_lookups(context.captured_queries,
+                                'reviews_genre')) == 1
+        title = Title.objects.get(pk=results[2]['id'])
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'}
+        found = admin_client.get('/api/v1/titles/', {'search': 'фильм'})
+        assert found.data['count'] == 2
+
+    def test_ndjson(self, admin_client, dictionaries):
+        body = '\n'.join(json.dumps({
+            'name': name, 'year': 1999, 'category': 'movie',
+            'genre': ['drama']
+        }) for name in ('Один', 'Два'))
+        response = admin_client.post('/api/v1/titles/bulk/', body,
+                                     content_type='application/x-ndjson')
+        assert response.status_code == 201
+        assert Title.objects.count() == 2
+
+    def test_index_and_stats_built_once(self, admin_client, dictionaries,
+                                        monkeypatch):
+        from api import bulk
+        from reviews import signals
+        indexed = []
+
+        def index_titles(titles):
+            titles = list(titles)
+            indexed.extend(title.pk for title in titles)
+            original(titles)
+
+        original = bulk.index_titles
+        monkeypatch.setattr(bulk, 'index_titles', index_titles)
+        monkeypatch.setattr(signals, 'index_titles', index_titles)
+        items = [{'name': f'Фильм {number}', 'year': 2000,
+                  'category': 'movie', 'genre': ['drama']}
+                 for number in range(3)]
+        response = admin_client.post('/api/v1/titles/bulk/', items,
+                                     format='json')
+        ids = [result['id'] for result in response.data['results']]
+        assert sorted(indexed) == sorted(ids)
+        assert CategoryStats.objects.get().title_count == 3
+        assert GenreStats.objects.get(genre__slug='drama').title_count == 3
+
+    def test_rejects(self, admin_client, user_client, dictionaries):
+        assert user_client.post('/api/v1/titles/bulk/', [],
+                                format='json').status_code == 403
+        response = admin_client.post('/api/v1/titles/bulk/',
+                                     {'name': 'Один'}, format='json')
+        assert response.status_code == 400
+        response = admin_client.post('/api/v1/titles/bulk/',
+                                     [{'name': 'Один'}], format='json')
+        assert response.status_code == 400
+        assert response.data['created'] == 0
+
+
+@pytest.mark.django_db
+class TestBulkReviews:
+
+    def test_seed_reviews(self, admin_client, admin, user, make_catalog):
+        title, review = make_catalog(2)
+        other = Title.objects.exclude(pk=title.pk).get()
+        items = [
+            {'title': other.pk, 'author': user.username, 'text': 'Да',
+             'score': 8},
+            {'title': other.pk, 'author': admin.username, 'text': 'Нет',
+             'score': 2},
+            {'title': other.pk, 'author': user.username, 'text': 'Еще',
+             'score': 5},
+            {'title': title.pk, 'author': review.author.username,
+             'text': 'Повтор', 'score': 5},
+            {'title': other.pk, 'author': 'nobody', 'text': 'Кто',
+             'score': 5},
+        ]
+        response = admin_client.post('/api/v1/reviews/bulk/', items,
+                                     format='json')
+        assert response.status_code == 201
+        assert response.data['created'] == 2
+        errors = [index for index, result
+                  in enumerate(response.data['results'])
+                  if 'errors' in result]
+        assert errors == [2, 3, 4]
+        other.refresh_from_db()
+        assert (other.score_sum, other.review_count) == (10, 2)
+        assert Review.objects.filter(title=other).count() == 2
+        detail = admin_client.get(f'/api/v1/titles/{other.pk}/')
+        assert detail.data['rating'] == 5
+
+    def test_invalidates_review_list(self, admin_client, user,
+                                     make_catalog):
+        title, _ = make_catalog(2)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        etag = admin_client.get(url)['ETag']
+        admin_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.pk, 'author': user.username, 'text': 'Да',
+             'score': 8},
+        ], format='json')
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data['count'] == 3
+
+    def test_concurrent_duplicate(self, admin_client, admin, user,
+                                  make_catalog, monkeypatch):
+        from api import bulk
+        title, _ = make_catalog(2)
+        insert_reviews = bulk.insert_reviews
+
+        def insert_after_concurrent_post(reviews):
+            monkeypatch.setattr(bulk, 'insert_reviews', insert_reviews)
+            Review.objects.create(title=title, author=user, text='Раньше',
+                                  score=3)
+            return insert_reviews(reviews)
+
+        monkeypatch.setattr(bulk, 'insert_reviews',
+                            insert_after_concurrent_post)
+        response = admin_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.pk, 'author': user.username, 'text': 'Да',
+             'score': 8},
+            {'title': title.pk, 'author': admin.username, 'text': 'Нет',
+             'score': 2},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.data['created'] == 1
+        first, second = response.data['results']
+        assert first['errors'] == {'non_field_errors': [
+            MESSAGE_DUPLICATE_REVIEW]}
+        assert 'errors' not in second
+        assert Review.objects.get(title=title, author=user).text == 'Раньше'
+        assert Review.objects.filter(title=title, author=admin).exists()
@@ -0,0 +1,77 @@
+import gzip
+
+import pytest
+from api import compression, metrics
+from api.compression import negotiate
+
+URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def min_size(monkeypatch):
+    monkeypatch.setattr(compression, 'MIN_SIZE', 100)
+
+
+class TestNegotiate:
+
+    def test_gzip(self):
+        assert negotiate('gzip, deflate') == 'gzip'
+        assert negotiate('GZIP;q=0.5') == 'gzip'
+
+    def test_refused(self):
+        assert negotiate('') is None
+        assert negotiate('identity') is None
+        assert negotiate('gzip;q=0') is None
+        assert negotiate('*;q=0') is None
+
+    def test_wildcard(self):
+        assert negotiate('*') in compression.CODECS
+        assert negotiate('*, gzip;q=0') != 'gzip'
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('min_size')
+class TestCompressionMiddleware:
+
+    def test_gzip_response(self, api_client, make_catalog):
+        make_catalog(5)
+        plain = api_client.get(URL)
+        assert 'Content-Encoding' not in plain
+        assert 'Accept-Encoding' in plain['Vary']
+        response = api_client.get(URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['ETag'].startswith('W/"')
+        assert gzip.decompress(response.content) == plain.content
+        assert int(response['Content-Length']) < len(plain.content)
+
+    def test_below_threshold(self, api_client, make_catalog, monkeypatch):
+        make_catalog(5)
+        monkeypatch.setattr(compression, 'MIN_SIZE', 10 ** 6)
+        response = api_client.get(URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert 'Content-Encoding' not in response
+
+    def test_cache_hit_is_precompressed(self, api_client, make_catalog):
+        make_catalog(5)
+        first = api_client.get(URL, HTTP_ACCEPT_ENCODING='gzip')
+        compressed = metrics.get('compression.gzip.responses')
+        cached = metrics.get('compression.cached')
+        second = api_client.get(URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert second['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert metrics.get('compression.gzip.responses') == compressed
+        assert metrics.get('compression.cached') == cached + 1
+        plain = api_client.get(URL)
+        assert plain['X-Cache'] == 'HIT'
+        assert gzip.decompress(first.content) == plain.content
+        snapshot = metrics.snapshot()
+        assert 0 < snapshot['compression.ratio'] < 1
+        assert snapshot['compression.cpu_ms_per_response'] >= 0
+
+    def test_weak_etag_if_match(self, admin_client, make_catalog):
+        title, _ = make_catalog(5)
+        url = f'{URL}{title.pk}/'
+        etag = admin_client.get(url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        assert etag.startswith('W/')
+        response = admin_client.patch(url, {'name': 'Новое'},
+                                      HTTP_IF_MATCH=etag)
+        assert response.status_code == 200
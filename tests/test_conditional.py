@@ -0,0 +1,136 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_etag_not_modified_without_queries(
+            self, make_catalog, api_client, django_assert_num_queries):
+        make_catalog(3)
+        response = api_client.get('/api/v1/titles/')
+        etag = response['ETag']
+        assert response['Last-Modified']
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/v1/titles/',
+                                      HTTP_IF_NONE_MATCH=f'W/{etag}')
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        other = api_client.get('/api/v1/titles/?year=1901',
+                               HTTP_IF_NONE_MATCH=etag)
+        assert other.status_code == 200
+
+    def test_write_changes_etag(self, make_catalog, api_client,
+                                admin_client):
+        make_catalog(3)
+        etag = api_client.get('/api/v1/categories/')['ETag']
+        admin_client.post('/api/v1/categories/',
+                          {'name': 'Новая', 'slug': 'new'})
+        response = api_client.get('/api/v1/categories/',
+                                  HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_username_change_refreshes_reviews(self, make_catalog,
+                                               api_client):
+        title, review = make_catalog(3)
+        list_url = f'/api/v1/titles/{title.pk}/reviews/'
+        detail_url = f'{list_url}{review.pk}/'
+        other_url = f'/api/v1/titles/{title.pk + 1}/reviews/'
+        etags = {url: api_client.get(url)['ETag']
+                 for url in (list_url, detail_url, other_url)}
+        author = review.author
+        author.username = 'renamed'
+        author.save()
+        for url in (list_url, detail_url):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200
+        assert response.data['author'] == 'renamed'
+        assert api_client.get(
+            other_url, HTTP_IF_NONE_MATCH=etags[other_url]
+        ).status_code == 304
+        etag = api_client.get(detail_url)['ETag']
+        author.bio = 'Не логин'
+        author.save()
+        assert api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag
+                              ).status_code == 304
+
+    def test_if_modified_since(self, make_catalog, api_client):
+        make_catalog(3)
+        last_modified = api_client.get('/api/v1/genres/')['Last-Modified']
+        response = api_client.get('/api/v1/genres/',
+                                  HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_reviews_follow_title_version(self, make_catalog, api_client,
+                                          user_client,
+                                          django_assert_num_queries):
+        title, _ = make_catalog(3)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        etag = api_client.get(url)['ETag']
+        with django_assert_num_queries(0):
+            assert api_client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        other = api_client.get(f'/api/v1/titles/{title.pk + 1}/reviews/')
+        user_client.post(f'/api/v1/titles/{title.pk + 1}/reviews/',
+                         {'text': 'Отзыв', 'score': 5})
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag
+                              ).status_code == 304
+        assert api_client.get(
+            f'/api/v1/titles/{title.pk + 1}/reviews/',
+            HTTP_IF_NONE_MATCH=other['ETag']
+        ).status_code == 200
+
+
+@pytest.mark.django_db
+class TestIfMatch:
+
+    def test_optimistic_concurrency(self, make_catalog, admin_client):
+        title, _ = make_catalog(3)
+        url = f'/api/v1/titles/{title.pk}/'
+        etag = admin_client.get(url)['ETag']
+        first = admin_client.patch(url, {'name': 'Первая правка'},
+                                   HTTP_IF_MATCH=etag)
+        assert first.status_code == 200
+        assert first['ETag'] != etag
+        second = admin_client.patch(url, {'name': 'Вторая правка'},
+                                    HTTP_IF_MATCH=etag)
+        assert second.status_code == 412
+        title.refresh_from_db()
+        assert title.name == 'Первая правка'
+        third = admin_client.patch(url, {'name': 'Третья правка'},
+                                   HTTP_IF_MATCH=first['ETag'])
+        assert third.status_code == 200
+
+    def test_new_etag_after_commit(self, make_catalog, admin_client,
+                                   api_client):
+        title, _ = make_catalog(3)
+        url = f'/api/v1/titles/{title.pk}/'
+        etag = admin_client.get(url)['ETag']
+        with transaction.atomic():
+            response = admin_client.patch(url, {'name': 'Правка'},
+                                          HTTP_IF_MATCH=etag)
+            assert response.status_code == 200
+            assert not response.has_header('ETag')
+            # Параллельный GET до фиксации видит прежнюю версию.
+            assert api_client.get(url, HTTP_IF_NONE_MATCH=etag
+                                  ).status_code == 304
+        fresh = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert fresh.status_code == 200
+        assert fresh.data['name'] == 'Правка'
+        assert response['ETag'] == fresh['ETag'] != etag
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']
+                              ).status_code == 304
+
+    def test_review_delete(self, make_catalog):
+        title, review = make_catalog(3)
+        call_command('rebuildrating', verbosity=0)
+        client = APIClient()
+        client.force_authenticate(review.author)
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/'
+        etag = client.get(url)['ETag']
+        client.patch(url, {'text': 'Исправлено'})
+        assert client.delete(url, HTTP_IF_MATCH=etag).status_code == 412
+        assert client.delete(url, HTTP_IF_MATCH='*').status_code == 204
@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from api import dbpool, metrics
+from django.db.utils import load_backend
+
+# Показатели metrics.snapshot() (очередь писем) читают основную базу.
+pytestmark = pytest.mark.django_db
+
+
+def counters():
+    return {name.rsplit('.', 1)[1]: value
+            for name, value in metrics.snapshot().items()
+            if name.startswith('db.connections.')}
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    dbpool._pools.clear()
+
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / 'pool.sqlite3')
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+def make_wrapper(engine, name, alias='pooled', **extra):
+    settings_dict = {
+        'ENGINE': engine, 'NAME': name, 'USER': '', 'PASSWORD': '',
+        'HOST': '', 'PORT': '', 'ATOMIC_REQUESTS': False,
+        'AUTOCOMMIT': True, 'CONN_MAX_AGE': 0, 'OPTIONS': {},
+        'TIME_ZONE': None, 'TEST': {}, **extra,
+    }
+    return load_backend(engine).DatabaseWrapper(settings_dict, alias)
+
+
+class TestConnectionPool:
+
+    def test_reuse(self, connect):
+        pool = dbpool.ConnectionPool('test', max_size=2)
+        first = pool.acquire(connect)
+        pool.release(first)
+        assert pool.acquire(connect) is first
+        assert (pool.size, len(pool.idle)) == (1, 0)
+        assert counters() == {'opened': 1, 'reused': 1}
+
+    def test_wait_for_release(self, connect):
+        pool = dbpool.ConnectionPool('test', max_size=1, timeout=5)
+        first = pool.acquire(connect)
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(
+            pool.acquire(connect)))
+        waiter.start()
+        deadline = time.monotonic() + 5
+        while not counters().get('waits') and time.monotonic() < deadline:
+            time.sleep(0.001)
+        pool.release(first)
+        waiter.join(5)
+        assert got == [first]
+        assert counters()['waits'] == 1
+
+    def test_timeout(self, connect):
+        pool = dbpool.ConnectionPool('test', max_size=1, timeout=0.05)
+        pool.acquire(connect)
+        with pytest.raises(dbpool.PoolTimeoutError):
+            pool.acquire(connect)
+        assert counters()['timeouts'] == 1
+        assert pool.size == 1
+
+    def test_broken_connection_replaced(self, connect):
+        pool = dbpool.ConnectionPool('test', max_size=1)
+        broken = pool.acquire(connect)
+        pool.release(broken)
+        broken.close()
+        fresh = pool.acquire(connect)
+        assert fresh is not broken
+        assert pool.size == 1
+        assert counters() == {'opened': 2, 'discarded': 1}
+
+    def test_failed_connect_frees_slot(self):
+        pool = dbpool.ConnectionPool('test', max_size=1, timeout=0.05)
+
+        def fail():
+            raise sqlite3.OperationalError('нет базы')
+
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire(fail)
+        assert pool.size == 0
+
+
+class TestPooledBackend:
+
+    def test_close_returns_to_pool(self, tmp_path, django_db_blocker):
+        name = str(tmp_path / 'db.sqlite3')
+        wrapper = make_wrapper('api.backends.sqlite3', name,
+                               POOL={'MAX_SIZE': 1, 'TIMEOUT': 0.05})
+        with django_db_blocker.unblock():
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            raw = wrapper.connection
+            wrapper.close()
+            assert (wrapper.pool.size, len(wrapper.pool.idle)) == (1, 1)
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            assert wrapper.connection is raw
+            other = make_wrapper('api.backends.sqlite3', name)
+            with pytest.raises(dbpool.PoolTimeoutError):
+                other.ensure_connection()
+            wrapper.close()
+        assert counters() == {'opened': 1, 'reused': 1, 'waits': 1,
+                              'timeouts': 1}
+        assert metrics.snapshot()['db.pool.pooled.idle'] == 1
+
+
+class TestPersistentConnections:
+
+    def test_health_check(self, tmp_path, django_db_blocker, monkeypatch):
+        wrapper = make_wrapper('django.db.backends.sqlite3',
+                               str(tmp_path / 'db.sqlite3'),
+                               alias='persistent', HEALTH_CHECKS=True)
+        monkeypatch.setattr(dbpool, 'connections',
+                            type('Handler', (), {'all': lambda self: [
+                                wrapper]})())
+        with django_db_blocker.unblock():
+            wrapper.ensure_connection()
+            dbpool.check_connections()
+            assert wrapper.connection is not None
+            monkeypatch.setattr(wrapper, 'is_usable', lambda: False)
+            dbpool.check_connections()
+        assert wrapper.connection is None
+        assert counters() == {'opened': 1, 'reused': 1, 'discarded': 1}
+
+    def test_health_check_after_idle(self, tmp_path, django_db_blocker,
+                                      monkeypatch):
+        wrapper = make_wrapper('django.db.backends.sqlite3',
+                               str(tmp_path / 'db.sqlite3'),
+                               alias='persistent', HEALTH_CHECKS=True,
+                               HEALTH_CHECK_IDLE=30)
+        monkeypatch.setattr(dbpool, 'connections',
+                            type('Handler', (), {'all': lambda self: [
+                                wrapper]})())
+        checks = []
+        monkeypatch.setattr(wrapper, 'is_usable',
+                            lambda: checks.append(1) or False)
+        with django_db_blocker.unblock():
+            wrapper.ensure_connection()
+            dbpool.mark_idle()
+            dbpool.check_connections()
+            assert (checks, wrapper.connection is not None) == ([], True)
+            wrapper.idle_since -= 30
+            dbpool.check_connections()
+        assert (checks, wrapper.connection) == ([1], None)
+        assert counters() == {'opened': 1, 'reused': 1, 'discarded': 1}
@@ -0,0 +1,102 @@
+import json
+from datetime import timedelta
+
+import pytest
+from api import export
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reviews.models import Comment, Title
+
+URL = '/api/v1/titles/export/'
+
+
+def read_lines(response):
+    assert response.streaming
+    assert response['Content-Type'] == 'application/x-ndjson'
+    body = b''.join(response.streaming_content).decode('utf-8')
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_full_catalog_in_chunks(self, admin_client, make_catalog,
+                                    monkeypatch):
+        make_catalog(5)
+        call_command('rebuildrating', verbosity=0)
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 2)
+        with CaptureQueriesContext(connection) as context:
+            rows = read_lines(admin_client.get(URL))
+        titles = [query for query in context.captured_queries
+                  if 'FROM "reviews_title"' in query['sql']]
+        genres = [query for query in context.captured_queries
+                  if 'FROM "reviews_title_genre"' in query['sql']]
+        assert (len(titles), len(genres)) == (1, 3)
+        assert [row['id'] for row in rows] == sorted(
+            Title.objects.values_list('id', flat=True))
+        first = rows[0]
+        assert first['category']['slug'] == 'category-0'
+        assert {genre['slug'] for genre in first['genre']} == {
+            'genre-0', 'genre-1'}
+        assert first['rating'] == 3
+        assert 'reviews' not in first
+
+    def test_fields_and_comments(self, admin_client, make_catalog):
+        title, review = make_catalog(3)
+        rows = read_lines(admin_client.get(
+            URL, {'fields': 'id,name', 'include': 'comments'}
+        ))
+        first = rows[0]
+        assert set(first) == {'id', 'name', 'reviews'}
+        assert len(first['reviews']) == 3
+        commented = [item for item in first['reviews']
+                     if item['id'] == review.pk][0]
+        assert len(commented['comments']) == 3
+        assert rows[1]['reviews'] == []
+
+    def test_reviews_streamed_once(self, admin_client, make_catalog,
+                                   monkeypatch):
+        title, review = make_catalog(5)
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 2)
+        monkeypatch.setattr(export, 'BUFFER_SIZE', 1)
+        with CaptureQueriesContext(connection) as context:
+            parts = [part.decode('utf-8') for part in admin_client.get(
+                URL, {'fields': 'id', 'include': 'comments'}
+            ).streaming_content]
+        sql = [query['sql'] for query in context.captured_queries]
+        assert len([query for query in sql
+                    if 'FROM "reviews_review"' in query]) == 1
+        assert len([query for query in sql
+                    if 'FROM "reviews_comment"' in query]) == 1
+        assert not parts[0].endswith('\n')
+        rows = [json.loads(line) for line in ''.join(parts).splitlines()]
+        assert [row['id'] for row in rows] == sorted(
+            Title.objects.values_list('id', flat=True))
+        reviews = rows[0]['reviews']
+        assert [item['id'] for item in reviews] == list(
+            title.reviews.order_by('pub_date', 'id')
+            .values_list('id', flat=True))
+        for item in reviews:
+            assert [comment['id'] for comment in item['comments']] == list(
+                Comment.objects.filter(review_id=item['id'])
+                .order_by('pub_date', 'id').values_list('id', flat=True))
+        assert len(reviews[0]['comments']) == 5
+        assert [row['reviews'] for row in rows[1:]] == [[]] * 4
+
+    def test_since(self, admin_client, make_catalog):
+        title, _ = make_catalog(3)
+        Title.objects.exclude(pk=title.pk).update(
+            modified=timezone.now() - timedelta(days=10)
+        )
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        rows = read_lines(admin_client.get(URL, {'since': since}))
+        assert [row['id'] for row in rows] == [title.pk]
+
+    def test_rejects(self, admin_client, user_client):
+        assert user_client.get(URL).status_code == 403
+        response = admin_client.get(URL, {'fields': 'id,password',
+                                          'since': 'вчера'})
+        assert response.status_code == 400
+        assert set(response.data) == {'fields', 'since'}
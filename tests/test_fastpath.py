@@ -0,0 +1,56 @@
+import pytest
+from api import fastpath
+from api.benchmark import serialization_cost
+from django.core.cache import caches
+from reviews.models import Title
+
+URLS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/?page=2',
+    '/api/v1/titles/?ordering=-rating',
+    '/api/v1/titles/?pagination=cursor&ordering=year',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/titles/{title}/reviews/?pagination=cursor',
+    '/api/v1/titles/{title}/reviews/{review}/comments/?page=2',
+)
+
+
+def get_content(client, url, fast, monkeypatch):
+    monkeypatch.setattr(fastpath, 'FAST_LISTS', fast)
+    for cache in caches.all():
+        cache.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.content
+
+
+@pytest.mark.django_db
+class TestFastLists:
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_same_json(self, api_client, make_catalog, monkeypatch, url):
+        title, review = make_catalog(12)
+        Title.objects.create(name='Без категории', year=2000)
+        url = url.format(title=title.pk, review=review.pk)
+        fast = get_content(api_client, url, True, monkeypatch)
+        slow = get_content(api_client, url, False, monkeypatch)
+        assert fast == slow
+
+    def test_cursor_links_follow(self, api_client, make_catalog):
+        make_catalog(12)
+        url = '/api/v1/titles/?pagination=cursor&ordering=-rating'
+        seen = []
+        while url:
+            data = api_client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert len(seen) == len(set(seen)) == 12
+
+    def test_serialization_cost(self, make_catalog):
+        make_catalog(10)
+        cost = serialization_cost(items=10, repeat=1)
+        assert set(cost) == {'titles', 'reviews', 'comments'}
+        assert cost['titles']['items'] == 10
+        titles = cost['titles']
+        assert abs(titles['saved_us_per_item'] - titles['drf_us_per_item']
+                   + titles['fast_us_per_item']) <= 0.02
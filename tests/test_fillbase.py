@@ -0,0 +1,134 @@
+import pytest
+from django.core.management import CommandError, call_command
+from reviews.models import Comment, Review, Title
+
+CSV_FILES = {
+    'category': 'id,name,slug\n1,Фильм,movie\n',
+    'genre': 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+    'user': ('id,username,email,role,bio,first_name,last_name\n'
+             '100,first,first@yamdb.fake,user,,,\n'
+             '101,second,second@yamdb.fake,user,,,\n'),
+    'title': 'id,name,year,category\n1,Крестный отец,1972,1\n2,Побег,1994,\n',
+    'title_genre': 'id,title_id,genre_id\n1,1,1\n2,1,2\n3,2,1\n',
+    'review': ('id,title_id,text,author,score,pub_date\n'
+               '1,1,Отлично,100,10,2019-09-24T21:08:21.567Z\n'
+               '2,1,Хорошо,101,7,2019-09-24T21:08:21.567Z\n'),
+    'comment': ('id,review_id,text,author,pub_date\n'
+                '1,1,Согласен,101,2020-01-13T23:20:02.422Z\n'),
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    from api.management.commands import _models, fillbase
+    for name, content in CSV_FILES.items():
+        (tmp_path / f'{name}.csv').write_text(content, encoding='utf-8')
+    monkeypatch.setattr(_models, 'PATH', str(tmp_path))
+    monkeypatch.setattr(fillbase, 'PATH', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFillbase:
+
+    def test_import(self, data_dir):
+        call_command('fillbase', batch_size=1)
+        title = Title.objects.get(pk=1)
+        assert title.rating == 8.5
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert Title.objects.get(pk=2).category is None
+        assert Review.objects.get(pk=1).comments.count() == 1
+        assert title.search_terms.exists()
+
+    def test_import_order(self):
+        from api.management.commands.fillbase import Command
+        assert Command().get_import_levels(list(CSV_FILES)) == [
+            ['category', 'genre', 'user'],
+            ['title'],
+            ['review', 'title_genre'],
+            ['comment'],
+        ]
+
+    def test_missing_reference_and_resume(self, data_dir):
+        comment_csv = data_dir / 'comment.csv'
+        comment_csv.write_text(
+            'id,review_id,text,author,pub_date\n'
+            '1,1,Согласен,101,2020-01-13T23:20:02.422Z\n'
+            '2,1,Кто я?,999,2020-01-13T23:20:02.422Z\n',
+            encoding='utf-8'
+        )
+        with pytest.raises(CommandError):
+            call_command('fillbase', batch_size=1, workers=1)
+        assert Comment.objects.count() == 1
+        assert (data_dir / '.fillbase_checkpoint.json').exists()
+
+        comment_csv.write_text(CSV_FILES['comment'] + (
+            '2,1,Кто я?,100,2020-01-13T23:20:02.422Z\n'
+        ), encoding='utf-8')
+        call_command('fillbase', batch_size=1)
+        assert Comment.objects.count() == 2
+        assert Review.objects.count() == 2
+        assert Title.objects.get(pk=1).rating == 8.5
+        assert not (data_dir / '.fillbase_checkpoint.json').exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDumpbase:
+
+    def test_layout(self, data_dir, tmp_path_factory):
+        call_command('fillbase')
+        out = tmp_path_factory.mktemp('dump')
+        call_command('dumpbase', 'title', 'review', 'comment',
+                     'title_genre', output=str(out))
+        assert (out / 'review.csv').read_text(encoding='utf-8').startswith(
+            'id,title_id,text,author,score,pub_date\n1,1,Отлично,100,10,'
+        )
+        headers = {name: (out / f'{name}.csv').read_text(
+            encoding='utf-8').splitlines()[0]
+            for name in ('title', 'comment', 'title_genre')}
+        assert headers == {
+            'title': 'id,name,year,category,description,modified',
+            'comment': 'id,review_id,author,text,pub_date',
+            'title_genre': 'id,title_id,genre_id',
+        }
+
+    def test_round_trip_gzip(self, data_dir, monkeypatch):
+        from api.management.commands import _models, fillbase
+        from users.models import User
+        call_command('fillbase')
+        out = data_dir / 'dump'
+        call_command('dumpbase', output=str(out), gzip=True, batch_size=1)
+        assert (out / 'review.csv.gz').exists()
+        assert not (out / 'titlesearchterm.csv.gz').exists()
+        Title.objects.all().delete()
+        User.objects.all().delete()
+        monkeypatch.setattr(_models, 'PATH', str(out))
+        monkeypatch.setattr(fillbase, 'PATH', str(out))
+        call_command('fillbase')
+        title = Title.objects.get(pk=1)
+        assert title.rating == 8.5
+        assert title.genre.count() == 2
+        assert Comment.objects.get(pk=1).author.username == 'second'
+
+    def test_unknown_table(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('dumpbase', 'titles', output=str(tmp_path))
+
+    def test_user_credentials_not_dumped(self, data_dir, tmp_path_factory):
+        from users.models import User
+        call_command('fillbase')
+        User.objects.filter(username='first').update(
+            password='pbkdf2_sha256$secret', is_superuser=True)
+        out = tmp_path_factory.mktemp('dump')
+        call_command('dumpbase', 'user', output=str(out))
+        dumped = (out / 'user.csv').read_text(encoding='utf-8')
+        assert dumped.splitlines()[0] == CSV_FILES['user'].splitlines()[0]
+        assert 'secret' not in dumped
+
+    def test_static_output_rejected(self, settings, tmp_path):
+        settings.STATIC_ROOT = str(tmp_path)
+        with pytest.raises(CommandError):
+            call_command('dumpbase', output=str(tmp_path / 'data'))
+        assert not (tmp_path / 'data').exists()
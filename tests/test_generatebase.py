@@ -0,0 +1,83 @@
+import random
+from datetime import datetime
+from io import StringIO
+
+import pytest
+from api.management.commands.generatebase import NOW, zipf_counts
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.utils import timezone
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+OPTIONS = {'users': 40, 'titles': 30, 'reviews': 300, 'comments': 200,
+           'batch_size': 50, 'stdout': StringIO()}
+
+
+def snapshot():
+    return (
+        list(User.objects.order_by('pk').values_list('pk', 'date_joined')),
+        list(Title.objects.order_by('pk').values_list(
+            'pk', 'name', 'year', 'category__slug', 'score_sum',
+            'review_count', 'modified')),
+        list(Review.objects.order_by('pk').values_list(
+            'pk', 'title_id', 'author_id', 'score', 'pub_date')),
+        Comment.objects.count(),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGeneratebase:
+
+    def test_generate(self):
+        call_command('generatebase', seed=1, **OPTIONS)
+        assert User.objects.count() == 40
+        assert Title.objects.count() == 30
+        assert Review.objects.count() == 300
+        assert Comment.objects.count() > 0
+        assert not Review.objects.values('title', 'author').annotate(
+            count=Count('id')).filter(count__gt=1).exists()
+        for title in Title.objects.all():
+            reviews = title.reviews.all()
+            assert title.review_count == len(reviews)
+            assert title.score_sum == sum(review.score for review in reviews)
+            assert 1 <= title.genre.count() <= 3
+        last = User.objects.order_by('pk').last().pk
+        user = User.objects.create(username='after', email='after@x.fake')
+        assert user.pk > last
+
+    def test_same_seed_same_data(self):
+        call_command('generatebase', seed=7, **OPTIONS)
+        first = snapshot()
+        assert first[1][-1][-1] == NOW
+        Title.objects.all().delete()
+        User.objects.all().delete()
+        call_command('generatebase', seed=7, **OPTIONS)
+        assert snapshot() == first
+
+    def test_now(self):
+        call_command('generatebase', '--now', '2015-06-01', **OPTIONS)
+        now = datetime(2015, 6, 1, tzinfo=timezone.utc)
+        assert set(Title.objects.values_list('modified', flat=True)) == {now}
+        assert not Review.objects.filter(pub_date__gt=now).exists()
+        assert not User.objects.filter(date_joined__gt=now).exists()
+        with pytest.raises(CommandError):
+            call_command('generatebase', '--now', '2001-01-01', **OPTIONS)
+
+    def test_not_empty(self):
+        User.objects.create(username='admin', email='admin@x.fake')
+        with pytest.raises(CommandError):
+            call_command('generatebase', **OPTIONS)
+        assert User.objects.count() == 1
+
+    def test_too_many_reviews(self):
+        with pytest.raises(CommandError):
+            call_command('generatebase', users=2, titles=2, reviews=5,
+                         stdout=StringIO())
+
+
+def test_zipf_counts():
+    counts = zipf_counts(10000, 100, 500, 1.1, random.Random(0))
+    assert sum(counts) == 10000
+    assert max(counts) == 500
+    assert sorted(counts)[len(counts) // 2] < 100
@@ -0,0 +1,78 @@
+import pytest
+from reviews.models import Category, Review, Title
+
+
+@pytest.fixture
+def titles(django_user_model):
+    """Произведения с рейтингами 8, 3, без отзывов и 5."""
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    book = Category.objects.create(name='Книга', slug='book')
+    rows = (('Бета', 1990, movie, (8,)), ('Альфа', 2010, movie, (2, 4)),
+            ('Гамма', 2000, book, ()), ('Дельта', 1980, movie, (5,)))
+    authors = [django_user_model.objects.create(
+        username=f'author{i}', email=f'author{i}@yamdb.fake'
+    ) for i in range(2)]
+    result = {}
+    for name, year, category, scores in rows:
+        title = Title.objects.create(name=name, year=year, category=category)
+        for author, score in zip(authors, scores):
+            Review.objects.create(title=title, author=author, text='text',
+                                  score=score)
+        result[name] = title
+    return result
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitlesOrdering:
+
+    def test_rating(self, titles, api_client):
+        assert names(api_client.get('/api/v1/titles/?ordering=-rating')) == [
+            'Бета', 'Дельта', 'Альфа', 'Гамма']
+        assert names(api_client.get('/api/v1/titles/?ordering=rating')) == [
+            'Гамма', 'Альфа', 'Дельта', 'Бета']
+
+    def test_year_and_name(self, titles, api_client):
+        assert names(api_client.get('/api/v1/titles/?ordering=year')) == [
+            'Дельта', 'Бета', 'Гамма', 'Альфа']
+        assert names(api_client.get('/api/v1/titles/?ordering=-name')) == [
+            'Дельта', 'Гамма', 'Бета', 'Альфа']
+
+    def test_default_and_unknown_field(self, titles, api_client):
+        newest_first = ['Дельта', 'Гамма', 'Альфа', 'Бета']
+        assert names(api_client.get('/api/v1/titles/')) == newest_first
+        assert names(api_client.get(
+            '/api/v1/titles/?ordering=description')) == newest_first
+
+    def test_combines_with_filter(self, titles, api_client):
+        response = api_client.get(
+            '/api/v1/titles/?category=movie&ordering=-year')
+        assert names(response) == ['Альфа', 'Бета', 'Дельта']
+
+    def test_cursor_follows_ordering(self, titles, api_client, monkeypatch):
+        from api.pagination import KeysetPagination
+        monkeypatch.setattr(KeysetPagination, 'page_size', 1)
+        url = '/api/v1/titles/?pagination=cursor&ordering=-rating'
+        seen = []
+        while url:
+            response = api_client.get(url)
+            seen.extend(names(response))
+            url = response.json()['next']
+        assert seen == ['Бета', 'Дельта', 'Альфа', 'Гамма']
+
+    def test_stored_rating_follows_reviews(self, titles):
+        title = titles['Альфа']
+        title.refresh_from_db()
+        assert title.avg_score == title.rating == 3
+        review = title.reviews.first()
+        review.score = 10
+        review.save()
+        title.refresh_from_db()
+        assert title.avg_score == title.rating
+        title.reviews.all().delete()
+        title.refresh_from_db()
+        assert (title.avg_score, title.rating) == (0, None)
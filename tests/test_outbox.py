@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from api import outbox
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from users.models import EmailOutbox
+
+
+@pytest.fixture
+def file_backend(settings, tmp_path):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+    settings.EMAIL_FILE_PATH = str(tmp_path)
+    return tmp_path
+
+
+def signup(client, username):
+    return client.post('/api/v1/auth/signup/', {
+        'username': username, 'email': f'{username}@yamdb.fake'
+    })
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_only_enqueues(self, api_client, file_backend):
+        response = signup(api_client, 'newcomer')
+        assert response.status_code == 200
+        message = EmailOutbox.objects.get()
+        assert message.recipient == 'newcomer@yamdb.fake'
+        assert message.sent is None
+        assert os.listdir(file_backend) == []
+
+    def test_batch_over_one_connection(self, api_client, settings,
+                                       monkeypatch):
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        for number in range(3):
+            signup(api_client, f'user{number}')
+        connections = []
+
+        def get_connection():
+            connections.append(mail.get_connection())
+            return connections[-1]
+
+        monkeypatch.setattr(outbox, 'get_connection', get_connection)
+        call_command('sendoutbox', batch_size=2)
+        assert not EmailOutbox.objects.filter(sent__isnull=True).exists()
+        assert len(mail.outbox) == 3
+        assert len(connections) == 2
+
+    def test_retry_with_backoff(self, api_client, settings, monkeypatch):
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        signup(api_client, 'unlucky')
+
+        def fail(self, messages):
+            raise ConnectionError('smtp down')
+
+        from django.core.mail.backends import locmem
+        with monkeypatch.context() as patch:
+            patch.setattr(locmem.EmailBackend, 'send_messages', fail)
+            call_command('sendoutbox')
+        message = EmailOutbox.objects.get()
+        assert message.attempts == 1
+        assert 'smtp down' in message.last_error
+        assert message.next_attempt > timezone.now()
+
+        call_command('sendoutbox')
+        assert mail.outbox == []
+        EmailOutbox.objects.update(next_attempt=timezone.now())
+        call_command('sendoutbox')
+        assert len(mail.outbox) == 1
+        assert EmailOutbox.objects.get().sent is not None
+
+    def test_connection_failure_backs_off_batch(self, api_client, settings,
+                                                monkeypatch):
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        for number in range(2):
+            signup(api_client, f'user{number}')
+
+        def fail(self):
+            raise ConnectionRefusedError('smtp down')
+
+        from api import metrics
+        from django.core.mail.backends import locmem
+        failed = metrics.get('outbox.failed')
+        monkeypatch.setattr(locmem.EmailBackend, 'open', fail, raising=False)
+        assert outbox.send_batch() == (0, 2)
+        assert metrics.get('outbox.failed') == failed + 2
+        for message in EmailOutbox.objects.all():
+            assert message.attempts == 1
+            assert 'smtp down' in message.last_error
+            assert (timezone.now() < message.next_attempt
+                    <= timezone.now() + outbox.backoff(1))
+        assert mail.outbox == []
@@ -0,0 +1,74 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+
+
+def walk(client, url, key='next'):
+    """Пройти по всем страницам курсора, собрав id."""
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data
+        ids.extend(item['id'] for item in data['results'])
+        url = data[key]
+    return ids
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_page_number_is_default(self, make_catalog, api_client):
+        make_catalog(12)
+        data = api_client.get('/api/v1/titles/').json()
+        assert data['count'] == 12
+        assert 'page=2' in data['next']
+
+    def test_titles_forward_and_back(self, make_catalog, api_client):
+        make_catalog(12)
+        ids = walk(api_client, '/api/v1/titles/?pagination=cursor')
+        assert ids == sorted(ids, reverse=True)
+        assert len(ids) == 12
+
+        last = api_client.get('/api/v1/titles/?pagination=cursor')
+        for _ in range(2):
+            last = api_client.get(last.json()['next'])
+        back = walk(api_client, last.json()['previous'], key='previous')
+        assert sorted(back, reverse=True) == ids[:10]
+
+    def test_reviews_with_equal_pub_date(self, make_catalog, api_client):
+        title, review = make_catalog(13)
+        title.reviews.update(pub_date=review.pub_date)
+        url = f'/api/v1/titles/{title.pk}/reviews/?pagination=cursor'
+        ids = walk(api_client, url)
+        assert ids == sorted(ids, reverse=True)
+        assert len(ids) == 13
+
+    def test_comments(self, make_catalog, api_client):
+        title, review = make_catalog(7)
+        url = (f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+               '?pagination=cursor')
+        assert len(walk(api_client, url)) == 7
+
+    def test_invalid_cursor(self, make_catalog, api_client):
+        make_catalog(1)
+        response = api_client.get('/api/v1/titles/?cursor=garbage')
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize('url, position', [
+        ('/api/v1/titles/', ['abc']),
+        ('/api/v1/titles/', [None]),
+        ('/api/v1/titles/{title}/reviews/', ['garbage', '1']),
+        ('/api/v1/titles/{title}/reviews/', [None, '1']),
+        ('/api/v1/titles/{title}/reviews/', ['2020-01-01T00:00:00', []]),
+    ], ids=['bad-id', 'null-id', 'bad-datetime', 'null-datetime', 'list'])
+    def test_invalid_cursor_values(self, make_catalog, api_client, url,
+                                   position):
+        title, _ = make_catalog(3)
+        data = json.dumps({'p': position, 'r': False}).encode('utf-8')
+        cursor = urlsafe_b64encode(data).decode('ascii')
+        response = api_client.get(url.format(title=title.pk),
+                                  {'cursor': cursor})
+        assert response.status_code == 404
@@ -0,0 +1,83 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Comment, Review, Title
+
+
+@pytest.fixture
+def titles(django_user_model):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    first, second = (Title.objects.create(name=name, year=2000,
+                                          category=category)
+                     for name in ('Первое', 'Второе'))
+    author = django_user_model.objects.create(username='author',
+                                              email='author@yamdb.fake')
+    review = Review.objects.create(title=first, author=author, text='text',
+                                   score=7)
+    Comment.objects.create(review=review, author=author, text='comment')
+    return first, second, review
+
+
+def selects(queries, table):
+    return [query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestParents:
+
+    def test_review_create_loads_title_once(self, titles, user_client):
+        first, _, _ = titles
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f'/api/v1/titles/{first.pk}/reviews/',
+                {'text': 'Отзыв', 'score': 9}
+            )
+        assert response.status_code == 201
+        full_title = [sql for sql in selects(context.captured_queries,
+                                             'reviews_title')
+                      if '"reviews_title"."description"' in sql]
+        assert len(full_title) == 1
+        assert not selects(context.captured_queries, 'reviews_review')
+
+    def test_duplicate_review_uses_constraint(self, titles, user_client):
+        first, _, _ = titles
+        url = f'/api/v1/titles/{first.pk}/reviews/'
+        assert user_client.post(url, {'text': 'Отзыв', 'score': 9}
+                                ).status_code == 201
+        response = user_client.post(url, {'text': 'Еще', 'score': 1})
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+        first.refresh_from_db()
+        assert (first.review_count, first.score_sum) == (2, 16)
+
+    def test_missing_title(self, titles, user_client):
+        response = user_client.post('/api/v1/titles/999/reviews/',
+                                    {'text': 'Отзыв', 'score': 9})
+        assert response.status_code == 404
+
+    def test_review_of_other_title(self, titles, user_client, api_client):
+        _, second, review = titles
+        base = f'/api/v1/titles/{second.pk}/reviews/{review.pk}/'
+        comment = review.comments.get()
+        assert api_client.get(base).status_code == 404
+        assert api_client.get(f'{base}comments/').status_code == 404
+        assert api_client.get(
+            f'{base}comments/{comment.pk}/').status_code == 404
+        response = user_client.post(f'{base}comments/', {'text': 'Чужой'})
+        assert response.status_code == 404
+        assert review.comments.count() == 1
+
+    def test_comment_create_joins_parents(self, titles, user_client):
+        first, _, review = titles
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f'/api/v1/titles/{first.pk}/reviews/{review.pk}/comments/',
+                {'text': 'Комментарий'}
+            )
+        assert response.status_code == 201
+        parents = selects(context.captured_queries, 'reviews_review')
+        assert len(parents) == 1
+        assert 'INNER JOIN "reviews_title"' in parents[0]
+        assert not selects(context.captured_queries, 'reviews_title')
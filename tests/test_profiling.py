@@ -0,0 +1,68 @@
+import os
+
+import pytest
+from api import profiling
+from api.utils import get_token_for_user
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def token_client():
+    """Клиент с настоящим JWT: проходит всю цепочку аутентификации."""
+    def make(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(
+            get_token_for_user(user)['token']
+        ))
+        return client
+
+    return make
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def profiles(path):
+    return sorted(name for name in os.listdir(path)
+                  if name.endswith(profiling.META_EXT))
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+
+    def test_off_by_default(self, api_client, profile_dir):
+        api_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert profiles(profile_dir) == []
+
+    def test_header_for_admin_only(self, admin, user, token_client,
+                                   profile_dir):
+        token_client(admin).get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        token_client(user).get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        [meta] = [meta for _, meta in profiling.load_profiles()]
+        assert meta['route'] == 'TitlesViewSet.list'
+        assert meta['sql_count'] >= 1
+        assert meta['view_ms'] > 0
+        assert meta['serializer_ms'] > 0
+
+    def test_sampling_and_rotation(self, api_client, profile_dir,
+                                   monkeypatch):
+        monkeypatch.setattr(profiling, 'SAMPLE_RATE', 1.0)
+        monkeypatch.setattr(profiling, 'MAX_FILES', 2)
+        for _ in range(3):
+            api_client.get('/api/v1/categories/')
+        assert len(profiles(profile_dir)) == 2
+        assert len(os.listdir(profile_dir)) == 4
+
+    def test_profilestats(self, api_client, profile_dir, monkeypatch,
+                          capsys):
+        monkeypatch.setattr(profiling, 'SAMPLE_RATE', 1.0)
+        api_client.get('/api/v1/genres/')
+        api_client.get('/api/v1/titles/')
+        call_command('profilestats', route='GenreViewSet.list', top=3)
+        output = capsys.readouterr().out
+        assert 'GenreViewSet.list: профилей 1' in output
+        assert 'TitlesViewSet' not in output
@@ -0,0 +1,49 @@
+import pytest
+
+ROWS = (5, 50, 500)
+
+
+@pytest.mark.django_db
+class TestQueryCount:
+    """Число SQL-запросов к каждому эндпоинту не зависит от объема данных."""
+
+    @pytest.mark.parametrize('rows', ROWS)
+    @pytest.mark.parametrize('url, queries', (
+        ('/api/v1/categories/', 2),
+        ('/api/v1/genres/', 2),
+        ('/api/v1/titles/', 3),
+        ('/api/v1/titles/?genre=genre-1&year=1901', 3),
+        ('/api/v1/titles/{title}/', 2),
+        ('/api/v1/titles/{title}/reviews/', 3),
+        ('/api/v1/titles/{title}/reviews/{review}/', 1),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/', 3),
+    ))
+    def test_read_endpoints(self, rows, url, queries, make_catalog,
+                            api_client, django_assert_num_queries):
+        title, review = make_catalog(rows)
+        url = url.format(title=title.pk, review=review.pk)
+        with django_assert_num_queries(queries):
+            response = api_client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('rows', ROWS)
+    def test_comment_detail(self, rows, make_catalog, api_client,
+                            django_assert_num_queries):
+        title, review = make_catalog(rows)
+        comment = review.comments.first()
+        url = (f'/api/v1/titles/{title.pk}/reviews/{review.pk}'
+               f'/comments/{comment.pk}/')
+        with django_assert_num_queries(1):
+            response = api_client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('rows', ROWS)
+    def test_users(self, rows, make_catalog, admin_client,
+                   django_assert_num_queries):
+        make_catalog(rows)
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 200
+        with django_assert_num_queries(1):
+            response = admin_client.get('/api/v1/users/author1/')
+        assert response.status_code == 200
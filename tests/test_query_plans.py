@@ -0,0 +1,98 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def main_query(queries, table):
+    """Основной запрос эндпоинта: выборка из table с сортировкой."""
+    pattern = re.compile(rf'^SELECT .* FROM "{table}"', re.S)
+    for query in queries:
+        if pattern.match(query['sql']) and 'ORDER BY' in query['sql']:
+            return query['sql']
+    raise AssertionError(f'Нет выборки из {table}')
+
+
+def explain(sql):
+    """План запроса строками. На PostgreSQL последовательное чтение
+    выключено: маленькая тестовая таблица иначе всегда читается целиком,
+    а нам важно, что индексный путь существует.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables):
+    """Строки плана, читающие одну из tables целиком."""
+    scans = []
+    for line in plan:
+        for table in tables:
+            seq = re.search(rf'Seq Scan on {table}\b', line)
+            scan = re.search(rf'^SCAN (TABLE )?{table}\b(?!.* USING)', line)
+            if seq or scan:
+                scans.append(line)
+    return scans
+
+
+def sorts(plan):
+    return [line for line in plan
+            if 'TEMP B-TREE FOR ORDER BY' in line or line.strip(
+                ' ->').startswith('Sort ')]
+
+
+def plan_for(client, url, table):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return explain(main_query(context.captured_queries, table))
+
+
+TITLE_TABLES = ('reviews_title', 'reviews_title_genre')
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    """Основные запросы эндпоинтов идут по индексам: без чтения
+    таблицы целиком, а где индекс задает порядок - и без сортировки.
+    """
+
+    @pytest.fixture(autouse=True)
+    def catalog(self, make_catalog):
+        self.title, self.review = make_catalog(30)
+
+    def test_reviews(self, api_client):
+        plan = plan_for(api_client, f'/api/v1/titles/{self.title.pk}/reviews/',
+                        'reviews_review')
+        assert not full_scans(plan, ('reviews_review',)), plan
+        assert not sorts(plan), plan
+
+    def test_comments(self, api_client):
+        plan = plan_for(api_client,
+                        f'/api/v1/titles/{self.title.pk}/reviews/'
+                        f'{self.review.pk}/comments/', 'reviews_comment')
+        assert not full_scans(plan, ('reviews_comment',)), plan
+        assert not sorts(plan), plan
+
+    @pytest.mark.parametrize('query', (
+        'year=1905', 'category=category-3', 'genre=genre-3',
+        'year=1903&category=category-3', 'genre=genre-3&ordering=-rating',
+    ))
+    def test_title_filters(self, api_client, query):
+        plan = plan_for(api_client, f'/api/v1/titles/?{query}',
+                        'reviews_title')
+        assert not full_scans(plan, TITLE_TABLES), plan
+
+    @pytest.mark.parametrize('query', (
+        'year=1905', 'ordering=-rating', 'ordering=rating',
+        'ordering=year', 'ordering=-name',
+    ))
+    def test_title_order_from_index(self, api_client, query):
+        plan = plan_for(api_client, f'/api/v1/titles/?{query}',
+                        'reviews_title')
+        assert not sorts(plan), plan
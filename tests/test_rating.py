@@ -0,0 +1,80 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Category, CategoryStats, Review, Title
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return Title.objects.create(name='Title', year=2000, category=category)
+
+
+def make_reviews(title, django_user_model, scores):
+    reviews = []
+    for number, score in enumerate(scores):
+        author = django_user_model.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        reviews.append(Review.objects.create(
+            title=title, author=author, text='text', score=score
+        ))
+    return reviews
+
+
+def assert_rating(title, score_sum, review_count):
+    title.refresh_from_db()
+    assert (title.score_sum, title.review_count) == (score_sum, review_count)
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_create_update_delete(self, title, django_user_model):
+        first, second = make_reviews(title, django_user_model, (4, 10))
+        assert_rating(title, 14, 2)
+        assert title.rating == 7
+
+        review = Review.objects.get(pk=first.pk)
+        review.score = 8
+        review.save()
+        assert_rating(title, 18, 2)
+
+        second.delete()
+        assert_rating(title, 8, 1)
+
+        Review.objects.all().delete()
+        assert_rating(title, 0, 0)
+        assert title.rating is None
+
+    def test_cascade_delete(self, title, django_user_model):
+        reviews = make_reviews(title, django_user_model, (3, 5))
+        reviews[0].author.delete()
+        assert_rating(title, 5, 1)
+
+    def test_list_query_count(self, title, django_user_model, api_client,
+                              django_assert_max_num_queries):
+        make_reviews(title, django_user_model, (2, 4, 9))
+        with django_assert_max_num_queries(4):
+            response = api_client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['rating'] == 5
+
+    def test_rebuild_command(self, title, django_user_model):
+        make_reviews(title, django_user_model, (6, 7))
+        Title.objects.update(score_sum=0, review_count=5)
+        call_command('rebuildrating')
+        assert_rating(title, 13, 2)
+
+    def test_rebuild_resets_cache(self, title, django_user_model,
+                                  api_client):
+        make_reviews(title, django_user_model, (6, 7))
+        Title.objects.update(score_sum=0, review_count=5)
+        CategoryStats.objects.update(score_sum=0)
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{title.pk}/'):
+            api_client.get(url)
+        call_command('rebuildrating')
+        response = api_client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['rating'] == 6.5
+        response = api_client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.json()['rating'] == 6.5
+        stats = CategoryStats.objects.get(category=title.category)
+        assert stats.score_sum == 13
@@ -0,0 +1,94 @@
+import pytest
+
+BACKENDS = (
+    {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'},
+)
+
+
+@pytest.fixture(params=BACKENDS, ids=('locmem', 'filebased'))
+def cache_backend(request, settings, tmp_path):
+    backend = dict(request.param, LOCATION=str(tmp_path))
+    settings.CACHES = {'default': backend}
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('cache_backend')
+class TestResponseCache:
+
+    def test_hit_without_queries(self, make_catalog, api_client,
+                                 django_assert_num_queries):
+        make_catalog(5)
+        first = api_client.get('/api/v1/titles/?year=1901')
+        assert first['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            second = api_client.get('/api/v1/titles/?year=1901')
+        assert second['X-Cache'] == 'HIT'
+        assert second.json() == first.json()
+        other = api_client.get('/api/v1/titles/?year=1902')
+        assert other['X-Cache'] == 'MISS'
+
+    def test_api_write_invalidates(self, make_catalog, api_client,
+                                   admin_client):
+        make_catalog(5)
+        api_client.get('/api/v1/categories/')
+        api_client.get('/api/v1/genres/')
+        admin_client.post('/api/v1/categories/',
+                          {'name': 'Новая', 'slug': 'new'})
+        response = api_client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == 6
+        assert api_client.get('/api/v1/genres/')['X-Cache'] == 'HIT'
+
+    def test_review_invalidates_title(self, make_catalog, api_client,
+                                      user_client):
+        title, _ = make_catalog(5)
+        url = f'/api/v1/titles/{title.pk}/'
+        other_url = f'/api/v1/titles/{title.pk + 1}/'
+        api_client.get(url)
+        api_client.get(other_url)
+        user_client.post(f'{url}reviews/', {'text': 'Отзыв', 'score': 10})
+        response = api_client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert api_client.get(other_url)['X-Cache'] == 'HIT'
+
+    def test_model_write_invalidates(self, make_catalog, api_client):
+        from reviews.models import Genre
+        make_catalog(5)
+        api_client.get('/api/v1/titles/')
+        Genre.objects.filter(slug='genre-1').get().save()
+        assert api_client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+
+    def test_version_bumped_after_commit(self, make_catalog, api_client):
+        from api.cache import get_versions
+        from django.db import transaction
+        from reviews.models import Genre
+        make_catalog(2)
+        before = get_versions(['genre'])['genre']
+        with transaction.atomic():
+            Genre.objects.create(name='Новый', slug='new')
+            assert get_versions(['genre'])['genre'] == before
+        assert get_versions(['genre'])['genre'] != before
+        api_client.get('/api/v1/genres/')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Genre.objects.create(name='Откат', slug='rollback')
+                raise RuntimeError
+        assert api_client.get('/api/v1/genres/')['X-Cache'] == 'HIT'
+
+    def test_process_local_cache_warning(self, settings):
+        from api.checks import check_shared_cache
+        local = settings.CACHES['default']['BACKEND'].endswith('LocMemCache')
+        assert [warning.id for warning in check_shared_cache(None)] == (
+            ['api.W001'] if local else []
+        )
+
+    def test_metrics(self, make_catalog, api_client, admin_client):
+        make_catalog(1)
+        before = admin_client.get('/api/v1/metrics/').json()
+        api_client.get('/api/v1/genres/')
+        api_client.get('/api/v1/genres/')
+        after = admin_client.get('/api/v1/metrics/').json()
+        for counter in ('response_cache.hit', 'response_cache.miss'):
+            assert after[counter] == before.get(counter, 0) + 1
+        assert api_client.get('/api/v1/metrics/').status_code == 401
@@ -0,0 +1,63 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Title, TitleSearchTerm
+from reviews.search import tokenize
+
+
+def search(client, query):
+    response = client.get('/api/v1/titles/', {'search': query})
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.fixture
+def titles():
+    Title.objects.create(name='Крестный отец', year=1972,
+                         description='Сага о семье Корлеоне.')
+    Title.objects.create(name='Отцы и дети', year=1862,
+                         description='Роман о нигилисте Базарове.')
+    Title.objects.create(name='Дети капитана Гранта', year=1868,
+                         description='Поиски отца детьми капитана.')
+
+
+class TestTokenizer:
+
+    def test_russian_forms_share_stem(self):
+        assert len(set(tokenize('отцы отцов отцам'))) == 1
+        assert set(tokenize('Произведения произведений')) == set(
+            tokenize('произведение')
+        )
+        assert tokenize('Ёлка и ёлки') == tokenize('елка елки')
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_ranking(self, titles, api_client):
+        names = search(api_client, 'дети')
+        assert names == ['Дети капитана Гранта', 'Отцы и дети']
+
+    def test_all_words_required(self, titles, api_client):
+        assert search(api_client, 'отцы детей') == ['Отцы и дети',
+                                                    'Дети капитана Гранта']
+        assert search(api_client, 'капитана Корлеоне') == []
+
+    def test_combines_with_filters(self, titles, api_client):
+        response = api_client.get('/api/v1/titles/',
+                                  {'search': 'дети', 'year': 1862})
+        assert [item['name'] for item in response.json()['results']] == [
+            'Отцы и дети'
+        ]
+
+    def test_incremental_update(self, titles, api_client):
+        title = Title.objects.get(name='Крестный отец')
+        title.name = 'Крестная мать'
+        title.save()
+        assert search(api_client, 'крестная') == ['Крестная мать']
+        title.delete()
+        assert search(api_client, 'крестная') == []
+
+    def test_rebuild_command(self, titles, api_client):
+        TitleSearchTerm.objects.all().delete()
+        call_command('rebuildsearch')
+        assert search(api_client, 'сага') == ['Крестный отец']
@@ -0,0 +1,79 @@
+import pytest
+from api import fastpath
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json(), ' '.join(query['sql'] for query in queries)
+
+
+@pytest.fixture(params=[True, False], ids=['fast', 'drf'])
+def fast_lists(request, monkeypatch):
+    monkeypatch.setattr(fastpath, 'FAST_LISTS', request.param)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('fast_lists')
+class TestSparseFields:
+
+    def test_titles_fields(self, api_client, make_catalog):
+        make_catalog(6)
+        data, sql = get(api_client, '/api/v1/titles/?fields=id,name')
+        assert [list(item) for item in data['results']] == [['id', 'name']]*5
+        assert 'genre' not in sql
+        assert 'description' not in sql
+        assert 'score_sum' not in sql
+        assert 'reviews_category' not in sql
+
+    def test_titles_omit_matches_full(self, api_client, make_catalog):
+        make_catalog(6)
+        full, _ = get(api_client, '/api/v1/titles/')
+        data, sql = get(api_client,
+                        '/api/v1/titles/?omit=description,rating,genre')
+        assert data['results'] == [
+            {key: value for key, value in item.items()
+             if key not in ('description', 'rating', 'genre')}
+            for item in full['results']
+        ]
+        assert 'score_sum' not in sql
+        assert 'reviews_title_genre' not in sql
+
+    def test_title_detail(self, api_client, make_catalog):
+        title, _ = make_catalog(3)
+        data, sql = get(api_client,
+                        f'/api/v1/titles/{title.pk}/?fields=name,rating')
+        assert data == {'name': title.name, 'rating': None}
+        assert 'description' not in sql
+        assert 'reviews_category' not in sql
+
+    def test_cursor_with_fields(self, api_client, make_catalog):
+        make_catalog(7)
+        url = '/api/v1/titles/?fields=name&pagination=cursor&ordering=-rating'
+        names = []
+        while url:
+            data, _ = get(api_client, url)
+            names.extend(item['name'] for item in data['results'])
+            url = data['next']
+        assert len(set(names)) == 7
+
+    def test_reviews_and_comments(self, api_client, make_catalog):
+        title, review = make_catalog(4)
+        data, sql = get(api_client,
+                        f'/api/v1/titles/{title.pk}/reviews/?omit=author')
+        assert set(data['results'][0]) == {'id', 'text', 'score',
+                                           'pub_date'}
+        assert 'users_user' not in sql
+        data, sql = get(api_client, f'/api/v1/titles/{title.pk}/reviews/'
+                                    f'{review.pk}/comments/?fields=author')
+        assert data['results'][0] == {'author': 'author3'}
+        assert '"reviews_comment"."text"' not in sql
+
+    def test_unknown_field(self, api_client, make_catalog):
+        make_catalog(2)
+        response = api_client.get('/api/v1/titles/?fields=name,secret')
+        assert response.status_code == 400
+        assert 'fields' in response.json()
@@ -0,0 +1,120 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from rest_framework.test import APIClient
+from reviews.models import CategoryStats, Genre, GenreStats, Review, Title
+from reviews.stats import deleting_titles
+
+
+def snapshot():
+    return (
+        sorted(CategoryStats.objects.values_list(
+            'category_id', 'title_count', 'review_count', 'score_sum')),
+        sorted(GenreStats.objects.values_list(
+            'genre_id', 'title_count', 'review_count', 'score_sum')),
+    )
+
+
+def assert_consistent():
+    """Сводки после сигналов совпадают с пересчетом с нуля."""
+    incremental = snapshot()
+    call_command('rebuildstats')
+    assert incremental == snapshot()
+
+
+@pytest.fixture
+def catalog(admin_client, django_user_model):
+    for slug in ('movie', 'book'):
+        admin_client.post('/api/v1/categories/', {'name': slug, 'slug': slug})
+    for slug in ('drama', 'comedy', 'horror'):
+        admin_client.post('/api/v1/genres/', {'name': slug, 'slug': slug})
+    titles = []
+    for number, genres in enumerate((['drama', 'comedy'], ['drama'])):
+        response = admin_client.post('/api/v1/titles/', {
+            'name': f'Фильм {number}', 'year': 2000, 'category': 'movie',
+            'genre': genres,
+        })
+        titles.append(response.data['id'])
+    for number, score in enumerate((10, 6, 5)):
+        client = APIClient()
+        client.force_authenticate(django_user_model.objects.create(
+            username=f'critic{number}', email=f'critic{number}@yamdb.fake'
+        ))
+        client.post(f'/api/v1/titles/{titles[number % 2]}/reviews/',
+                    {'text': 'Отзыв', 'score': score})
+    return titles
+
+
+def by_slug(response):
+    return {row['slug']: row for row in response.data}
+
+
+@pytest.mark.django_db
+class TestCatalogStats:
+
+    def test_endpoints(self, catalog, api_client,
+                       django_assert_num_queries):
+        with django_assert_num_queries(1):
+            categories = by_slug(api_client.get('/api/v1/categories/stats/'))
+        assert categories['movie'] == {
+            'name': 'movie', 'slug': 'movie', 'title_count': 2,
+            'review_count': 3, 'rating': 7.0,
+        }
+        assert categories['book']['rating'] is None
+        genres = by_slug(api_client.get('/api/v1/genres/stats/'))
+        assert genres['drama']['title_count'] == 2
+        assert (genres['comedy']['review_count'],
+                genres['comedy']['rating']) == (2, 7.5)
+        assert_consistent()
+
+    def test_title_changes(self, catalog, admin_client):
+        first, second = catalog
+        admin_client.patch(f'/api/v1/titles/{first}/',
+                           {'category': 'book', 'genre': ['horror']})
+        assert_consistent()
+        assert CategoryStats.objects.get(
+            category__slug='book').review_count == 2
+        Review.objects.filter(title_id=second).delete()
+        assert_consistent()
+        horror = Genre.objects.get(slug='horror')
+        horror.title_set.add(second)
+        assert_consistent()
+        horror.title_set.clear()
+        Title.objects.get(pk=first).genre.clear()
+        assert_consistent()
+        admin_client.delete(f'/api/v1/titles/{first}/')
+        assert_consistent()
+        assert GenreStats.objects.get(genre=horror).title_count == 0
+
+    def test_bulk_titles(self, catalog, admin_client):
+        admin_client.post('/api/v1/titles/bulk/', [
+            {'name': 'Книга', 'year': 1990, 'category': 'book',
+             'genre': ['horror', 'drama']},
+        ], format='json')
+        assert_consistent()
+        assert CategoryStats.objects.get(
+            category__slug='book').title_count == 1
+
+    def test_failed_delete(self, catalog, django_user_model):
+        """Упавшее удаление не оставляет отметку deleting_titles."""
+        first, _ = catalog
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError
+
+        pre_delete.connect(fail, sender=Title)
+        try:
+            with pytest.raises(RuntimeError), transaction.atomic():
+                Title.objects.get(pk=first).delete()
+            with pytest.raises(RuntimeError), transaction.atomic():
+                Title.objects.filter(pk=first).delete()
+        finally:
+            pre_delete.disconnect(fail, sender=Title)
+        assert not deleting_titles()
+        Review.objects.create(
+            title_id=first, text='Отзыв', score=1,
+            author=django_user_model.objects.create(
+                username='late', email='late@yamdb.fake'),
+        )
+        assert_consistent()
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+from api import metrics
+from api.admission import AdmissionControlMiddleware
+from api.throttling import TokenBucketThrottle
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                                   'DEFAULT_THROTTLE_RATES': rates}
+    return set_rates
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(TokenBucketThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+def signup(client, number, address='10.0.0.1'):
+    return client.post(SIGNUP_URL, {'username': f'user{number}',
+                                    'email': f'user{number}@yamdb.fake'},
+                       REMOTE_ADDR=address)
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_ip_bucket(self, client, rates, clock):
+        rates(auth_ip='3/min')
+        statuses = [signup(client, i).status_code for i in range(4)]
+        assert statuses == [200, 200, 200, 429]
+        response = signup(client, 4)
+        assert int(response['Retry-After']) == 20
+        assert signup(client, 5, address='10.0.0.2').status_code == 200
+        clock[0] += 20
+        assert signup(client, 6).status_code == 200
+        assert signup(client, 7).status_code == 429
+        assert metrics.snapshot()['throttle.auth_ip.rejected'] >= 3
+
+    def test_identity_bucket(self, client, rates, clock):
+        rates(auth_identity='2/hour')
+        data = {'username': 'reader', 'confirmation_code': 'wrong'}
+        statuses = [
+            client.post(TOKEN_URL, data,
+                        REMOTE_ADDR=f'10.0.1.{i}').status_code
+            for i in range(3)
+        ]
+        assert statuses[-1] == 429
+        assert 429 not in statuses[:2]
+        data['username'] = 'READER '
+        assert client.post(TOKEN_URL, data).status_code == 429
+
+    def test_disabled_without_rate(self, client, rates):
+        rates()
+        assert all(signup(client, i).status_code == 200 for i in range(30))
+
+
+class TestAdmissionControl:
+
+    def test_limits(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def view(request):
+            entered.set()
+            release.wait(5)
+            return HttpResponse('ok')
+
+        middleware = AdmissionControlMiddleware(
+            view, max_in_flight=2, limits={'/api/v1/auth/': 1})
+        factory = RequestFactory()
+        thread = threading.Thread(
+            target=middleware, args=(factory.post(SIGNUP_URL),))
+        thread.start()
+        entered.wait(5)
+        try:
+            rejected = middleware(factory.post(TOKEN_URL))
+            assert rejected.status_code == 429
+            assert rejected['Retry-After'] == '1'
+            entered.clear()
+            other = threading.Thread(
+                target=middleware, args=(factory.get('/api/v1/titles/'),))
+            other.start()
+            entered.wait(5)
+            overloaded = middleware(factory.get('/api/v1/genres/'))
+            assert overloaded.status_code == 503
+            assert middleware.in_flight['total'] == 2
+        finally:
+            release.set()
+            thread.join()
+            other.join()
+        assert middleware(factory.get('/api/v1/genres/')).status_code == 200
+        assert middleware.in_flight['total'] == 0